@@ -31,6 +31,14 @@ class AlhazenInput(Input):
         tree = next(EarleyParser(grammar).parse(input_string))
         return cls(tree, oracle)
 
+    @staticmethod
+    def tree_node(node: DerivationTree):
+        return node
+
+    @staticmethod
+    def make_tree_node(symbol: str, children) -> DerivationTree:
+        return symbol, children
+
     def __repr__(self):
         return f"AlhazenInput({tree_to_string(self.tree)}, {self.oracle})"
 
@@ -33,11 +33,7 @@ class AlhazenExplanation(Explanation):
                 pd.DataFrame.from_records([{**inp.features.features}])
             )[0]
             eval_result = True if eval_result == str(OracleResult.FAILING) else False
-            if inp.oracle == OracleResult.FAILING:
-                self.failing_inputs_eval_results.append(eval_result)
-            else:
-                self.passing_inputs_eval_results.append(eval_result)
-            self.cache[inp] = eval_result
+            self._update_eval_results(eval_result, inp)
 
     def __neg__(self):
         return self
@@ -84,7 +84,9 @@ class Alhazen(HypothesisBasedExplainer):
             ExplanationSet: The learned decision tree
         """
         LOGGER.info("Learning candidates.")
-        explanations = self.learner.learn_explanation(test_inputs)
+        explanations = self.learner.learn_explanation(
+            test_inputs, deadline=self.deadline
+        )
         return explanations
 
     def generate_test_inputs(self, explanations: ExplanationSet) -> Set[AlhazenInput]:
@@ -98,7 +100,9 @@ class Alhazen(HypothesisBasedExplainer):
             Set[AlhazenInput]: The generated test inputs.
         """
         LOGGER.info("Generating test inputs.")
-        test_inputs = self.engine.generate(explanations=explanations)
+        test_inputs = self.engine.generate(
+            explanations=explanations, deadline=self.deadline
+        )
         return test_inputs
 
     def create_hypotheses(self, explanations: ExplanationSet) -> Any:
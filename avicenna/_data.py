@@ -31,6 +31,14 @@ class AvicennaInput(Input):
     def __hash__(self) -> int:
         return self._tree.structural_hash()
 
+    @staticmethod
+    def tree_node(node: DerivationTree):
+        return node.value, node.children
+
+    @staticmethod
+    def make_tree_node(symbol: str, children) -> DerivationTree:
+        return DerivationTree(symbol, children)
+
     @classmethod
     def from_str(cls, grammar, input_string, oracle: Optional[OracleResult] = None):
         return cls(
@@ -44,4 +52,4 @@ class AvicennaInput(Input):
 __all__ = [
     "AvicennaInput",
     "OracleResult",
-]
\ No newline at end of file
+]
@@ -1,60 +1,270 @@
-from typing import Set, Optional
+import gc
+import math
+import os
+import random
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Set, Optional, Tuple
 
+import z3
+from grammar_graph import gg
+from isla.evaluator import evaluate
 from isla.fuzzer import GrammarFuzzer
+from isla.language import Formula, ISLaUnparser
 
+from dbg.deadline import Deadline
 from dbg.generator.generator import Generator
+from dbg.logger import LOGGER
 from dbg.types import Grammar
 
-from avicenna import ISLaSolver
+from avicenna import DerivationTree, ISLaSolver, is_nonterminal
 from avicenna._data import AvicennaInput
 from avicenna._learner import AvicennaExplanation
 
 
+def _current_memory_mb() -> Optional[float]:
+    """
+    Return the resident memory of the current process in MB, or None if it cannot be
+    determined.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class SolverPool:
+    """
+    A keyed pool of live ISLa solvers, one per constraint string. Solvers keep their
+    state between requests, so repeated hypotheses continue drawing solutions from an
+    already warmed-up solver.
+    The least recently used solvers are evicted once more than max_solvers are alive.
+    While the resident memory of the process exceeds max_memory_mb, each new solver
+    evicts the least recently used one, so that the pool does not grow; as the memory of
+    freed solvers is rarely returned to the operating system, the resident memory alone
+    cannot tell how many solvers to evict.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[Formula], ISLaSolver],
+        max_solvers: int = 32,
+        max_memory_mb: Optional[float] = None,
+    ):
+        self.factory = factory
+        self.max_solvers = max_solvers
+        self.max_memory_mb = max_memory_mb
+        self._solvers: OrderedDict[str, ISLaSolver] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._solvers)
+
+    def __contains__(self, constraint: Formula) -> bool:
+        return self.key(constraint) in self._solvers
+
+    @staticmethod
+    def key(constraint: Formula) -> str:
+        return ISLaUnparser(constraint).unparse()
+
+    def get(self, constraint: Formula) -> ISLaSolver:
+        """
+        Return the live solver for the constraint, creating it if necessary.
+        """
+        key = self.key(constraint)
+        solver = self._solvers.get(key)
+        if solver is not None:
+            self._solvers.move_to_end(key)
+            return solver
+
+        solver = self.factory(constraint)
+        self._solvers[key] = solver
+        self._evict()
+        return solver
+
+    def discard(self, constraint: Formula):
+        """
+        Remove the solver for the constraint from the pool, e.g., once it is exhausted.
+        """
+        self._solvers.pop(self.key(constraint), None)
+
+    def clear(self):
+        self._solvers.clear()
+
+    def _evict(self):
+        while len(self._solvers) > self.max_solvers:
+            self._solvers.popitem(last=False)
+        if self.max_memory_mb is None or len(self._solvers) <= 1:
+            return
+        memory = _current_memory_mb()
+        if memory is not None and memory > self.max_memory_mb:
+            self._solvers.popitem(last=False)
+            gc.collect()
+
+
+def configure_z3_limits(
+    rlimit: Optional[int] = None, max_memory_mb: Optional[int] = None
+):
+    """
+    Set global Z3 resource limits that apply to all Z3 queries issued by the ISLa
+    solvers.
+    :param rlimit: The resource limit per Z3 query (a deterministic measure of solver
+        effort).
+    :param max_memory_mb: The maximum amount of memory Z3 may allocate.
+    """
+    if rlimit is not None:
+        z3.set_param("rlimit", rlimit)
+    if max_memory_mb is not None:
+        z3.set_param("memory_max_size", max_memory_mb)
+
+
 class AvicennaGenerator(Generator):
     """
     A generator that uses the ISLa Solver to generate inputs.
+    Solvers are kept alive in a pool across calls, one per constraint. Each call to the
+    solver is bounded by solve_timeout_seconds; constraints that time out are
+    deprioritized: they receive fewer solving attempts in later iterations and are
+    skipped after max_timeouts timeouts.
     """
 
-    def __init__(self, grammar: Grammar, enable_optimized_z3_queries=False, **kwargs):
+    def __init__(
+        self,
+        grammar: Grammar,
+        enable_optimized_z3_queries=False,
+        max_solvers: int = 32,
+        max_solver_memory_mb: Optional[float] = None,
+        solve_timeout_seconds: Optional[int] = 10,
+        max_timeouts: int = 3,
+        z3_rlimit: Optional[int] = None,
+        z3_max_memory_mb: Optional[int] = None,
+        **kwargs,
+    ):
         super().__init__(grammar)
         self.solver: Optional[ISLaSolver] = None
+        self.constraint: Optional[Formula] = None
         self.enable_optimized_z3_queries = enable_optimized_z3_queries
+        self.solve_timeout_seconds = solve_timeout_seconds
+        self.max_timeouts = max_timeouts
+        self.timed_out_constraints: Dict[str, int] = {}
+        self.solver_pool = SolverPool(
+            self.create_solver,
+            max_solvers=max_solvers,
+            max_memory_mb=max_solver_memory_mb,
+        )
+        configure_z3_limits(z3_rlimit, z3_max_memory_mb)
 
-    def generate(self, **kwargs) -> Optional[AvicennaInput]:
+    def generate(
+        self, deadline: Optional[Deadline] = None, **kwargs
+    ) -> Optional[AvicennaInput]:
         """
         Generate an input to be used in the debugging process using the ISLa Solver.
+        Raises a TimeoutError if the solver exceeds the per-solve timeout or the
+        deadline.
         """
+        # ISLa measures its timeout from the first call to solve(); restart it to bound
+        # each call.
+        self.solver.start_time = None
+        self.solver.timeout_seconds = self.solve_timeout_seconds
+        remaining_seconds = (
+            deadline.remaining_seconds() if deadline is not None else None
+        )
+        if remaining_seconds is not None:
+            # ISLa checks its timeout in whole seconds
+            timeout_seconds = max(0, math.ceil(remaining_seconds) - 1)
+            if self.solve_timeout_seconds is not None:
+                timeout_seconds = min(self.solve_timeout_seconds, timeout_seconds)
+            self.solver.timeout_seconds = timeout_seconds
         try:
             tree = self.solver.solve()
             return AvicennaInput(tree=tree)
-        except (StopIteration, RuntimeError):
+        except StopIteration:
+            self.solver_pool.discard(self.constraint)
+            return None
+        except RuntimeError:
             return None
 
     def generate_test_inputs(
-        self, num_inputs: int = 5, explanation: AvicennaExplanation = None, **kwargs
+        self,
+        num_inputs: int = 5,
+        explanation: AvicennaExplanation = None,
+        deadline: Optional[Deadline] = None,
+        **kwargs,
     ) -> Set[AvicennaInput]:
         """
         Generate multiple inputs to be used in the debugging process.
+        Constraints that timed out before get fewer attempts; the generation for a
+        constraint stops at its first timeout. If the deadline expires, the inputs
+        generated so far are returned.
         """
         test_inputs = set()
         if explanation is not None:
+            num_timeouts = self.get_num_timeouts(explanation.explanation)
+            if num_timeouts >= self.max_timeouts:
+                return test_inputs
+
             self.initialize_solver(explanation.explanation)
-            for _ in range(num_inputs):
-                inp = self.generate(**kwargs)
+            for _ in range(max(1, num_inputs >> num_timeouts)):
+                if Deadline.has_expired(deadline):
+                    break
+                try:
+                    inp = self.generate(deadline=deadline, **kwargs)
+                except TimeoutError:
+                    # a solve cut short by the deadline does not count against the
+                    # constraint
+                    if not Deadline.has_expired(deadline):
+                        self.record_timeout(explanation.explanation)
+                    break
                 if inp:
                     test_inputs.add(inp)
         return test_inputs
 
+    def get_num_timeouts(self, constraint: Formula) -> int:
+        """
+        Return how often solving the constraint has timed out.
+        """
+        return self.timed_out_constraints.get(SolverPool.key(constraint), 0)
+
+    def record_timeout(self, constraint: Formula):
+        """
+        Record that solving the constraint has timed out.
+        """
+        key = SolverPool.key(constraint)
+        self.timed_out_constraints[key] = self.timed_out_constraints.get(key, 0) + 1
+        LOGGER.info(
+            "Solving timed out after %s seconds (%s times): %s",
+            self.solve_timeout_seconds,
+            self.timed_out_constraints[key],
+            key,
+        )
+
     def initialize_solver(self, constraint):
         """
-        Reset the generator with a new constraint.
+        Reset the generator with a new constraint, reusing a live solver for it if one
+        exists.
+        """
+        self.constraint = constraint
+        self.solver = self.solver_pool.get(constraint)
+
+    def create_solver(self, constraint) -> ISLaSolver:
         """
-        self.solver = ISLaSolver(
+        Create a new ISLa solver for the constraint.
+        """
+        return ISLaSolver(
             self.grammar,
             constraint,
             enable_optimized_z3_queries=self.enable_optimized_z3_queries,
+            timeout_seconds=self.solve_timeout_seconds,
         )
 
+    def reset(self, **kwargs):
+        """
+        Reset the generator and drop all live solvers and recorded timeouts.
+        """
+        self.solver = None
+        self.constraint = None
+        self.solver_pool.clear()
+        self.timed_out_constraints = {}
+
 
 class AvicennaISLaGrammarBasedGenerator(Generator):
     """
@@ -70,4 +280,170 @@ class AvicennaISLaGrammarBasedGenerator(Generator):
         """
         Generate an input to be used in the debugging process.
         """
-        return AvicennaInput(tree=self.fuzzer.fuzz_tree())
\ No newline at end of file
+        return AvicennaInput(tree=self.fuzzer.fuzz_tree())
+
+
+class AvicennaMutationGenerator(AvicennaGenerator):
+    """
+    A hybrid generator that mutates the derivation trees of the known (passing and
+    failing) inputs to produce inputs satisfying an explanation. A mutation replaces a
+    subtree by a fresh expansion of its nonterminal; nonterminals occurring in k-paths
+    that no known input covers yet are preferred.
+    Each mutant is checked against the explanation by evaluation, which is much cheaper
+    than solving.
+    Only if too few mutants satisfy the explanation, the remaining inputs are generated
+    with the ISLa solver.
+    The choices of seeds and subtrees are drawn from the generator's own random number
+    generator, seeded with seed, or from the global random module when the generator is
+    created if no seed is given.
+    """
+
+    def __init__(
+        self,
+        grammar: Grammar,
+        graph: Optional[gg.GrammarGraph] = None,
+        k: int = 3,
+        max_mutations: int = 100,
+        max_nonterminals: int = 10,
+        enable_solver_fallback: bool = True,
+        seed: Optional[int] = None,
+        **kwargs,
+    ):
+        super().__init__(grammar, **kwargs)
+        self.random = random.Random(
+            seed if seed is not None else random.getrandbits(64)
+        )
+        self.graph = graph or gg.GrammarGraph.from_grammar(grammar)
+        self.k = k
+        self.max_mutations = max_mutations
+        self.enable_solver_fallback = enable_solver_fallback
+        self.fuzzer = GrammarFuzzer(grammar, max_nonterminals=max_nonterminals)
+        self.reset_seeds()
+
+    def update_seeds(self, test_inputs: Set[AvicennaInput]):
+        """
+        Add the derivation trees of the given inputs to the trees that are mutated.
+        """
+        for inp in test_inputs:
+            key = inp.tree.structural_hash()
+            if key not in self.seeds:
+                self.seeds[key] = inp.tree
+                self.cover(inp.tree)
+
+    def reset_seeds(self):
+        """
+        Forget all seed trees and the k-paths they cover.
+        """
+        self.seeds: Dict[int, DerivationTree] = {}
+        self.uncovered_paths: Set[Tuple[gg.Node, ...]] = set(
+            self.graph.k_paths(self.k, include_terminals=False)
+        )
+        self._symbol_weights: Optional[Dict[str, int]] = None
+
+    def cover(self, tree: DerivationTree) -> int:
+        """
+        Mark the k-paths of the tree as covered and return the number of newly covered
+        k-paths.
+        """
+        new_paths = (
+            tree.k_paths(self.graph, self.k, include_potential_paths=False)
+            & self.uncovered_paths
+        )
+        if new_paths:
+            self.uncovered_paths -= new_paths
+            self._symbol_weights = None
+        return len(new_paths)
+
+    def symbol_weights(self) -> Dict[str, int]:
+        """
+        Return for each nonterminal the number of uncovered k-paths it occurs in.
+        """
+        if self._symbol_weights is None:
+            self._symbol_weights = Counter(
+                node.symbol
+                for path in self.uncovered_paths
+                for node in path
+                if isinstance(node, gg.NonterminalNode)
+                and not isinstance(node, gg.ChoiceNode)
+            )
+        return self._symbol_weights
+
+    def mutate(self, tree: DerivationTree) -> DerivationTree:
+        """
+        Replace a randomly chosen subtree by a fresh expansion of its nonterminal.
+        Subtrees are chosen with a weight of one plus the number of uncovered k-paths of
+        their nonterminal.
+        """
+        weights = self.symbol_weights()
+        subtrees: List[Tuple[Tuple[int, ...], DerivationTree]] = [
+            (path, subtree)
+            for path, subtree in tree.paths()
+            if is_nonterminal(subtree.value)
+        ]
+        path, subtree = self.random.choices(
+            subtrees,
+            weights=[weights.get(subtree.value, 0) + 1 for _, subtree in subtrees],
+        )[0]
+        replacement = self.fuzzer.expand_tree(DerivationTree(subtree.value, None))
+        return tree.replace_path(path, replacement)
+
+    def satisfies(self, constraint: Formula, tree: DerivationTree) -> bool:
+        """
+        Check whether the tree satisfies the constraint.
+        """
+        return evaluate(constraint, tree, self.grammar, graph=self.graph).is_true()
+
+    def generate_test_inputs(
+        self,
+        num_inputs: int = 5,
+        explanation: AvicennaExplanation = None,
+        deadline: Optional[Deadline] = None,
+        **kwargs,
+    ) -> Set[AvicennaInput]:
+        """
+        Generate multiple inputs satisfying the explanation by mutating the seed trees.
+        Falls back to the ISLa solver for the inputs that could not be found by
+        mutation.
+        If the deadline expires, the inputs generated so far are returned.
+        """
+        test_inputs = set()
+        if explanation is None:
+            return test_inputs
+
+        seeds = list(self.seeds.values())
+        seen = set(self.seeds.keys())
+        for _ in range(self.max_mutations if seeds else 0):
+            if len(test_inputs) >= num_inputs or Deadline.has_expired(deadline):
+                break
+            tree = self.mutate(self.random.choice(seeds))
+            key = tree.structural_hash()
+            if key in seen:
+                continue
+            seen.add(key)
+            if self.satisfies(explanation.explanation, tree):
+                self.cover(tree)
+                test_inputs.add(AvicennaInput(tree=tree))
+
+        if len(test_inputs) < num_inputs and self.enable_solver_fallback:
+            LOGGER.debug(
+                "Found %s of %s inputs by mutation, solving for the rest: %s",
+                len(test_inputs),
+                num_inputs,
+                explanation,
+            )
+            test_inputs.update(
+                super().generate_test_inputs(
+                    num_inputs - len(test_inputs),
+                    explanation,
+                    deadline=deadline,
+                    **kwargs,
+                )
+            )
+        return test_inputs
+
+    def reset(self, **kwargs):
+        """
+        Reset the generator, its solvers, and its seed trees.
+        """
+        super().reset(**kwargs)
+        self.reset_seeds()
@@ -1,4 +1,5 @@
-from typing import Iterable, Optional
+import operator
+from typing import Callable, Iterable, Optional
 
 from dbg.data.input import Input
 from dbg.explanation.candidate import Explanation, ExplanationSet
@@ -11,6 +12,8 @@ from isla.language import ISLaUnparser
 from grammar_graph import gg
 
 from avicenna._data import AvicennaInput
+from avicenna._learning._memo import FormulaEvaluationMemo
+from avicenna._learning._canonical import fingerprint
 
 
 class AvicennaExplanation(Explanation):
@@ -21,28 +24,50 @@ class AvicennaExplanation(Explanation):
             ):
         super().__init__(explanation)
         self.explanation = explanation
-        self.failing_inputs_eval_results = failing_inputs_eval_results or []
-        self.passing_inputs_eval_results = passing_inputs_eval_results or []
-        self.cache = cache or {}
+        self._set_eval_results(
+            failing_inputs_eval_results or [],
+            passing_inputs_eval_results or [],
+            cache or {},
+        )
 
-    def evaluate(self, test_inputs: set[AvicennaInput], graph: gg.GrammarGraph = None, **kwargs):
+    def _compute_fingerprint(self) -> str:
+        """
+        Fingerprint the canonical form of the formula, in which the operands of
+        conjunctions and disjunctions are ordered and the bound variables are renamed.
+        """
+        return fingerprint(self.explanation)
+
+    def evaluate(
+        self,
+        test_inputs: set[AvicennaInput],
+        graph: gg.GrammarGraph = None,
+        memo: FormulaEvaluationMemo = None,
+        **kwargs,
+    ):
         for inp in test_inputs:
             if inp in self.cache:
                 continue
-            eval_result = evaluate(
-                self.explanation, inp.tree, graph.grammar, graph=graph
-            ).is_true()
-            self._update_eval_results(eval_result, inp)
-
-    def _update_eval_results(self, eval_result: bool, inp: Input):
+            self.evaluate_input(inp, graph, memo)
+
+    def evaluate_input(
+        self,
+        inp: AvicennaInput,
+        graph: gg.GrammarGraph,
+        memo: FormulaEvaluationMemo = None,
+    ) -> bool:
         """
-        Update the evaluation results and combination with a new input and its evaluation result.
+        Evaluate the candidate formula on a single input and record the result.
+        If a memo is given, the results of sub-formulas shared with other candidates are
+        reused.
         """
-        if inp.oracle == OracleResult.FAILING:
-            self.failing_inputs_eval_results.append(eval_result)
+        if memo is not None:
+            eval_result = memo.evaluate(self.explanation, inp.tree, graph).is_true()
         else:
-            self.passing_inputs_eval_results.append(eval_result)
-        self.cache[inp] = eval_result
+            eval_result = evaluate(
+                self.explanation, inp.tree, graph.grammar, graph=graph
+            ).is_true()
+        self._update_eval_results(eval_result, inp)
+        return eval_result
 
     def __neg__(self):
         """
@@ -59,26 +84,40 @@ class AvicennaExplanation(Explanation):
         """
         Return the conjunction of the candidate formula with another candidate formula.
         """
+        return self.__combine(
+            other, self.explanation & other.explanation, operator.and_
+        )
+
+    def __or__(self, other):
+        """
+        Return the disjunction of the candidate formula with another candidate formula.
+        """
+        return self.__combine(other, self.explanation | other.explanation, operator.or_)
+
+    def __combine(
+        self, other, explanation, combine_results: Callable[[bool, bool], bool]
+    ):
+        """
+        Return the combined candidate with the combined evaluation results of both
+        candidates.
+        The combined candidate is only evaluated on the inputs both candidates were
+        evaluated on.
+        """
         new_cache = {}
         failing = []
         passing = []
 
-        for inp in self.cache.keys():
-            r = self.cache[inp] and other.cache[inp]
+        for inp, result in self.cache.items():
+            if inp not in other.cache:
+                continue
+            r = combine_results(result, other.cache[inp])
             if inp.oracle == OracleResult.FAILING:
                 failing.append(r)
             else:
                 passing.append(r)
             new_cache[inp] = r
 
-        conjunction = self.explanation & other.explanation
-        return self.__new_explanation(conjunction, failing, passing, new_cache)
-
-    def __or__(self, other):
-        """
-        Return the disjunction of the candidate formula with another candidate formula.
-        """
-        pass
+        return self.__new_explanation(explanation, failing, passing, new_cache)
 
     @staticmethod
     def __new_explanation(explanation, failing_inputs_eval_results, passing_inputs_eval_results, cache):
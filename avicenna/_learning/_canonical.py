@@ -0,0 +1,157 @@
+"""
+Canonical forms and fingerprints of ISLa formulas.
+
+Two candidates that differ only in the order of the operands of conjunctions and
+disjunctions, or in the names of their bound variables (e.g., after
+language.ensure_unique_bound_variables), have the same canonical form. Bound variables
+are renamed by the number of quantifiers they are nested in, so that the names do not
+depend on the order of sibling formulas; the operands of conjunctions and disjunctions
+are flattened, deduplicated, and sorted by their canonical forms.
+"""
+
+import hashlib
+from typing import Dict, List
+
+import z3
+from isla.language import (
+    Formula,
+    Variable,
+    BoundVariable,
+    DummyVariable,
+    BindExpression,
+    ConjunctiveFormula,
+    DisjunctiveFormula,
+    NegatedFormula,
+    QuantifiedFormula,
+    ForallFormula,
+    NumericQuantifiedFormula,
+    ForallIntFormula,
+    StructuralPredicateFormula,
+    SemanticPredicateFormula,
+    SMTFormula,
+)
+
+Names = Dict[Variable, str]
+
+
+def canonical_form(formula: Formula) -> str:
+    """
+    Return the canonical form of the formula as an s-expression.
+    """
+    return _canonical(formula, {}, 0)
+
+
+def fingerprint(formula: Formula) -> str:
+    """
+    Return the SHA-1 digest of the canonical form of the formula.
+    """
+    return hashlib.sha1(canonical_form(formula).encode("utf-8")).hexdigest()
+
+
+def _canonical(formula: Formula, names: Names, depth: int) -> str:
+    if isinstance(formula, (ConjunctiveFormula, DisjunctiveFormula)):
+        operator = "and" if isinstance(formula, ConjunctiveFormula) else "or"
+        operands = sorted(set(_operands(formula, type(formula), names, depth)))
+        if len(operands) == 1:
+            return operands[0]
+        return f"({operator} {' '.join(operands)})"
+
+    if isinstance(formula, NegatedFormula):
+        return f"(not {_canonical(formula.args[0], names, depth)})"
+
+    if isinstance(formula, QuantifiedFormula):
+        quantifier = "forall" if isinstance(formula, ForallFormula) else "exists"
+        in_variable = _argument(formula.in_variable, names)
+        names = dict(names)
+        bound_variable = _bind(formula.bound_variable, names, f"?v{depth}")
+        bind_expression = ""
+        if formula.bind_expression is not None:
+            bind_expression = " " + _bind_expression(
+                formula.bind_expression, names, depth
+            )
+        inner = _canonical(formula.inner_formula, names, depth + 1)
+        return (
+            f"({quantifier} {bound_variable}{bind_expression} in {in_variable} {inner})"
+        )
+
+    if isinstance(formula, NumericQuantifiedFormula):
+        quantifier = (
+            "forall-int" if isinstance(formula, ForallIntFormula) else "exists-int"
+        )
+        names = dict(names)
+        bound_variable = _bind(formula.bound_variable, names, f"?v{depth}")
+        inner = _canonical(formula.inner_formula, names, depth + 1)
+        return f"({quantifier} {bound_variable} {inner})"
+
+    if isinstance(formula, (StructuralPredicateFormula, SemanticPredicateFormula)):
+        arguments = " ".join(_argument(argument, names) for argument in formula.args)
+        return f"({formula.predicate.name} {arguments})"
+
+    if isinstance(formula, SMTFormula):
+        return _smt(formula, names)
+
+    return f"(formula {formula})"
+
+
+def _operands(formula: Formula, operator: type, names: Names, depth: int) -> List[str]:
+    """
+    Return the canonical forms of the operands of nested conjunctions (or disjunctions).
+    """
+    operands = []
+    for argument in formula.args:
+        if type(argument) is operator:
+            operands.extend(_operands(argument, operator, names, depth))
+        else:
+            operands.append(_canonical(argument, names, depth))
+    return operands
+
+
+def _bind(variable: BoundVariable, names: Names, name: str) -> str:
+    if isinstance(variable, DummyVariable):
+        return variable.n_type
+    names[variable] = name
+    return f"{name}:{variable.n_type}"
+
+
+def _bind_expression(bind_expression: BindExpression, names: Names, depth: int) -> str:
+    elements = []
+    count = 0
+
+    def bind(element) -> str:
+        nonlocal count
+        if isinstance(element, list):
+            return f"[{' '.join(bind(list_element) for list_element in element)}]"
+        count += 1
+        return _bind(element, names, f"?v{depth}_{count}")
+
+    for element in bind_expression.bound_elements:
+        elements.append(bind(element))
+    return f"(bind {' '.join(elements)})"
+
+
+def _argument(argument, names: Names) -> str:
+    if isinstance(argument, Variable):
+        return names.get(argument, argument.name)
+    if isinstance(argument, str):
+        return repr(argument)
+    return f"({type(argument).__name__} {argument})"
+
+
+def _smt(formula: SMTFormula, names: Names) -> str:
+    renamed = [
+        (z3.String(variable.name), z3.String(names[variable]))
+        for variable in (*formula.free_variables_, *formula.instantiated_variables)
+        if variable in names and names[variable] != variable.name
+    ]
+    smt_formula = (
+        z3.substitute(formula.formula, *renamed) if renamed else formula.formula
+    )
+    substitutions = " ".join(
+        sorted(
+            f"({_argument(variable, names)} {tree})"
+            for variable, tree in formula.substitutions.items()
+        )
+    )
+    if substitutions:
+        return f"(smt {smt_formula.sexpr()} {substitutions})"
+    return f"(smt {smt_formula.sexpr()})"
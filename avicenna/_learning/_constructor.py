@@ -1,5 +1,6 @@
-from typing import List, Optional, Set, Tuple
-import copy
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Set, Tuple
+import heapq
 
 from isla.language import Formula
 from islearn.learner import weighted_geometric_mean
@@ -20,12 +21,17 @@ class AtomicFormulaInstantiation(InvariantLearner):
         self,
         grammar,
         pattern_file: str = None,
+        max_positive_inputs_for_learning: Optional[int] = 10,
+        max_cached_inputs: int = 10_000,
     ):
         super().__init__(
             grammar=grammar,
             pattern_file=pattern_file,
             filter_inputs_for_learning_by_kpaths=False,
         )
+        self.max_positive_inputs_for_learning = max_positive_inputs_for_learning
+        self.max_cached_inputs = max_cached_inputs
+        self.reset()
 
     def construct_candidates(
         self,
@@ -33,21 +39,55 @@ class AtomicFormulaInstantiation(InvariantLearner):
         exclude_nonterminals: Optional[Set[str]] = None,
     ) -> Set[Formula]:
         """
-        Construct the candidates based on the positive inputs.
+        Construct the candidates based on the positive inputs. The instantiation is
+        incremental:
+        the patterns are only instantiated with inputs they have not been instantiated
+        with in previous calls, and the k-paths covered by those earlier inputs count as
+        covered when selecting new ones.
+        If the excluded nonterminals change, the instantiation starts over.
         :param positive_inputs:
         :param exclude_nonterminals:
-        :return: the set of atomic candidates (based on the patterns and the positive inputs)
+        :return: the set of atomic candidates (based on the patterns and the new
+            positive inputs)
         """
-        self.exclude_nonterminals = exclude_nonterminals or set()
+        exclude_nonterminals = set(exclude_nonterminals or set())
+        if exclude_nonterminals != self.exclude_nonterminals:
+            self.reset()
+        self.exclude_nonterminals = exclude_nonterminals
 
-        sorted_positive_inputs = self._sort_and_filter_inputs(positive_inputs)
+        new_positive_inputs = {
+            inp for inp in positive_inputs if inp not in self.instantiated_inputs
+        }
+        if not new_positive_inputs:
+            return set()
+
+        sorted_positive_inputs = self._sort_and_filter_inputs(
+            new_positive_inputs, self.max_positive_inputs_for_learning
+        )
         new_candidates: Set[Formula] = self._get_recall_candidates(
             sorted_positive_inputs
         )
+        self.instantiated_inputs.update(sorted_positive_inputs)
+        # the k-paths of instantiated inputs are not needed anymore, as these inputs are
+        # never selected again
+        for inp in sorted_positive_inputs:
+            self._tree_paths.pop(inp, None)
         return new_candidates
 
+    def reset(self):
+        """
+        Forget which inputs the patterns have been instantiated with.
+        """
+        self.instantiated_inputs: Set[AvicennaInput] = set()
+        self.covered_paths: Set[Tuple[gg.Node, ...]] = set()
+        # the k-paths of the inputs that have not been instantiated yet, bounded by
+        # max_cached_inputs
+        self._tree_paths: OrderedDict[AvicennaInput, Set[Tuple[gg.Node, ...]]] = (
+            OrderedDict()
+        )
+
     def _get_recall_candidates(
-        self, sorted_positive_inputs: Set[AvicennaInput]
+        self, sorted_positive_inputs: List[AvicennaInput]
     ) -> Set[Formula]:
         """
         Get the candidates based on the positive inputs.
@@ -55,7 +95,7 @@ class AtomicFormulaInstantiation(InvariantLearner):
         :return:
         """
         candidates = self.generate_candidates(
-            self.patterns, [inp.tree for inp in list(sorted_positive_inputs)[:10]]
+            self.patterns, [inp.tree for inp in sorted_positive_inputs]
         )
 
         return candidates
@@ -63,68 +103,89 @@ class AtomicFormulaInstantiation(InvariantLearner):
     def _sort_and_filter_inputs(
         self,
         positive_inputs: Set[AvicennaInput],
-        max_number_positive_inputs_for_learning: int = 10,
-    ) -> Set[AvicennaInput]:
+        max_number_positive_inputs_for_learning: Optional[int] = 10,
+    ) -> List[AvicennaInput]:
         """
         Sort and filter the inputs based on the number of uncovered paths and the length of the inputs.
         This method is used to filter the inputs that are used for learning.
         :param positive_inputs:
-        :param max_number_positive_inputs_for_learning:
+        :param max_number_positive_inputs_for_learning: The maximum number of inputs to
+            select, or None to select all inputs.
         :return:
         """
-        p_dummy = copy.deepcopy(positive_inputs)
-        sorted_positive_inputs = self._sort_inputs(
-            p_dummy,
+        return self._sort_inputs(
+            positive_inputs,
             self.filter_inputs_for_learning_by_kpaths,
             more_paths_weight=1.7,
             smaller_inputs_weight=1.0,
+            max_inputs=max_number_positive_inputs_for_learning,
+            covered_paths=self.covered_paths,
         )
 
-        return set(sorted_positive_inputs[:max_number_positive_inputs_for_learning])
+    def _k_paths(self, inp: AvicennaInput) -> Set[Tuple[gg.Node, ...]]:
+        if inp in self._tree_paths:
+            self._tree_paths.move_to_end(inp)
+            return self._tree_paths[inp]
+        paths = {
+            path
+            for path in self.graph.k_paths_in_tree(inp.tree.to_parse_tree(), self.k)
+            if (
+                not isinstance(path[-1], gg.TerminalNode)
+                or (
+                    not isinstance(path[-1], gg.TerminalNode)
+                    and len(path[-1].symbol) > 1
+                )
+            )
+        }
+        self._tree_paths[inp] = paths
+        if len(self._tree_paths) > self.max_cached_inputs:
+            self._tree_paths.popitem(last=False)
+        return paths
 
     def _sort_inputs(
         self,
-        inputs: Set[AvicennaInput],
+        inputs: Iterable[AvicennaInput],
         filter_inputs_for_learning_by_kpaths: bool,
         more_paths_weight: float = 1.0,
         smaller_inputs_weight: float = 0.0,
+        max_inputs: Optional[int] = None,
+        covered_paths: Optional[Set[Tuple[gg.Node, ...]]] = None,
     ) -> List[AvicennaInput]:
         """
         Sort the inputs based on the number of uncovered paths and the length of the inputs.
+        If covered_paths is given, these paths count as already covered, and the set is
+        extended with the paths of the selected inputs.
+        Inputs are selected greedily by maximum k-path coverage gain. As the gain of an
+        input can only decrease when other inputs are selected, the selection is lazy:
+        the inputs are kept in a priority queue, and only a stale score at the top of
+        the queue is re-evaluated.
         """
         assert more_paths_weight or smaller_inputs_weight
-        result: List[AvicennaInput] = []
-
-        tree_paths = {
-            inp: {
-                path
-                for path in self.graph.k_paths_in_tree(inp.tree.to_parse_tree(), self.k)
-                if (
-                    not isinstance(path[-1], gg.TerminalNode)
-                    or (
-                        not isinstance(path[-1], gg.TerminalNode)
-                        and len(path[-1].symbol) > 1
-                    )
-                )
-            }
-            for inp in inputs
-        }
-
-        covered_paths: Set[Tuple[gg.Node, ...]] = set([])
-        max_len_input = max(len(inp.tree) for inp in inputs)
+        inputs: List[AvicennaInput] = list(inputs)
+        if not inputs:
+            return []
+
+        tree_paths: List[Set[Tuple[gg.Node, ...]]] = [
+            self._k_paths(inp) for inp in inputs
+        ]
+        lengths: List[int] = [len(inp.tree) for inp in inputs]
+        covered_paths: Set[Tuple[gg.Node, ...]] = (
+            covered_paths if covered_paths is not None else set([])
+        )
+        max_len_input = max(lengths)
 
-        def uncovered_paths(inp: AvicennaInput) -> Set[Tuple[gg.Node, ...]]:
-            return {path for path in tree_paths[inp] if path not in covered_paths}
+        def num_uncovered_paths(idx: int) -> int:
+            return len(tree_paths[idx]) - len(tree_paths[idx] & covered_paths)
 
-        def sort_by_paths_key(inp: AvicennaInput) -> float:
-            return len(uncovered_paths(inp))
+        def sort_by_paths_key(idx: int) -> float:
+            return num_uncovered_paths(idx)
 
-        def sort_by_length_key(inp: AvicennaInput) -> float:
-            return len(inp.tree)
+        def sort_by_length_key(idx: int) -> float:
+            return lengths[idx]
 
-        def sort_by_paths_and_length_key(inp: AvicennaInput) -> float:
+        def sort_by_paths_and_length_key(idx: int) -> float:
             return weighted_geometric_mean(
-                [len(uncovered_paths(inp)), max_len_input - len(inp.tree)],
+                [num_uncovered_paths(idx), max_len_input - lengths[idx]],
                 [more_paths_weight, smaller_inputs_weight],
             )
 
@@ -135,15 +196,27 @@ class AtomicFormulaInstantiation(InvariantLearner):
         else:
             key = sort_by_paths_and_length_key
 
-        while inputs:
-            inp = sorted(inputs, key=key, reverse=True)[0]
-            inputs.remove(inp)
-            uncovered = uncovered_paths(inp)
+        # Entries are (negated score, input id, selection round the score was computed
+        # in).
+        selection_round = 0
+        queue: List[Tuple[float, int, int]] = [
+            (-key(idx), idx, selection_round) for idx in range(len(inputs))
+        ]
+        heapq.heapify(queue)
+
+        result: List[AvicennaInput] = []
+        while queue and (max_inputs is None or len(result) < max_inputs):
+            _, idx, computed_in = heapq.heappop(queue)
+            if computed_in != selection_round:
+                heapq.heappush(queue, (-key(idx), idx, selection_round))
+                continue
 
+            uncovered = tree_paths[idx] - covered_paths
             if filter_inputs_for_learning_by_kpaths and not uncovered:
                 continue
 
             covered_paths.update(uncovered)
-            result.append(inp)
+            result.append(inputs[idx])
+            selection_round += 1
 
         return result
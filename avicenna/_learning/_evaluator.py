@@ -0,0 +1,380 @@
+"""
+Batch evaluation of Avicenna explanations. The parallel evaluator distributes
+(candidate, input-chunk) pairs over a process pool whose workers hold a preloaded
+grammar graph and their own evaluation memo.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, Future, TimeoutError, as_completed
+from typing import Iterable, List, Optional, Set, Tuple, Dict
+
+from isla.evaluator import evaluate
+from isla.language import Formula
+from grammar_graph import gg
+
+from dbg.deadline import Deadline
+from dbg.logger import LOGGER
+from dbg.data.oracle import OracleResult
+from dbg.types import Grammar
+
+from avicenna import DerivationTree
+from avicenna._data import AvicennaInput
+from avicenna._learner import AvicennaExplanation
+from avicenna._learning._memo import FormulaEvaluationMemo
+
+
+class EvaluationBound:
+    """
+    Early-exit criterion for the evaluation of a single explanation. The evaluation is
+    stopped as soon as the achievable recall falls below min_recall or the achievable
+    specificity falls below min_specificity, i.e., even if all remaining inputs were
+    evaluated favourably, the explanation would be rejected.
+    """
+
+    def __init__(
+        self,
+        explanation: AvicennaExplanation,
+        pending_inputs: List[AvicennaInput],
+        min_recall: Optional[float] = None,
+        min_specificity: Optional[float] = None,
+    ):
+        self.min_recall = min_recall
+        self.min_specificity = min_specificity
+
+        remaining_failing = sum(
+            1 for inp in pending_inputs if inp.oracle == OracleResult.FAILING
+        )
+        self.remaining_passing = len(pending_inputs) - remaining_failing
+        self.remaining_failing = remaining_failing
+
+        self.true_positives, _, self.true_negatives, _ = explanation.confusion_counts()
+        self.total_failing = (
+            len(explanation.failing_inputs_eval_results) + self.remaining_failing
+        )
+        self.total_passing = (
+            len(explanation.passing_inputs_eval_results) + self.remaining_passing
+        )
+
+    def update(self, inp: AvicennaInput, eval_result: bool):
+        """
+        Account for a newly evaluated input.
+        """
+        if inp.oracle == OracleResult.FAILING:
+            self.remaining_failing -= 1
+            self.true_positives += int(eval_result)
+        else:
+            self.remaining_passing -= 1
+            self.true_negatives += int(not eval_result)
+
+    def is_reachable(self) -> bool:
+        """
+        Return whether the explanation can still meet the minimum recall and
+        specificity.
+        """
+        if self.min_recall is not None and self.total_failing > 0:
+            if (
+                self.true_positives + self.remaining_failing
+                < self.min_recall * self.total_failing
+            ):
+                return False
+        if self.min_specificity is not None and self.total_passing > 0:
+            if (
+                self.true_negatives + self.remaining_passing
+                < self.min_specificity * self.total_passing
+            ):
+                return False
+        return True
+
+
+class ExplanationEvaluator:
+    """
+    Evaluates a batch of explanations on a set of test inputs in the current process.
+    The results are stored in the caches of the explanations. Results of sub-formulas
+    are shared between the explanations via a bounded memo table; set memo_size to 0 to
+    disable it.
+    """
+
+    def __init__(
+        self,
+        grammar: Grammar,
+        graph: Optional[gg.GrammarGraph] = None,
+        memo_size: int = 500_000,
+    ):
+        self.grammar = grammar
+        self.graph = graph or gg.GrammarGraph.from_grammar(grammar)
+        self.memo_size = memo_size
+        self.memo: Optional[FormulaEvaluationMemo] = (
+            FormulaEvaluationMemo(memo_size) if memo_size > 0 else None
+        )
+
+    def evaluate(
+        self,
+        explanations: Iterable[AvicennaExplanation],
+        test_inputs: Set[AvicennaInput],
+        min_recall: Optional[float] = None,
+        min_specificity: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Set[AvicennaExplanation]:
+        """
+        Evaluate all explanations on the test inputs. If a minimum recall or specificity
+        is given, the evaluation of an explanation stops as soon as it can no longer
+        reach these bounds.
+        :param explanations: The explanations to evaluate.
+        :param test_inputs: The test inputs to evaluate the explanations on.
+        :param min_recall: The minimum recall an explanation must be able to achieve.
+        :param min_specificity: The minimum specificity an explanation must be able to
+            achieve.
+        :param deadline: If the deadline expires, the evaluation stops. The explanations
+            that were not evaluated on all inputs are not rejected; the next evaluation
+            continues with their pending inputs.
+        :return Set[AvicennaExplanation]: The rejected explanations, i.e., those whose
+            evaluation raised an error or was stopped early. Their evaluation results
+            are incomplete.
+        """
+        rejected: Set[AvicennaExplanation] = set()
+        for explanation in explanations:
+            pending = self._pending_inputs(explanation, test_inputs)
+            bound = EvaluationBound(explanation, pending, min_recall, min_specificity)
+            try:
+                for inp in pending:
+                    if not bound.is_reachable():
+                        rejected.add(explanation)
+                        break
+                    if Deadline.has_expired(deadline):
+                        return rejected
+                    bound.update(
+                        inp, explanation.evaluate_input(inp, self.graph, self.memo)
+                    )
+                else:
+                    if not bound.is_reachable():
+                        rejected.add(explanation)
+            except Exception as e:
+                self._log_error(explanation, e)
+                rejected.add(explanation)
+        return rejected
+
+    def shutdown(self):
+        """
+        Release the resources held by the evaluator.
+        """
+        pass
+
+    @staticmethod
+    def _pending_inputs(
+        explanation: AvicennaExplanation, test_inputs: Set[AvicennaInput]
+    ) -> List[AvicennaInput]:
+        """
+        Return the inputs the explanation has not been evaluated on, failing inputs
+        first.
+        """
+        pending = [inp for inp in test_inputs if inp not in explanation.cache]
+        pending.sort(key=lambda inp: inp.oracle != OracleResult.FAILING)
+        return pending
+
+    @staticmethod
+    def _log_error(explanation: AvicennaExplanation, error: Exception):
+        LOGGER.info(
+            "Error when evaluation candidate %s: %s", explanation.explanation, error
+        )
+
+
+_WORKER_GRAPH: Optional[gg.GrammarGraph] = None
+_WORKER_MEMO: Optional[FormulaEvaluationMemo] = None
+
+
+def _initialize_worker(grammar: Grammar, memo_size: int):
+    """
+    Build the grammar graph and the evaluation memo once per worker process.
+    """
+    global _WORKER_GRAPH, _WORKER_MEMO
+    _WORKER_GRAPH = gg.GrammarGraph.from_grammar(grammar)
+    _WORKER_MEMO = FormulaEvaluationMemo(memo_size) if memo_size > 0 else None
+
+
+def _evaluate_chunk(formula: Formula, trees: List[DerivationTree]) -> List[bool]:
+    """
+    Evaluate a single formula on a chunk of derivation trees inside a worker process.
+    """
+    if _WORKER_MEMO is not None:
+        return [
+            _WORKER_MEMO.evaluate(formula, tree, _WORKER_GRAPH).is_true()
+            for tree in trees
+        ]
+    return [
+        evaluate(formula, tree, _WORKER_GRAPH.grammar, graph=_WORKER_GRAPH).is_true()
+        for tree in trees
+    ]
+
+
+class ParallelExplanationEvaluator(ExplanationEvaluator):
+    """
+    Evaluates a batch of explanations by distributing (candidate, input-chunk) pairs
+    across a process pool.
+    Each worker builds the grammar graph once; the boolean results are merged back into
+    the explanations.
+    """
+
+    def __init__(
+        self,
+        grammar: Grammar,
+        graph: Optional[gg.GrammarGraph] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 32,
+        memo_size: int = 500_000,
+    ):
+        super().__init__(grammar, graph, memo_size)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Dict[
+            Future, Tuple[AvicennaExplanation, List[AvicennaInput]]
+        ] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_initialize_worker,
+                initargs=(self.grammar, self.memo_size),
+            )
+        return self._pool
+
+    def evaluate(
+        self,
+        explanations: Iterable[AvicennaExplanation],
+        test_inputs: Set[AvicennaInput],
+        min_recall: Optional[float] = None,
+        min_specificity: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Set[AvicennaExplanation]:
+        if self.workers <= 1:
+            return super().evaluate(
+                explanations, test_inputs, min_recall, min_specificity, deadline
+            )
+
+        pool = self._get_pool()
+        explanations = list(explanations)
+        rejected: Set[AvicennaExplanation] = set()
+        bounds: Dict[AvicennaExplanation, EvaluationBound] = {}
+        submitted: Dict[AvicennaExplanation, List[Future]] = {}
+        futures = self._resume_in_flight(explanations, submitted)
+        in_flight: Dict[AvicennaExplanation, Set[AvicennaInput]] = {}
+        for explanation, chunk in futures.values():
+            in_flight.setdefault(explanation, set()).update(chunk)
+
+        for explanation in explanations:
+            pending = self._pending_inputs(explanation, test_inputs)
+            bounds[explanation] = EvaluationBound(
+                explanation, pending, min_recall, min_specificity
+            )
+            if not bounds[explanation].is_reachable():
+                self._reject(explanation, rejected, submitted)
+                continue
+            # inputs that are still evaluated by an earlier call are not submitted again
+            running = in_flight.get(explanation, set())
+            pending = [inp for inp in pending if inp not in running]
+            for idx in range(0, len(pending), self.chunk_size):
+                chunk = pending[idx : idx + self.chunk_size]
+                future = pool.submit(
+                    _evaluate_chunk,
+                    explanation.explanation,
+                    [inp.tree for inp in chunk],
+                )
+                futures[future] = (explanation, chunk)
+                submitted.setdefault(explanation, []).append(future)
+
+        timeout = deadline.remaining_seconds() if deadline is not None else None
+        try:
+            for future in as_completed(list(futures), timeout=timeout):
+                explanation, chunk = futures.pop(future)
+                if explanation in rejected or future.cancelled():
+                    continue
+                results = self._merge(future, explanation, chunk)
+                if results is None:
+                    self._reject(explanation, rejected, submitted)
+                    continue
+                bound = bounds.get(explanation)
+                if bound is None:
+                    continue
+                for inp, eval_result in results:
+                    bound.update(inp, eval_result)
+                if not bound.is_reachable():
+                    self._reject(explanation, rejected, submitted)
+                if Deadline.has_expired(deadline):
+                    raise TimeoutError()
+        except TimeoutError:
+            # the deadline expired; the chunks that have not been started yet are
+            # dropped, and the results of the running chunks are merged by the next call
+            for future, (explanation, chunk) in futures.items():
+                if explanation not in rejected and not future.cancel():
+                    self._in_flight[future] = (explanation, chunk)
+        return rejected
+
+    def _resume_in_flight(
+        self,
+        explanations: List[AvicennaExplanation],
+        submitted: Dict[AvicennaExplanation, List[Future]],
+    ) -> Dict[Future, Tuple[AvicennaExplanation, List[AvicennaInput]]]:
+        """
+        Take over the chunks that were still running when an earlier call hit its
+        deadline.
+        The results of finished chunks are merged right away; the running chunks are
+        returned, assigned to the equal explanations of this call, so that they are
+        awaited instead of being submitted again.
+        """
+        current = {explanation: explanation for explanation in explanations}
+        running = {}
+        for future, (explanation, chunk) in self._in_flight.items():
+            explanation = current.get(explanation, explanation)
+            if not future.done():
+                running[future] = (explanation, chunk)
+                submitted.setdefault(explanation, []).append(future)
+            elif not future.cancelled():
+                self._merge(future, explanation, chunk)
+        self._in_flight = {}
+        return running
+
+    def _merge(
+        self,
+        future: Future,
+        explanation: AvicennaExplanation,
+        chunk: List[AvicennaInput],
+    ) -> Optional[List[Tuple[AvicennaInput, bool]]]:
+        """
+        Record the results of a finished chunk for the inputs the explanation has not
+        been evaluated on yet. Return the recorded results, or None if the chunk raised
+        an error.
+        """
+        try:
+            results = future.result()
+        except Exception as e:
+            self._log_error(explanation, e)
+            return None
+        merged = []
+        for inp, eval_result in zip(chunk, results):
+            if inp not in explanation.cache:
+                explanation._update_eval_results(eval_result, inp)
+                merged.append((inp, eval_result))
+        return merged
+
+    @staticmethod
+    def _reject(
+        explanation: AvicennaExplanation,
+        rejected: Set[AvicennaExplanation],
+        submitted: Dict[AvicennaExplanation, List[Future]],
+    ):
+        """
+        Reject an explanation and cancel its chunks that have not been started yet.
+        """
+        rejected.add(explanation)
+        for future in submitted.get(explanation, []):
+            future.cancel()
+
+    def shutdown(self):
+        """
+        Shut down the worker processes.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._in_flight = {}
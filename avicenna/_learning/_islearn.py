@@ -1,18 +1,20 @@
-from typing import List, Tuple, Optional, Iterable, Set
-import itertools
+from typing import Dict, List, Tuple, Optional, Iterable, Set
 
-from isla.language import Formula, ConjunctiveFormula
+from isla.language import Formula, ConjunctiveFormula, DisjunctiveFormula
 from grammar_graph import gg
 from isla import language
 
+from dbg.deadline import Deadline
 from dbg.logger import LOGGER
 from dbg.types import Grammar
 from dbg.explanation.candidate import ExplanationSet
+from dbg.explanation.truth_table import TruthTable
 from dbg.learner.pattern_learner import PatternLearner
 
 from avicenna._data import AvicennaInput
 from avicenna._learner import AvicennaExplanation
 from avicenna._learning._constructor import AtomicFormulaInstantiation
+from avicenna._learning._evaluator import ExplanationEvaluator
 from avicenna import get_pattern_file_path
 
 
@@ -26,6 +28,11 @@ class OptimizedISLearnLearner(
         pattern_file: str = None,
         min_recall: float = 0.9,
         min_specificity: float = 0.6,
+        evaluator: Optional[ExplanationEvaluator] = None,
+        max_positive_inputs_for_learning: Optional[int] = 10,
+        max_conjunction_size: int = 2,
+        max_disjunction_size: int = 1,
+        min_disjunct_recall: float = 0.2,
     ):
         if not pattern_file:
             pattern_file = get_pattern_file_path()
@@ -37,121 +44,218 @@ class OptimizedISLearnLearner(
             min_precision=min_specificity,
         )
 
-        self.atomic_candidate_constructor = AtomicFormulaInstantiation(grammar, pattern_file=pattern_file)
+        self.atomic_candidate_constructor = AtomicFormulaInstantiation(
+            grammar,
+            pattern_file=pattern_file,
+            max_positive_inputs_for_learning=max_positive_inputs_for_learning,
+        )
 
-        self.max_conjunction_size = 2
+        self.max_conjunction_size = max_conjunction_size
+        self.max_disjunction_size = max_disjunction_size
+        self.min_disjunct_recall = min_disjunct_recall
+        self.disjunct_candidates: ExplanationSet[AvicennaExplanation] = ExplanationSet()
         self.all_negative_inputs: Set[AvicennaInput] = set()
         self.all_positive_inputs: Set[AvicennaInput] = set()
         self.graph = gg.GrammarGraph.from_grammar(grammar)
+        self.evaluator = evaluator or ExplanationEvaluator(grammar, self.graph)
         self.exclude_nonterminals: Set[str] = set()
         self.positive_examples_for_learning: List[language.DerivationTree] = []
 
-        self.removed_explanations: set[AvicennaExplanation] = set()
+        self.removed_explanations: ExplanationSet[AvicennaExplanation] = (
+            ExplanationSet()
+        )
+        # atomic candidates whose evaluation was interrupted by the deadline, continued
+        # in the next call
+        self.pending_explanations: ExplanationSet[AvicennaExplanation] = (
+            ExplanationSet()
+        )
 
     def parse_patterns(self, patterns):
         print(patterns)
 
-    def learn_explanation(self,
-          test_inputs: set[AvicennaInput],
-          exclude_nonterminals: Optional[Iterable[str]] = None,
-          **kwargs
+    def learn_explanation(
+        self,
+        test_inputs: set[AvicennaInput],
+        exclude_nonterminals: Optional[Iterable[str]] = None,
+        deadline: Optional[Deadline] = None,
+        **kwargs,
     ) -> Optional[ExplanationSet]:
         """
         Learn candidates from the test inputs.
+        If the deadline expires, the remaining stages are skipped and the explanations
+        learned so far are returned.
         """
         positive_inputs, negative_inputs = self.categorize_inputs(test_inputs)
         self.update_inputs(positive_inputs, negative_inputs)
         self.exclude_nonterminals = exclude_nonterminals or set()
 
-        explanations: ExplanationSet = self._learn_invariants(positive_inputs, negative_inputs)
+        explanations: ExplanationSet = self._learn_invariants(
+            positive_inputs, negative_inputs, deadline
+        )
         return explanations
 
     def update_inputs(self, positive_inputs: set[AvicennaInput], negative_inputs: set[AvicennaInput]):
         self.all_positive_inputs.update(positive_inputs)
         self.all_negative_inputs.update(negative_inputs)
 
-    def _learn_invariants(self,
+    def _learn_invariants(
+        self,
         positive_inputs: Set[AvicennaInput],
         negative_inputs: Set[AvicennaInput],
+        deadline: Optional[Deadline] = None,
     ) -> ExplanationSet[AvicennaExplanation]:
+        if Deadline.has_expired(deadline):
+            return self.explanations
 
         LOGGER.info("Starting creating atomic candidates")
+        # Only positive inputs the patterns have not been instantiated with yet yield
+        # new candidates.
         atomic_formulas = self.atomic_candidate_constructor.construct_candidates(
             self.all_positive_inputs, self.exclude_nonterminals
         )
-        new_explanations = {AvicennaExplanation(formula) for formula in atomic_formulas}
-        new_explanations = new_explanations - self.removed_explanations
+        # Candidates equivalent to a removed, learned or disjunct candidate are not
+        # evaluated again.
+        new_explanations = (
+            ExplanationSet(
+                [AvicennaExplanation(formula) for formula in atomic_formulas]
+            )
+            .difference(self.removed_explanations)
+            .difference(self.explanations)
+            .difference(self.disjunct_candidates)
+        )
+        new_explanations.extend(self.pending_explanations)
+        self.pending_explanations = ExplanationSet()
 
         LOGGER.info("Starting filtering atomic candidates")
         filtered_explanations = set()
+        disjunct_explanations = set()
+        min_recall = (
+            self.min_recall
+            if self.max_disjunction_size < 2
+            else self.min_disjunct_recall
+        )
+        rejected = self.evaluator.evaluate(
+            new_explanations,
+            self.all_positive_inputs,
+            min_recall=min_recall,
+            deadline=deadline,
+        )
         for explanation in new_explanations:
-            explanation.evaluate(self.all_positive_inputs, self.graph)
-            if explanation.recall() >= self.min_recall:
+            if explanation in rejected:
+                self.removed_explanations.append(explanation)
+            elif Deadline.has_expired(deadline):
+                self.pending_explanations.append(explanation)
+            elif explanation.recall() >= self.min_recall:
                 filtered_explanations.add(explanation)
             else:
-                self.removed_explanations.add(explanation)
+                disjunct_explanations.add(explanation)
 
-        explanations_to_evaluate: List[AvicennaExplanation] = (
-            [] + self.explanations.explanations
+        if Deadline.has_expired(deadline):
+            LOGGER.info(
+                "The deadline expired, skipping the validation of new candidates"
+            )
+            return self.explanations
+
+        explanations_to_evaluate: ExplanationSet[AvicennaExplanation] = ExplanationSet(
+            self.explanations.explanations
         )
-        for explanation in filtered_explanations:
-            if explanation not in explanations_to_evaluate:
-                explanations_to_evaluate.append(explanation)
+        explanations_to_evaluate.extend(filtered_explanations)
 
         LOGGER.info("Evaluating %s candidates", len(explanations_to_evaluate))
         self.validate_and_add_new_candidates(
-            explanations_to_evaluate, positive_inputs, negative_inputs
+            explanations_to_evaluate, positive_inputs, negative_inputs, deadline
         )
 
-        conjunction_candidates = self.get_conjunctions(self.explanations)
+        if Deadline.has_expired(deadline):
+            self.pending_explanations.extend(disjunct_explanations)
+            return self.explanations
+
+        conjunction_candidates = self.get_conjunctions(self.explanations, deadline)
         for candidate in conjunction_candidates:
             self.explanations.append(candidate)
 
+        if self.max_disjunction_size > 1:
+            if Deadline.has_expired(deadline):
+                self.pending_explanations.extend(disjunct_explanations)
+                return self.explanations
+            self.update_disjunct_candidates(disjunct_explanations, deadline)
+            disjunction_candidates = self.get_disjunctions(
+                list(self.explanations) + list(self.disjunct_candidates), deadline
+            )
+            for candidate in disjunction_candidates:
+                self.explanations.append(candidate)
+
         return self.explanations
 
     def validate_and_add_new_candidates(
-            self,
-            candidates: List[AvicennaExplanation],
-            positive_inputs: set[AvicennaInput],
-            negative_inputs: set[AvicennaInput],
+        self,
+        candidates: Iterable[AvicennaExplanation],
+        positive_inputs: set[AvicennaInput],
+        negative_inputs: set[AvicennaInput],
+        deadline: Optional[Deadline] = None,
     ) -> None:
         """
         Generates constraint candidates based on instantiated patterns and evaluates them.
+        If the deadline expires during the evaluation, the learned candidates are kept
+        and the new candidates are validated in the next call.
 
         Args:
             candidates (Set[FandangoConstraintCandidate]): A set of new candidates.
             positive_inputs (Set[FandangoInput]): A set of positive inputs.
             negative_inputs (Set[FandangoInput]): A set of negative inputs.
         """
+        valid_candidates = self.evaluate_candidates(candidates, deadline)
+        if Deadline.has_expired(deadline):
+            for candidate in candidates:
+                if candidate not in self.explanations:
+                    self.pending_explanations.append(candidate)
+            return
         for candidate in candidates:
             if candidate not in self.explanations:
-                if self.evaluate_candidate(
-                        candidate, self.all_positive_inputs, self.all_negative_inputs
-                ):
+                if candidate in valid_candidates:
                     self.explanations.append(candidate)
                     LOGGER.debug("Added new candidate: %s", candidate)
                 else:
-                    self.removed_explanations.add(candidate)
+                    self.removed_explanations.append(candidate)
             else:
-                if not self.evaluate_candidate(
-                        candidate, positive_inputs, negative_inputs
-                ):
+                if candidate not in valid_candidates:
                     self.explanations.remove(candidate)
-                    self.removed_explanations.add(candidate)
+                    self.removed_explanations.append(candidate)
 
-    def evaluate_candidate(
-            self, candidate: AvicennaExplanation, positive_inputs, negative_inputs
-    ):
-        try:
-            candidate.evaluate(positive_inputs, graph=self.graph)
-            if candidate.recall() >= self.min_recall:
-                candidate.evaluate(negative_inputs, graph=self.graph)
-                return True
-        except Exception as e:
-            LOGGER.info(
-                "Error when evaluation candidate %s: %s", candidate.explanation, e
-            )
-        return False
+    def evaluate_candidates(
+        self,
+        candidates: Iterable[AvicennaExplanation],
+        deadline: Optional[Deadline] = None,
+    ) -> Set[AvicennaExplanation]:
+        """
+        Evaluates the candidates in batch on all positive inputs and, if they meet the
+        minimum recall, on all negative inputs. Inputs that have already been evaluated
+        are skipped, and the evaluation of a candidate stops early once it can no longer
+        reach the minimum recall.
+        Atomic candidates are only held to the minimum specificity if no conjunctions
+        are learned, as conjunctions may raise the specificity of their conjuncts.
+        Returns the candidates that meet the minimum criteria and could be evaluated
+        without errors.
+        """
+        rejected = self.evaluator.evaluate(
+            candidates,
+            self.all_positive_inputs,
+            min_recall=self.min_recall,
+            deadline=deadline,
+        )
+        recall_candidates = [
+            candidate for candidate in candidates if candidate not in rejected
+        ]
+        min_specificity = self.min_precision if self.max_conjunction_size < 2 else None
+        rejected = self.evaluator.evaluate(
+            recall_candidates,
+            self.all_negative_inputs,
+            min_specificity=min_specificity,
+            deadline=deadline,
+        )
+        return {
+            candidate for candidate in recall_candidates if candidate not in rejected
+        }
 
     def sort_candidates(self):
         """
@@ -164,74 +268,240 @@ class OptimizedISLearnLearner(
         )
         return sorted_candidates
 
-    def get_disjunctions(self):
+    def get_disjunctions(
+        self,
+        explanations: Iterable[AvicennaExplanation],
+        deadline: Optional[Deadline] = None,
+    ) -> list[AvicennaExplanation]:
         """
-        Calculate the disjunctions of the formulas.
+        Calculate the disjunctions of up to max_disjunction_size atomic explanations
+        that together meet the minimum recall. Disjunctions are scored on the truth
+        table of the cached evaluation results by bitwise OR, and only the valid ones
+        are turned into formulas.
+        The specificity of a disjunction is at most the specificity of each disjunct, so
+        disjuncts below the minimum specificity are discarded, as are disjuncts that are
+        dominated by another disjunct (covering a subset of its failing and a superset
+        of its passing inputs). Starting from each remaining disjunct, a greedy set
+        cover adds the disjunct covering the most uncovered failing inputs while the
+        specificity of the disjunction stays above the minimum; disjuncts that turn out
+        to be redundant are dropped again. If the deadline expires, the disjunctions
+        found so far are returned.
         """
-        pass
+        disjuncts = [
+            explanation
+            for explanation in explanations
+            if not isinstance(
+                explanation.explanation, (ConjunctiveFormula, DisjunctiveFormula)
+            )
+        ]
+        if self.max_disjunction_size < 2 or len(disjuncts) < 2:
+            return []
+
+        table = TruthTable.from_explanations(disjuncts)
+        rows: Dict[int, AvicennaExplanation] = {}
+        for disjunct in disjuncts:
+            row = table.row(disjunct)
+            if (
+                table.specificity(row) >= self.min_precision
+                and row & table.failing_mask
+            ):
+                rows.setdefault(row, disjunct)
+        rows = {
+            row: disjunct
+            for row, disjunct in rows.items()
+            if not any(
+                other != row
+                and row & table.failing_mask & ~other == 0
+                and other & table.passing_mask & ~row == 0
+                for other in rows
+            )
+        }
+
+        disjunctions: list[AvicennaExplanation] = []
+        seen: Set[frozenset] = set()
+        for seed in rows:
+            if Deadline.has_expired(deadline):
+                break
+            combination = [seed]
+            union = seed
+            while (
+                table.recall(union) < self.min_recall
+                and len(combination) < self.max_disjunction_size
+            ):
+                best_row, best_gain = None, 0
+                for row in rows:
+                    gain = (row & table.failing_mask & ~union).bit_count()
+                    if (
+                        gain > best_gain
+                        and table.specificity(union | row) >= self.min_precision
+                    ):
+                        best_row, best_gain = row, gain
+                if best_row is None:
+                    break
+                combination.append(best_row)
+                union |= best_row
+
+            # drop the disjuncts that are not needed to meet the minimum recall, e.g.,
+            # the seed if a later disjunct covers its failing inputs
+            for row in list(combination):
+                rest = 0
+                for other in combination:
+                    if other != row:
+                        rest |= other
+                if len(combination) > 1 and table.recall(rest) >= self.min_recall:
+                    combination.remove(row)
+                    union = rest
+
+            key = frozenset(combination)
+            if (
+                len(combination) < 2
+                or key in seen
+                or table.recall(union) < self.min_recall
+            ):
+                continue
+            seen.add(key)
+            disjunctions.append(
+                self._build_disjunction([rows[row] for row in combination])
+            )
 
-    def check_minimum_recall(self, candidates: tuple[AvicennaExplanation, ...]) -> bool:
-        """
-        Check if the recall of the candidates in the combination is greater than the minimum
-        """
-        return all(candidate.recall() >= self.min_recall for candidate in candidates)
+        return disjunctions
 
-    def is_new_conjunction_valid(
-        self, conjunction: AvicennaExplanation, combination: tuple[AvicennaExplanation, ...]
-    ) -> bool:
+    @staticmethod
+    def _build_disjunction(
+        combination: List[AvicennaExplanation],
+    ) -> AvicennaExplanation:
+        disjunction: AvicennaExplanation = combination[0]
+        for candidate in combination[1:]:
+            disjunction = disjunction | candidate
+
+        disjunction.explanation = language.ensure_unique_bound_variables(
+            disjunction.explanation
+        )
+        return disjunction
+
+    def update_disjunct_candidates(
+        self,
+        new_candidates: Iterable[AvicennaExplanation],
+        deadline: Optional[Deadline] = None,
+    ) -> None:
         """
-        Check if the new conjunction is valid based on the minimum specificity and the recall of the candidates in
-        the combination. The specificity of the new conjunction should be greater than the minimum specificity and
-        the specificity of the conjunction should be greater than the specificity of the individual formula.
+        Evaluates the candidates that miss the minimum recall on their own but may be
+        part of a disjunction.
+        They are kept if they reach min_disjunct_recall and the minimum specificity. If
+        the deadline expires, the candidates that are not rejected are kept as disjunct
+        candidates without being classified.
         """
-        new_specificity = conjunction.specificity()
-        return new_specificity >= self.min_precision and all(
-            new_specificity > candidate.specificity() for candidate in combination
+        candidates = ExplanationSet(self.disjunct_candidates.explanations)
+        candidates.extend(new_candidates)
+        rejected = self.evaluator.evaluate(
+            candidates,
+            self.all_positive_inputs,
+            min_recall=self.min_disjunct_recall,
+            deadline=deadline,
+        )
+        candidates = [
+            candidate for candidate in candidates if candidate not in rejected
+        ]
+        rejected |= self.evaluator.evaluate(
+            candidates,
+            self.all_negative_inputs,
+            min_specificity=self.min_precision,
+            deadline=deadline,
         )
 
+        self.disjunct_candidates = ExplanationSet()
+        for candidate in candidates:
+            if candidate in rejected:
+                self.removed_explanations.append(candidate)
+            elif Deadline.has_expired(deadline):
+                self.disjunct_candidates.append(candidate)
+            elif candidate.recall() >= self.min_recall:
+                self.explanations.append(candidate)
+            else:
+                self.disjunct_candidates.append(candidate)
+
     def get_conjunctions(
-        self, explanations: ExplanationSet[AvicennaExplanation]
+        self,
+        explanations: ExplanationSet[AvicennaExplanation],
+        deadline: Optional[Deadline] = None,
     ) -> list[AvicennaExplanation]:
-        conjunctions: list[AvicennaExplanation] = []
-
-        combinations = self.get_possible_conjunctions(explanations)
-
-        con_counter = 0
-        for combination in combinations:
-            # check min recall
-            if not self.check_minimum_recall(combination):
-                continue
-            conjunction: AvicennaExplanation = combination[0]
-            for candidate in combination[1:]:
-                conjunction = conjunction & candidate
-
-            conjunction.explanation = language.ensure_unique_bound_variables(
-                conjunction.explanation
+        """
+        Search the conjunctions of up to max_conjunction_size non-conjunctive
+        explanations level by level (Apriori-style). Combinations are scored on the
+        truth table of the cached evaluation results before any formula is constructed:
+        - the recall of a conjunction is at most the recall of each of its
+          sub-combinations, so combinations below the minimum recall are pruned together
+          with all their supersets;
+        - a conjunction is only valid if its specificity meets the minimum specificity
+          and is strictly greater than the specificity of each of its sub-combinations,
+          so combinations that already reach a specificity of 1 are not extended.
+        If the deadline expires, the conjunctions found so far are returned.
+        """
+        atoms = [
+            explanation
+            for explanation in explanations
+            if not isinstance(
+                explanation.explanation, (ConjunctiveFormula, DisjunctiveFormula)
             )
+            and explanation.recall() >= self.min_recall
+        ]
+        if len(atoms) < 2:
+            return []
 
-            if self.is_new_conjunction_valid(conjunction, combination):
-                con_counter += 1
-                conjunctions.append(conjunction)
+        table = TruthTable.from_explanations(atoms)
+        rows = [table.row(atom) for atom in atoms]
 
+        conjunctions: list[AvicennaExplanation] = []
+        frontier: Dict[Tuple[int, ...], int] = {
+            (idx,): row for idx, row in enumerate(rows)
+        }
+        for level in range(2, self.max_conjunction_size + 1):
+            next_frontier: Dict[Tuple[int, ...], int] = {}
+            for combination, row in frontier.items():
+                if Deadline.has_expired(deadline):
+                    return conjunctions
+                if table.specificity(row) >= 1.0:
+                    continue
+                for idx in range(combination[-1] + 1, len(atoms)):
+                    new_combination = combination + (idx,)
+                    sub_combinations = [
+                        new_combination[:pos] + new_combination[pos + 1 :]
+                        for pos in range(level)
+                    ]
+                    if any(sub not in frontier for sub in sub_combinations):
+                        continue
+
+                    new_row = row & rows[idx]
+                    if table.recall(new_row) < self.min_recall:
+                        continue
+                    next_frontier[new_combination] = new_row
+
+                    new_specificity = table.specificity(new_row)
+                    if new_specificity >= self.min_precision and all(
+                        new_specificity > table.specificity(frontier[sub])
+                        for sub in sub_combinations
+                    ):
+                        conjunctions.append(
+                            self._build_conjunction([atoms[i] for i in new_combination])
+                        )
+            frontier = next_frontier
+            if not frontier:
+                break
 
         return conjunctions
 
-    def get_possible_conjunctions(self, explanation_set: ExplanationSet[AvicennaExplanation]) -> List[Tuple[AvicennaExplanation, ...]]:
-        """
-        Get all possible conjunctions of the candidate set with a maximum size of max_conjunction_size.
-        """
-        combinations = []
-        candidate_set_without_conjunctions = [
-            explanation
-            for explanation in explanation_set
-            if not isinstance(explanation.explanation, ConjunctiveFormula)
-        ]
-        for level in range(2, self.max_conjunction_size + 1):
-            for comb in itertools.combinations(
-                candidate_set_without_conjunctions, level
-            ):
-                combinations.append(comb)
-        return combinations
+    @staticmethod
+    def _build_conjunction(
+        combination: List[AvicennaExplanation],
+    ) -> AvicennaExplanation:
+        conjunction: AvicennaExplanation = combination[0]
+        for candidate in combination[1:]:
+            conjunction = conjunction & candidate
+
+        conjunction.explanation = language.ensure_unique_bound_variables(
+            conjunction.explanation
+        )
+        return conjunction
 
     def reset(self):
         """
@@ -242,5 +512,8 @@ class OptimizedISLearnLearner(
         self.exclude_nonterminals: Set[str] = set()
         self.positive_examples_for_learning: List[language.DerivationTree] = []
         self.explanations = ExplanationSet()
-        self.removed_explanations = set()
+        self.removed_explanations = ExplanationSet()
+        self.disjunct_candidates = ExplanationSet()
+        self.pending_explanations = ExplanationSet()
+        self.atomic_candidate_constructor.reset()
         super().reset()
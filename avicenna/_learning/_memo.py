@@ -0,0 +1,282 @@
+"""
+A cross-candidate memo table for the evaluation of ISLa formulas.
+
+Atomic candidates instantiated from the same patterns share quantifier prefixes and
+sub-formulas.
+The memo decomposes each candidate into its sub-formulas and stores the truth value of
+every (sub-formula, tree, binding) triple, so that related candidates reuse each other's
+work.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from isla.evaluator import evaluate, evaluate_legacy
+from isla.language import (
+    Formula,
+    Constant,
+    Variable,
+    ConjunctiveFormula,
+    DisjunctiveFormula,
+    NegatedFormula,
+    QuantifiedFormula,
+    ForallFormula,
+    NumericQuantifiedFormula,
+    FilterVisitor,
+    VariablesCollector,
+)
+from isla.three_valued_truth import ThreeValuedTruth
+from isla.trie import SubtreesTrie
+from grammar_graph import gg
+
+from avicenna import DerivationTree
+
+Path = Tuple[int, ...]
+Assignments = Dict[Variable, Tuple[Path, DerivationTree]]
+
+
+@dataclass(frozen=True)
+class _SubFormula:
+    """
+    An interned sub-formula. Interning assigns a small integer key to each distinct
+    sub-formula, so that memo lookups do not need to hash the (recursively hashed) ISLa
+    formula.
+    """
+
+    key: int
+    formula: Formula
+    children: Tuple["_SubFormula", ...]
+    free_variables: Tuple[Variable, ...]
+
+
+class FormulaEvaluationMemo:
+    """
+    A bounded memo table mapping (sub-formula, tree, binding) to a truth value, shared
+    by all candidates evaluated with it. Propositional combinators and quantifiers
+    without bind expressions are decomposed by the memo itself; all other sub-formulas
+    are evaluated with ISLa. The binding of a sub-formula consists of the tree paths
+    assigned to its free variables. The least recently used entries are evicted once
+    max_size is exceeded; likewise, at most max_formulas sub-formulas stay interned.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 500_000,
+        max_tries: int = 1024,
+        max_roots: int = 10_000,
+        max_formulas: int = 100_000,
+    ):
+        self.max_size = max_size
+        self.max_tries = max_tries
+        self.max_roots = max_roots
+        self.max_formulas = max_formulas
+        self.hits = 0
+        self.misses = 0
+
+        self._table: OrderedDict[Tuple[int, int, tuple], ThreeValuedTruth] = (
+            OrderedDict()
+        )
+        self._tries: OrderedDict[int, SubtreesTrie] = OrderedDict()
+        self._interned: OrderedDict[Formula, _SubFormula] = OrderedDict()
+        # keys are never reused, so that the entries of an evicted sub-formula cannot be
+        # mistaken for those of a newly interned one
+        self._next_key = 0
+        self._roots: OrderedDict[
+            int, Tuple[Formula, Tuple[_SubFormula, Tuple[Constant, ...], bool]]
+        ] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def clear(self):
+        """
+        Remove all memoized results and interned formulas.
+        """
+        self._table.clear()
+        self._tries.clear()
+        self._interned.clear()
+        self._roots.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(
+        self, formula: Formula, tree: DerivationTree, graph: gg.GrammarGraph
+    ) -> ThreeValuedTruth:
+        """
+        Evaluate the formula on the derivation tree, reusing memoized results of its
+        sub-formulas.
+        """
+        root, constants, decomposable = self._compile(formula)
+        if not decomposable or tree.is_open():
+            return evaluate(formula, tree, graph.grammar, graph=graph)
+
+        assignments: Assignments = {constant: ((), tree) for constant in constants}
+        return self._evaluate(
+            root, tree.structural_hash(), assignments, tree, self._get_trie(tree), graph
+        )
+
+    def _compile(
+        self, formula: Formula
+    ) -> Tuple[_SubFormula, Tuple[Constant, ...], bool]:
+        """
+        Intern the formula and determine its top-level constants. Formulas with numeric
+        quantifiers cannot be decomposed and are evaluated by ISLa as a whole.
+        """
+        entry = self._roots.get(id(formula))
+        if entry is not None and entry[0] is formula:
+            return entry[1]
+
+        constants = tuple(
+            c
+            for c in VariablesCollector.collect(formula)
+            if isinstance(c, Constant) and not c.is_numeric()
+        )
+        decomposable = len(constants) <= 1 and not FilterVisitor(
+            lambda f: isinstance(f, NumericQuantifiedFormula)
+        ).collect(formula)
+        compiled = (self._intern(formula), constants, decomposable)
+        self._roots[id(formula)] = (formula, compiled)
+        if len(self._roots) > self.max_roots:
+            self._roots.popitem(last=False)
+        return compiled
+
+    def _intern(self, formula: Formula) -> _SubFormula:
+        sub_formula = self._interned.get(formula)
+        if sub_formula is not None:
+            self._interned.move_to_end(formula)
+            return sub_formula
+
+        if isinstance(
+            formula, (ConjunctiveFormula, DisjunctiveFormula, NegatedFormula)
+        ):
+            children = tuple(self._intern(arg) for arg in formula.args)
+        elif isinstance(formula, QuantifiedFormula) and formula.bind_expression is None:
+            children = (self._intern(formula.inner_formula),)
+        else:
+            children = ()
+
+        sub_formula = _SubFormula(
+            key=self._next_key,
+            formula=formula,
+            children=children,
+            free_variables=tuple(formula.free_variables()),
+        )
+        self._next_key += 1
+        self._interned[formula] = sub_formula
+        if len(self._interned) > self.max_formulas:
+            self._interned.popitem(last=False)
+        return sub_formula
+
+    def _get_trie(self, tree: DerivationTree) -> SubtreesTrie:
+        tree_key = tree.structural_hash()
+        trie = self._tries.get(tree_key)
+        if trie is None:
+            trie = tree.trie()
+            self._tries[tree_key] = trie
+            if len(self._tries) > self.max_tries:
+                self._tries.popitem(last=False)
+        else:
+            self._tries.move_to_end(tree_key)
+        return trie
+
+    def _evaluate(
+        self,
+        sub_formula: _SubFormula,
+        tree_key: int,
+        assignments: Assignments,
+        tree: DerivationTree,
+        trie: SubtreesTrie,
+        graph: gg.GrammarGraph,
+    ) -> ThreeValuedTruth:
+        binding = tuple(
+            assignments[var][0] if var in assignments else None
+            for var in sub_formula.free_variables
+        )
+        key = (sub_formula.key, tree_key, binding)
+        result = self._table.get(key)
+        if result is not None:
+            self._table.move_to_end(key)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = self._compute(sub_formula, tree_key, assignments, tree, trie, graph)
+        self._table[key] = result
+        if len(self._table) > self.max_size:
+            self._table.popitem(last=False)
+        return result
+
+    def _compute(
+        self,
+        sub_formula: _SubFormula,
+        tree_key: int,
+        assignments: Assignments,
+        tree: DerivationTree,
+        trie: SubtreesTrie,
+        graph: gg.GrammarGraph,
+    ) -> ThreeValuedTruth:
+        formula = sub_formula.formula
+
+        def children_results(children, new_assignments):
+            for child, assignment in zip(children, new_assignments):
+                yield self._evaluate(child, tree_key, assignment, tree, trie, graph)
+
+        if isinstance(formula, NegatedFormula):
+            (child,) = sub_formula.children
+            return -self._evaluate(child, tree_key, assignments, tree, trie, graph)
+
+        if isinstance(formula, ConjunctiveFormula):
+            results = children_results(
+                sub_formula.children, [assignments] * len(sub_formula.children)
+            )
+            return _all(results)
+
+        if isinstance(formula, DisjunctiveFormula):
+            results = children_results(
+                sub_formula.children, [assignments] * len(sub_formula.children)
+            )
+            return _any(results)
+
+        if sub_formula.children and formula.in_variable in assignments:
+            (child,) = sub_formula.children
+            in_path, _ = assignments[formula.in_variable]
+            # as in ISLa's evaluate_quantified_formula, outer assignments take
+            # precedence over new bindings
+            new_assignments = [
+                {formula.bound_variable: (in_path + path, subtree)} | assignments
+                for path, subtree in trie.get_subtrie(in_path).values()
+                if subtree.value == formula.bound_variable.n_type
+            ]
+            results = children_results([child] * len(new_assignments), new_assignments)
+            return (
+                _all(results) if isinstance(formula, ForallFormula) else _any(results)
+            )
+
+        return evaluate_legacy(
+            formula, graph.grammar, assignments, tree, trie, graph=graph
+        )
+
+
+def _all(results) -> ThreeValuedTruth:
+    """
+    Three-valued conjunction that stops at the first false result.
+    """
+    unknown = False
+    for result in results:
+        if result.is_false():
+            return result
+        unknown = unknown or result.is_unknown()
+    return ThreeValuedTruth.unknown() if unknown else ThreeValuedTruth.true()
+
+
+def _any(results) -> ThreeValuedTruth:
+    """
+    Three-valued disjunction that stops at the first true result.
+    """
+    unknown = False
+    for result in results:
+        if result.is_true():
+            return result
+        unknown = unknown or result.is_unknown()
+    return ThreeValuedTruth.unknown() if unknown else ThreeValuedTruth.false()
@@ -1,13 +1,19 @@
-from typing import Iterable, Set
+from typing import Iterable, Iterator, Optional, Set
 
 from dbg.core import HypothesisBasedExplainer
 from dbg.logger import LOGGER
 from dbg.explanation.candidate import ExplanationSet
+from dbg.explanation.snapshot import ExplanationSnapshot
 from dbg.types import OracleType, Grammar
 
-from avicenna._generator import AvicennaISLaGrammarBasedGenerator
+from avicenna._generator import (
+    AvicennaISLaGrammarBasedGenerator,
+    AvicennaMutationGenerator,
+)
 from avicenna._data import AvicennaInput
 from avicenna._learning._islearn import OptimizedISLearnLearner
+from avicenna._learning._evaluator import ParallelExplanationEvaluator
+
 # from avicenna.features.feature_collector import GrammarFeatureCollector
 
 
@@ -25,11 +31,31 @@ class Avicenna(HypothesisBasedExplainer):
         min_recall: float = 0.9,
         min_specificity: float = 0.6,
         top_n_relevant_features: int = 3,
+        evaluation_workers: int = 1,
+        use_mutation_generator: bool = False,
+        mutation_seed: Optional[int] = None,
         **kwargs,
     ):
+        """
+        :param use_mutation_generator: Whether to generate the inputs by mutating the
+            known inputs towards the explanations (see AvicennaMutationGenerator)
+            instead of with the grammar-based fuzzer.
+        :param mutation_seed: The seed of the mutation generator.
+        """
         patterns = None
-        learner = OptimizedISLearnLearner(grammar,patterns, min_recall, min_specificity)
-        generator = AvicennaISLaGrammarBasedGenerator(grammar)
+        evaluator = (
+            ParallelExplanationEvaluator(grammar, workers=evaluation_workers)
+            if evaluation_workers > 1
+            else None
+        )
+        learner = OptimizedISLearnLearner(
+            grammar, patterns, min_recall, min_specificity, evaluator=evaluator
+        )
+        generator = (
+            AvicennaMutationGenerator(grammar, graph=learner.graph, seed=mutation_seed)
+            if use_mutation_generator
+            else AvicennaISLaGrammarBasedGenerator(grammar)
+        )
 
         super().__init__(
             grammar,
@@ -62,6 +88,27 @@ class Avicenna(HypothesisBasedExplainer):
             for inp in test_inputs
         }
 
+    def _explain_iter(self, *args, **kwargs) -> Iterator[ExplanationSnapshot]:
+        """
+        Shut down the worker processes of a parallel evaluator when the run ends; the
+        next run starts a new pool.
+        """
+        try:
+            yield from super()._explain_iter(*args, **kwargs)
+        finally:
+            if isinstance(self.learner.evaluator, ParallelExplanationEvaluator):
+                self.learner.evaluator.shutdown()
+
+    def prepare_test_inputs(
+        self, test_inputs: Set[AvicennaInput]
+    ) -> Set[AvicennaInput]:
+        """
+        Use the labeled test inputs as seeds for the mutation-based generator.
+        """
+        if isinstance(self.generator, AvicennaMutationGenerator):
+            self.generator.update_seeds(test_inputs)
+        return test_inputs
+
     # def get_relevant_features(self, test_inputs: Set[AvicennaInput]) -> Set[str]:
     #     """
     #     Get the relevant features based on the test inputs.
@@ -91,7 +138,8 @@ class Avicenna(HypothesisBasedExplainer):
         """
         # irrelevant_features = self.get_irrelevant_features(test_inputs)
         _ = self.learner.learn_explanation(
-            test_inputs# , exclude_nonterminals=irrelevant_features
+            test_inputs,
+            deadline=self.deadline,  # , exclude_nonterminals=irrelevant_features
         )
         explanations = self.learner.get_best_candidates()
         return explanations
@@ -103,5 +151,7 @@ class Avicenna(HypothesisBasedExplainer):
         :return Set[Input]: The generated test inputs.
         """
         LOGGER.info("Generating test inputs.")
-        test_inputs = self.engine.generate(explanations=explanations)
+        test_inputs = self.engine.generate(
+            explanations=explanations, deadline=self.deadline
+        )
         return test_inputs
@@ -0,0 +1,205 @@
+import copy
+import os
+import pickle
+import random
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from dbg.data.input import Input
+from dbg.explanation.candidate import Explanation, ExplanationSet
+from dbg.learner.learner import Learner
+from dbg.logger import LOGGER
+
+
+class CheckpointState:
+    """
+    The state of an explain run restored from a checkpoint.
+    """
+
+    def __init__(
+        self,
+        iteration: int,
+        test_inputs: set[Input],
+        explanations: ExplanationSet,
+        removed_explanations: ExplanationSet,
+        rng_state: Optional[dict],
+    ):
+        self.iteration = iteration
+        self.test_inputs = test_inputs
+        self.explanations = explanations
+        self.removed_explanations = removed_explanations
+        self.rng_state = rng_state
+
+
+def get_rng_state() -> dict:
+    state = {"random": random.getstate()}
+    try:
+        import numpy
+
+        state["numpy"] = numpy.random.get_state()
+    except ImportError:
+        pass
+    return state
+
+
+def set_rng_state(state: dict):
+    random.setstate(state["random"])
+    if "numpy" in state:
+        import numpy
+
+        numpy.random.set_state(state["numpy"])
+
+
+class Checkpointer:
+    """
+    Writes incremental checkpoints of an explain run to a directory. Every checkpoint is
+    a segment file that only holds what changed since the previous segment:
+    - the newly labeled test inputs, which are numbered sequentially across segments;
+    - the explanations that are new to the learner's explanations or removed
+      explanations (stored without their evaluation results);
+    - the new evaluation results of all explanations, as (explanation, input number,
+      result) triples;
+    - the keys of the learner's current and newly removed explanations, the iteration,
+      and the RNG state.
+    Replaying the segments in order restores the state of the last checkpoint.
+    """
+
+    SEGMENT_PREFIX = "segment_"
+
+    def __init__(self, directory: str | Path, every_n_iterations: int = 1):
+        self.directory = Path(directory)
+        self.every_n_iterations = max(1, every_n_iterations)
+        os.makedirs(self.directory, exist_ok=True)
+        self._reset()
+
+    def _reset(self):
+        self.num_segments = 0
+        self.input_ids: dict[Input, int] = {}
+        self.explanations: dict[str, Explanation] = {}
+        self.num_results: dict[str, int] = {}
+        self.removed: set[str] = set()
+
+    @staticmethod
+    def key(explanation: Explanation) -> str:
+        return f"{type(explanation).__qualname__}:{explanation}"
+
+    def segments(self) -> list[Path]:
+        return sorted(
+            path
+            for path in self.directory.iterdir()
+            if path.name.startswith(self.SEGMENT_PREFIX) and path.suffix == ".pkl"
+        )
+
+    def should_checkpoint(self, iteration: int) -> bool:
+        return iteration % self.every_n_iterations == 0
+
+    def save(self, iteration: int, test_inputs: Iterable[Input], learner: Learner):
+        """
+        Write a segment with the changes since the previous checkpoint.
+        :param iteration: The number of the next iteration to run after resuming.
+        :param test_inputs: All labeled test inputs.
+        :param learner: The learner whose explanations and removed explanations are
+            saved.
+        """
+        new_inputs = []
+        for inp in test_inputs:
+            if inp not in self.input_ids:
+                self.input_ids[inp] = len(self.input_ids)
+                new_inputs.append(inp)
+
+        current = list(learner.explanations)
+        removed = list(getattr(learner, "removed_explanations", None) or [])
+        new_explanations, new_results = [], []
+        for explanation in current + removed:
+            key = self.key(explanation)
+            if key not in self.explanations:
+                self.explanations[key] = explanation
+                self.num_results[key] = 0
+                new_explanations.append((key, self._strip(explanation)))
+            new_results.extend(self._new_results(key, explanation))
+        new_removed = [key for key in map(self.key, removed) if key not in self.removed]
+        self.removed.update(new_removed)
+
+        segment = {
+            "iteration": iteration,
+            "inputs": new_inputs,
+            "new_explanations": new_explanations,
+            "results": new_results,
+            "explanations": [self.key(explanation) for explanation in current],
+            "removed_explanations": new_removed,
+            "rng_state": get_rng_state(),
+        }
+        path = self.directory / f"{self.SEGMENT_PREFIX}{self.num_segments:06d}.pkl"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(segment, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.num_segments += 1
+        LOGGER.info(
+            f"Checkpoint {path.name}: {len(new_inputs)} new inputs, "
+            f"{len(new_explanations)} new explanations, {len(new_results)} new results."
+        )
+
+    def _new_results(
+        self, key: str, explanation: Explanation
+    ) -> list[tuple[str, int, bool]]:
+        """
+        Return the evaluation results of the explanation added since the previous
+        checkpoint.
+        Evaluation results are only ever added to the cache, so the new ones are at its
+        end.
+        """
+        entries = list(explanation.cache.items())[self.num_results[key] :]
+        self.num_results[key] = len(explanation.cache)
+        results = []
+        for inp, result in entries:
+            if inp not in self.input_ids:
+                continue
+            results.append((key, self.input_ids[inp], bool(result)))
+        return results
+
+    @staticmethod
+    def _strip(explanation: Explanation) -> Explanation:
+        stripped = copy.copy(explanation)
+        stripped.reset()
+        return stripped
+
+    def load(self) -> Optional[CheckpointState]:
+        """
+        Replay all segments and return the restored state, or None if there is no
+        checkpoint.
+        Afterward, new checkpoints continue the existing segments.
+        """
+        segments = self.segments()
+        if not segments:
+            return None
+
+        self._reset()
+        inputs: list[Input] = []
+        current: list[str] = []
+        segment: dict[str, Any] = {}
+        for path in segments:
+            with open(path, "rb") as f:
+                segment = pickle.load(f)
+            for inp in segment["inputs"]:
+                self.input_ids[inp] = len(inputs)
+                inputs.append(inp)
+            for key, explanation in segment["new_explanations"]:
+                self.explanations[key] = explanation
+                self.num_results[key] = 0
+            for key, input_id, result in segment["results"]:
+                self.explanations[key]._update_eval_results(result, inputs[input_id])
+                self.num_results[key] += 1
+            current = segment["explanations"]
+            self.removed.update(segment["removed_explanations"])
+        self.num_segments = len(segments)
+
+        return CheckpointState(
+            iteration=segment["iteration"],
+            test_inputs=set(inputs),
+            explanations=ExplanationSet([self.explanations[key] for key in current]),
+            removed_explanations=ExplanationSet(
+                [self.explanations[key] for key in self.removed]
+            ),
+            rng_state=segment["rng_state"],
+        )
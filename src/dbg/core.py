@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Union, Iterable, Set, Optional
+from typing import Union, Iterable, Iterator, Generator as GeneratorType, Set, Optional
+from contextlib import contextmanager
+from pathlib import Path
 import time
 
 from dbg.data.input import Input
 from dbg.explanation.candidate import ExplanationSet
+from dbg.explanation.snapshot import ExplanationSnapshot
 from dbg.types import OracleType
 from dbg.learner.learner import Learner
 from dbg.learner.metric import RecallPriorityStringLengthFitness
@@ -11,6 +14,11 @@ from dbg.learner.negation import ExplanationNegation, DefaultExplanationNegation
 from dbg.generator.generator import Generator
 from dbg.generator.engine import Engine, SingleEngine
 from dbg.runner.runner import ExecutionHandler, SingleExecutionHandler
+from dbg.metrics import MetricsRegistry, MetricsSink
+from dbg.profiling import ProfilingHooks
+from dbg.checkpoint import Checkpointer, set_rng_state
+from dbg.stopping import StoppingCriterion
+from dbg.deadline import Deadline
 from dbg.logger import LOGGER, LoggerLevel
 
 
@@ -89,14 +97,110 @@ class HypothesisBasedExplainer(InputExplainer, ABC):
         self.generator: Generator = generator
         self.engine: Engine = SingleEngine(generator)
 
-        self.runner: ExecutionHandler = SingleExecutionHandler(self.oracle)
+        self.metrics: MetricsRegistry = MetricsRegistry()
+        self.metrics_sinks: list[MetricsSink] = []
+        self.profiling: Optional[ProfilingHooks] = None
+        self.checkpointer: Optional[Checkpointer] = None
+        self.stopping_criteria: list[StoppingCriterion] = []
+        self.deadline: Deadline = Deadline()
+        self.runner: ExecutionHandler = SingleExecutionHandler(
+            self.oracle, metrics=self.metrics
+        )
 
     def set_runner(self, runner: ExecutionHandler):
         """
         Set the runner for the hypothesis-based input feature debugger.
         """
+        if runner.metrics is None:
+            runner.metrics = self.metrics
         self.runner = runner
 
+    def add_metrics_sink(self, sink: MetricsSink):
+        """
+        Add a sink that receives the metrics report of every iteration.
+        """
+        self.metrics_sinks.append(sink)
+
+    def add_stopping_criterion(self, criterion: StoppingCriterion):
+        """
+        Add a criterion that can stop the run early, e.g., once the best explanations no
+        longer change.
+        The run stops after the first iteration for which any criterion decides to stop.
+        """
+        self.stopping_criteria.append(criterion)
+
+    def check_stopping_criteria(self, new_test_inputs: Set[Input]) -> bool:
+        """
+        Check whether a stopping criterion decides to stop after the current iteration.
+        All criteria are updated, so that criteria that track several iterations stay
+        consistent.
+        """
+        stopping = [
+            criterion
+            for criterion in self.stopping_criteria
+            if criterion.should_stop(self, new_test_inputs)
+        ]
+        if stopping:
+            LOGGER.info(
+                "Stopping early: %s",
+                ", ".join(type(criterion).__name__ for criterion in stopping),
+            )
+        return bool(stopping)
+
+    def enable_profiling(
+        self,
+        run_directory: str | Path,
+        profiler: Optional[str] = "cprofile",
+        trace_memory: bool = False,
+        **kwargs,
+    ) -> ProfilingHooks:
+        """
+        Profile the phases of every iteration and write the profiles to the run
+        directory.
+        :param run_directory: The directory to write the profiles to.
+        :param profiler: "cprofile", "sampling", or None to only trace memory.
+        :param trace_memory: Whether to take a tracemalloc snapshot after every
+            iteration.
+        :param kwargs: Further options of ProfilingHooks, e.g., the phases or iterations
+            to profile.
+        """
+        self.profiling = ProfilingHooks(
+            run_directory, profiler=profiler, trace_memory=trace_memory, **kwargs
+        )
+        return self.profiling
+
+    @contextmanager
+    def _phase(self, phase: str) -> Iterator[None]:
+        """
+        Time the block as a phase of the current iteration and profile it if profiling
+        is enabled.
+        """
+        with self.metrics.timer(f"phase.{phase}"):
+            if self.profiling is None:
+                yield
+            else:
+                with self.profiling.profile_phase(self.metrics.iteration, phase):
+                    yield
+
+    def report_iteration(self) -> dict:
+        """
+        Close the metrics of the current iteration, log them, and pass them to the
+        sinks.
+        """
+        if self.profiling is not None:
+            self.profiling.snapshot_memory(self.metrics.iteration)
+        report = self.metrics.end_iteration()
+        LOGGER.info(
+            "Iteration %s took %s",
+            report["iteration"],
+            ", ".join(
+                f"{name}: {seconds:.3f}s" for name, seconds in report["timers"].items()
+            ),
+        )
+        for sink in self.metrics_sinks:
+            sink.emit(report, self.metrics)
+        return report
+
     def set_learner(self, learner: Learner):
         """
         Set the learner for the hypothesis-based input feature debugger.
@@ -148,34 +252,210 @@ class HypothesisBasedExplainer(InputExplainer, ABC):
         """
         Explain the input features that result in the failure of a program.
         """
-        iteration = 0
+        return self._explain(self.initial_inputs, iteration=0)
+
+    def explain_iter(
+        self, top_n: int = 10, after_learning: bool = False
+    ) -> Iterator[ExplanationSnapshot]:
+        """
+        Explain the input features that result in the failure of a program, yielding a
+        ranked snapshot of the explanations after every iteration. The consumer can stop
+        the run at any time by no longer iterating (e.g., breaking out of the loop); the
+        run then ends as if it reached its limits.
+        :param top_n: The number of highest ranked explanations in each snapshot.
+        :param after_learning: Whether to also yield a snapshot after the learning phase
+            of every iteration.
+        """
+        return self._explain_iter(self.initial_inputs, 0, top_n, after_learning)
+
+    def resume(self, checkpoint_directory: str | Path) -> ExplanationSet:
+        """
+        Restore the labeled test inputs, the learner's explanations, and the RNG state
+        from the last checkpoint in the directory and continue explaining from the
+        iteration after it.
+        New checkpoints are written to the same directory. If there is no checkpoint,
+        start from scratch.
+        """
+        if self.checkpointer is None or self.checkpointer.directory != Path(
+            checkpoint_directory
+        ):
+            self.enable_checkpointing(checkpoint_directory)
+        state = self.checkpointer.load()
+        if state is None:
+            LOGGER.info(
+                f"No checkpoint in {checkpoint_directory}, starting from scratch."
+            )
+            return self.explain()
+
+        LOGGER.info(
+            f"Resuming at iteration {state.iteration} with "
+            f"{len(state.test_inputs)} test inputs and "
+            f"{len(state.explanations)} explanations."
+        )
+        self.learner.explanations = state.explanations
+        if hasattr(self.learner, "removed_explanations"):
+            self.learner.removed_explanations = state.removed_explanations
+        if state.rng_state is not None:
+            set_rng_state(state.rng_state)
+        self.metrics.iteration = state.iteration
+        return self._explain(state.test_inputs, iteration=state.iteration)
+
+    def enable_checkpointing(
+        self, checkpoint_directory: str | Path, every_n_iterations: int = 1
+    ) -> Checkpointer:
+        """
+        Write an incremental checkpoint to the directory after every n-th iteration.
+        """
+        self.checkpointer = Checkpointer(checkpoint_directory, every_n_iterations)
+        return self.checkpointer
+
+    def _explain(self, test_inputs: Set[Input], iteration: int) -> ExplanationSet:
+        for _ in self._explain_iter(
+            test_inputs, iteration, top_n=0, after_learning=False, snapshots=False
+        ):
+            pass
+        return self.get_best_candidates()
+
+    def _explain_iter(
+        self,
+        test_inputs: Set[Input],
+        iteration: int,
+        top_n: int,
+        after_learning: bool,
+        snapshots: bool = True,
+    ) -> Iterator[ExplanationSnapshot]:
+        """
+        Run the hypothesis loop and yield a snapshot after every iteration (and after
+        every phase if after_learning is set). Without snapshots, the loop runs to the
+        end without yielding, so that explain() does not rank the explanations in every
+        iteration.
+        """
         start_time = self.set_timeout()
+        # the phases of the loop check the deadline, so that a single phase cannot
+        # overrun the timeout
+        self.deadline = Deadline(self.timeout_seconds)
+        run_start_time = time.perf_counter()
         LOGGER.info("Starting the hypothesis-based input feature debugger.")
+        if self.profiling is not None:
+            self.profiling.start()
+        for criterion in self.stopping_criteria:
+            criterion.reset()
         try:
-            test_inputs: Set[Input] = self.initial_inputs
-
-            while self.check_iteration_limits(iteration, start_time):
+            # when resuming, max_iterations includes the iterations before the
+            # checkpoint
+            while (
+                self.check_iteration_limits(iteration, start_time)
+                and not self.deadline.expired()
+            ):
                 LOGGER.info(f"Starting iteration {iteration}.")
-                new_test_inputs = self.hypothesis_loop(test_inputs)
+                if after_learning and snapshots:
+                    steps = self.hypothesis_steps(test_inputs)
+                    try:
+                        while True:
+                            phase = next(steps)
+                            yield self.snapshot(
+                                iteration,
+                                phase,
+                                run_start_time,
+                                len(test_inputs),
+                                top_n,
+                            )
+                    except StopIteration as stop:
+                        new_test_inputs = stop.value
+                else:
+                    new_test_inputs = self.hypothesis_loop(test_inputs)
                 test_inputs.update(new_test_inputs)
-
+                self.report_iteration()
+
+                if (
+                    self.checkpointer is not None
+                    and self.checkpointer.should_checkpoint(iteration + 1)
+                ):
+                    self.checkpointer.save(iteration + 1, test_inputs, self.learner)
+                if snapshots:
+                    yield self.snapshot(
+                        iteration, None, run_start_time, len(test_inputs), top_n
+                    )
                 iteration += 1
+                if self.check_stopping_criteria(new_test_inputs):
+                    break
         except TimeoutError as e:
             LOGGER.error(e)
         except Exception as e:
             LOGGER.error(e)
         finally:
-            return self.get_best_candidates()
+            for sink in self.metrics_sinks:
+                sink.close(self.metrics)
+            if self.profiling is not None:
+                self.profiling.stop()
+
+    def snapshot(
+        self,
+        iteration: int,
+        phase: Optional[str],
+        run_start_time: float,
+        num_test_inputs: int,
+        top_n: int = 10,
+    ) -> ExplanationSnapshot:
+        """
+        Take a ranked snapshot of the learner's explanations.
+        :param run_start_time: The time.perf_counter() value at the start of the run.
+        """
+        return ExplanationSnapshot(
+            iteration=iteration,
+            phase=phase,
+            elapsed_seconds=time.perf_counter() - run_start_time,
+            num_test_inputs=num_test_inputs,
+            best_candidates=self.get_best_candidates(),
+            ranked_candidates=(
+                self.learner.get_ranked_candidates(top_n) if top_n > 0 else []
+            ),
+        )
 
     def hypothesis_loop(self, test_inputs: Set[Input]) -> Set[Input]:
         """
         The main loop of the hypothesis-based input feature debugger.
+        Runs one iteration and returns the labeled new test inputs. Runs that take
+        snapshots after every phase drive hypothesis_steps directly instead.
         """
-        test_inputs = self.prepare_test_inputs(test_inputs)
-        candidates = self.learn_candidates(test_inputs)
-        hypotheses = self.create_hypotheses(candidates)
-        inputs = self.generate_test_inputs(hypotheses)
-        labeled_test_inputs = self.run_test_inputs(inputs)
+        steps = self.hypothesis_steps(test_inputs)
+        try:
+            while True:
+                next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+    def hypothesis_steps(
+        self, test_inputs: Set[Input]
+    ) -> GeneratorType[str, None, Set[Input]]:
+        """
+        Run the phases of the main loop, yielding the name of every phase after which
+        the learner's explanations may have changed, and return the labeled new test
+        inputs.
+        """
+        with self._phase("prepare_test_inputs"):
+            test_inputs = self.prepare_test_inputs(test_inputs)
+        with self._phase("learn_candidates"):
+            candidates = self.learn_candidates(test_inputs)
+        yield "learn_candidates"
+        if self.deadline.expired():
+            LOGGER.info(
+                "The deadline expired after learning, "
+                "skipping the generation of test inputs."
+            )
+            return set()
+        with self._phase("create_hypotheses"):
+            hypotheses = self.create_hypotheses(candidates)
+        with self._phase("generate_test_inputs"):
+            inputs = self.generate_test_inputs(hypotheses)
+        new_inputs = {inp for inp in inputs if inp not in test_inputs}
+        with self._phase("run_test_inputs"):
+            labeled_test_inputs = self.run_test_inputs(new_inputs)
+
+        self.metrics.increment("candidates", len(candidates))
+        self.metrics.increment("hypotheses", len(hypotheses))
+        self.metrics.increment("generated_inputs", len(inputs))
+        self.metrics.increment("duplicate_inputs", len(inputs) - len(new_inputs))
         return labeled_test_inputs
 
     def prepare_test_inputs(self, test_inputs) -> Set[Input]:
@@ -191,7 +471,9 @@ class HypothesisBasedExplainer(InputExplainer, ABC):
         Learn the candidates (failure diagnoses) from the test inputs.
         """
         LOGGER.info("Learning candidates.")
-        explanations = self.learner.learn_explanation(test_inputs)
+        explanations = self.learner.learn_explanation(
+            test_inputs, deadline=self.deadline
+        )
         return explanations
 
     # @abstractmethod
@@ -202,7 +484,9 @@ class HypothesisBasedExplainer(InputExplainer, ABC):
         :return Set[Input]: The generated test inputs.
         """
         LOGGER.info("Generating test inputs.")
-        test_inputs = self.engine.generate(explanations=explanations)
+        test_inputs = self.engine.generate(
+            explanations=explanations, deadline=self.deadline
+        )
         return test_inputs
 
     def create_hypotheses(self, candidates: ExplanationSet) -> ExplanationSet:
@@ -218,7 +502,7 @@ class HypothesisBasedExplainer(InputExplainer, ABC):
         Run the test inputs.
         """
         LOGGER.debug("Running the test inputs.")
-        return self.runner.label(test_inputs=test_inputs)
+        return self.runner.label(test_inputs=test_inputs, deadline=self.deadline)
 
     def get_best_candidates(
         self
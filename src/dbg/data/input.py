@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Generator, Optional, Final, Any
 from dbg.data.oracle import OracleResult
+from dbg.data.serialization import SymbolTable, TreeNode, decode_input, encode_input
 
 
 class Input(ABC):
@@ -102,3 +103,45 @@ class Input(ABC):
         Subclasses must implement this method.
         """
         raise NotImplementedError()
+
+    @staticmethod
+    def tree_node(node: Any) -> TreeNode:
+        """
+        Returns the symbol and the children (None for an open leaf) of a derivation tree
+        node.
+        Subclasses implement this method and make_tree_node to support to_bytes and
+        from_bytes.
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def make_tree_node(symbol: str, children: Optional[list[Any]]) -> Any:
+        """
+        Creates a derivation tree node from a symbol and its children (None for an open
+        leaf).
+        """
+        raise NotImplementedError()
+
+    def to_bytes(self, symbol_table: Optional[SymbolTable] = None) -> bytes:
+        """
+        Encodes the input, i.e., its oracle result and its derivation tree, in a compact
+        binary format.
+        :param SymbolTable symbol_table: An optional symbol table shared with the
+            decoder.
+        :return bytes: The encoded input.
+        """
+        return encode_input(self.oracle, self.tree, self.tree_node, symbol_table)
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes, symbol_table: Optional[SymbolTable] = None
+    ) -> "Input":
+        """
+        Decodes an input encoded by to_bytes.
+        :param bytes data: The encoded input.
+        :param SymbolTable symbol_table: The symbol table the input was encoded against,
+            if any.
+        :return Input: The decoded input.
+        """
+        oracle, tree = decode_input(data, cls.make_tree_node, symbol_table)
+        return cls(tree, oracle)
@@ -0,0 +1,206 @@
+"""
+A compact binary encoding of derivation trees. A tree is stored as a flat preorder
+sequence of (symbol id, number of children) pairs, encoded as unsigned LEB128 varints,
+against a table of the distinct symbols of the tree. The number of children is stored
+plus one, so that 0 marks an open leaf (children None) and 1 a closed leaf (no
+children).
+
+Layout:
+    format byte | [symbol table] | node count | preorder (symbol id, children + 1) pairs
+The format byte is 0 if the symbol table is included in the data, and 1 if the tree is
+encoded against a shared SymbolTable that the decoder must be given as well.
+"""
+
+import re
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from dbg.data.oracle import OracleResult
+
+TreeNode = tuple[str, Optional[Sequence[Any]]]
+
+_INLINE_TABLE = 0
+_SHARED_TABLE = 1
+
+_LABELS: list[Optional[OracleResult]] = [
+    None,
+    OracleResult.PASSING,
+    OracleResult.FAILING,
+    OracleResult.UNDEFINED,
+]
+_LABEL_CODES = {label: code for code, label in enumerate(_LABELS)}
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes | memoryview, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class SymbolTable:
+    """
+    An interned table of symbols shared by encoder and decoder, e.g., all nonterminals
+    and terminals of a grammar. Trees encoded against a shared table do not carry their
+    own symbol table.
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self.symbols: list[str] = []
+        self.ids: dict[str, int] = {}
+        for symbol in symbols:
+            self.intern(symbol)
+
+    @classmethod
+    def from_grammar(cls, grammar: dict[str, list[str]]) -> "SymbolTable":
+        """
+        Create a table of the nonterminals and the terminal tokens of the grammar, in a
+        stable order.
+        Terminal tokens are the maximal parts of an expansion between nonterminals, and
+        their characters.
+        """
+        symbols = []
+        for nonterminal in sorted(grammar):
+            symbols.append(nonterminal)
+            for expansion in grammar[nonterminal]:
+                for token in re.split(r"(<[^<> ]*>)", expansion):
+                    if token and not (token.startswith("<") and token.endswith(">")):
+                        symbols.append(token)
+                        symbols.extend(token)
+        return cls(sorted(set(symbols), key=symbols.index))
+
+    def intern(self, symbol: str) -> int:
+        if symbol not in self.ids:
+            self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self.ids[symbol]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.ids
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+
+def encode_tree(
+    tree: Any,
+    node: Callable[[Any], TreeNode],
+    symbol_table: Optional[SymbolTable] = None,
+) -> bytes:
+    """
+    Encode a derivation tree.
+    :param tree: The root of the tree.
+    :param node: Returns the symbol and the children (None for an open leaf) of a tree
+        node.
+    :param symbol_table: A shared symbol table. If it lacks a symbol of the tree, the
+        tree is encoded with its own symbol table instead.
+    """
+    nodes: list[tuple[str, int]] = []
+    stack = [tree]
+    while stack:
+        symbol, children = node(stack.pop())
+        if children is None:
+            nodes.append((symbol, 0))
+        else:
+            nodes.append((symbol, len(children) + 1))
+            stack.extend(reversed(children))
+
+    out = bytearray()
+    if symbol_table is not None and all(symbol in symbol_table for symbol, _ in nodes):
+        out.append(_SHARED_TABLE)
+        table = symbol_table
+    else:
+        out.append(_INLINE_TABLE)
+        table = SymbolTable(symbol for symbol, _ in nodes)
+        _write_varint(out, len(table))
+        for symbol in table.symbols:
+            encoded = symbol.encode("utf-8")
+            _write_varint(out, len(encoded))
+            out += encoded
+
+    _write_varint(out, len(nodes))
+    ids = table.ids
+    for symbol, num_children in nodes:
+        _write_varint(out, ids[symbol])
+        _write_varint(out, num_children)
+    return bytes(out)
+
+
+def decode_tree(
+    data: bytes | memoryview,
+    make_node: Callable[[str, Optional[list[Any]]], Any],
+    symbol_table: Optional[SymbolTable] = None,
+) -> Any:
+    """
+    Decode a derivation tree encoded by encode_tree.
+    :param data: The encoded tree.
+    :param make_node: Creates a tree node from a symbol and its children (None for an
+        open leaf).
+    :param symbol_table: The shared symbol table the tree was encoded against, if any.
+    """
+    data = memoryview(data)
+    pos = 1
+    if data[0] == _SHARED_TABLE:
+        if symbol_table is None:
+            raise ValueError("The tree was encoded against a shared symbol table.")
+        symbols = symbol_table.symbols
+    else:
+        num_symbols, pos = _read_varint(data, pos)
+        symbols = []
+        for _ in range(num_symbols):
+            length, pos = _read_varint(data, pos)
+            symbols.append(bytes(data[pos : pos + length]).decode("utf-8"))
+            pos += length
+
+    num_nodes, pos = _read_varint(data, pos)
+    flat: list[tuple[str, int]] = []
+    for _ in range(num_nodes):
+        symbol_id, pos = _read_varint(data, pos)
+        num_children, pos = _read_varint(data, pos)
+        flat.append((symbols[symbol_id], num_children))
+
+    # Build the nodes bottom-up: in reversed preorder, the children of a node are the
+    # last nodes built before it.
+    built: list[Any] = []
+    for symbol, num_children in reversed(flat):
+        if num_children == 0:
+            built.append(make_node(symbol, None))
+            continue
+        children = [built.pop() for _ in range(num_children - 1)]
+        built.append(make_node(symbol, children))
+    assert len(built) == 1
+    return built[0]
+
+
+def encode_input(
+    oracle: Optional[OracleResult],
+    tree: Any,
+    node: Callable[[Any], TreeNode],
+    symbol_table: Optional[SymbolTable] = None,
+) -> bytes:
+    """
+    Encode the oracle result and the derivation tree of an input.
+    """
+    return bytes([_LABEL_CODES[oracle]]) + encode_tree(tree, node, symbol_table)
+
+
+def decode_input(
+    data: bytes,
+    make_node: Callable[[str, Optional[list[Any]]], Any],
+    symbol_table: Optional[SymbolTable] = None,
+) -> tuple[Optional[OracleResult], Any]:
+    """
+    Decode the oracle result and the derivation tree of an input encoded by
+    encode_input.
+    """
+    return _LABELS[data[0]], decode_tree(memoryview(data)[1:], make_node, symbol_table)
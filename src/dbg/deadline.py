@@ -0,0 +1,66 @@
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised by Deadline.check once the deadline has expired or was cancelled.
+    """
+
+
+class Deadline:
+    """
+    A deadline and cancellation token for an explain run. The explainer passes it to
+    every phase of the loop (learning, generation, and execution), which check it
+    between units of work and return their partial results once it has expired.
+    Cancelling the deadline, e.g., from another thread, makes it expire immediately.
+    The deadline is measured with time.monotonic and can be passed to worker processes
+    on the same machine.
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        """
+        :param timeout_seconds: The number of seconds from now until the deadline
+            expires, or None for no deadline.
+        """
+        self.expires_at: Optional[float] = (
+            time.monotonic() + timeout_seconds if timeout_seconds is not None else None
+        )
+        self.cancelled = False
+
+    def __repr__(self):
+        return (
+            f"Deadline(remaining_seconds={self.remaining_seconds()}, "
+            f"cancelled={self.cancelled})"
+        )
+
+    def cancel(self):
+        self.cancelled = True
+
+    def remaining_seconds(self) -> Optional[float]:
+        """
+        Return the number of seconds until the deadline expires (0 once it has expired),
+        or None if there is no deadline.
+        """
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining_seconds() == 0.0
+
+    def check(self):
+        """
+        Raise DeadlineExceeded if the deadline has expired.
+        """
+        if self.expired():
+            raise DeadlineExceeded("The deadline of the run has expired.")
+
+    @staticmethod
+    def has_expired(deadline: Optional["Deadline"]) -> bool:
+        """
+        Return whether the deadline has expired; None stands for no deadline.
+        """
+        return deadline is not None and deadline.expired()
@@ -1,7 +1,12 @@
+import hashlib
+import heapq
+import itertools
+import weakref
 from abc import ABC, abstractmethod
-from typing import Optional, Generic, TypeVar
+from typing import Any, Callable, Iterable, Optional, Generic, TypeVar
 
 from dbg.data.input import Input
+from dbg.data.oracle import OracleResult
 
 
 class Explanation(ABC):
@@ -11,32 +16,132 @@ class Explanation(ABC):
 
     def __init__(self, explanation):
         self.explanation = explanation
-        self.__hash = hash(str(self.explanation))
+        self._hash: Optional[tuple[Any, int]] = None
+        self._length: Optional[tuple[Any, int]] = None
 
         self.failing_inputs_eval_results = []
         self.passing_inputs_eval_results = []
         self.cache: dict[Input, bool] = {}
+        self._true_positives = 0
+        self._false_positives = 0
+        self._listeners: weakref.WeakSet = weakref.WeakSet()
+        self._fingerprint: Optional[tuple[Any, str]] = None
+
+    def fingerprint(self) -> str:
+        """
+        Return a fingerprint of the explanation, which is computed once per explanation
+        object.
+        Explanations with the same fingerprint are considered equivalent, e.g., by
+        ExplanationSet.
+        Subclasses may fingerprint a canonical form of the explanation, so that
+        equivalent explanations that differ syntactically share a fingerprint.
+        """
+        if self._fingerprint is None or self._fingerprint[0] is not self.explanation:
+            self._fingerprint = self.explanation, self._compute_fingerprint()
+        return self._fingerprint[1]
+
+    def _compute_hash(self) -> int:
+        """
+        Hash the explanation structurally, without converting it to a string.
+        Explanations that are not hashable are hashed by their string representation.
+        """
+        try:
+            return hash(self.explanation)
+        except TypeError:
+            return hash(str(self.explanation))
+
+    def _compute_fingerprint(self) -> str:
+        return hashlib.sha1(
+            f"{type(self).__qualname__}\x00{self}".encode("utf-8")
+        ).hexdigest()
 
     @abstractmethod
     def evaluate(self, test_inputs: set[Input], *args, **kwargs):
         pass
 
+    def _update_eval_results(self, eval_result: bool, inp: Input):
+        """
+        Record the evaluation result of an input.
+        """
+        if inp.oracle == OracleResult.FAILING:
+            self.failing_inputs_eval_results.append(eval_result)
+            self._true_positives += int(eval_result)
+        else:
+            self.passing_inputs_eval_results.append(eval_result)
+            self._false_positives += int(eval_result)
+        self.cache[inp] = eval_result
+        self._results_changed()
+
+    def _set_eval_results(
+        self,
+        failing_inputs_eval_results: list[bool],
+        passing_inputs_eval_results: list[bool],
+        cache: dict[Input, bool],
+    ):
+        """
+        Replace the evaluation results, e.g., with results derived from other
+        explanations.
+        """
+        self.failing_inputs_eval_results = failing_inputs_eval_results
+        self.passing_inputs_eval_results = passing_inputs_eval_results
+        self.cache = cache
+        self._true_positives = sum(map(int, failing_inputs_eval_results))
+        self._false_positives = sum(map(int, passing_inputs_eval_results))
+        self._results_changed()
+
+    def confusion_counts(self) -> tuple[int, int, int, int]:
+        """
+        Return the numbers of true positives, false positives, true negatives and false
+        negatives.
+        The counts are updated with each evaluation result, so this takes constant time.
+        """
+        tp, fp = self._true_positives, self._false_positives
+        return (
+            tp,
+            fp,
+            len(self.passing_inputs_eval_results) - fp,
+            len(self.failing_inputs_eval_results) - tp,
+        )
+
+    def _results_changed(self):
+        """
+        Notify the rankings that contain the explanation that its evaluation results
+        changed.
+        """
+        for listener in list(self._listeners):
+            listener.invalidate(self)
+
+    def __getstate__(self):
+        # rankings are local to a process and are not copied with the explanation
+        state = self.__dict__.copy()
+        state.pop("_listeners", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_fingerprint", None)
+        self.__dict__.setdefault("_length", None)
+        if "_hash" not in state:
+            # keep the hash of explanations pickled before it was computed lazily
+            self._hash = self.explanation, self.__dict__.pop("_Explanation__hash")
+        self._listeners = weakref.WeakSet()
+        if "_true_positives" not in state:
+            self._true_positives = sum(map(int, self.failing_inputs_eval_results))
+            self._false_positives = sum(map(int, self.passing_inputs_eval_results))
+
     def recall(self) -> float:
         """
         Return the recall of the candidate.
         """
         if len(self.failing_inputs_eval_results) == 0:
             return 0.0
-        return sum(int(entry) for entry in self.failing_inputs_eval_results) / len(
-            self.failing_inputs_eval_results
-        )
+        return self._true_positives / len(self.failing_inputs_eval_results)
 
     def precision(self) -> float:
         """
         Return the precision of the candidate.
         """
-        tp = sum(int(entry) for entry in self.failing_inputs_eval_results)
-        fp = sum(int(entry) for entry in self.passing_inputs_eval_results)
+        tp, fp = self._true_positives, self._false_positives
         return tp / (tp + fp) if tp + fp > 0 else 0.0
 
     def specificity(self) -> float:
@@ -45,15 +150,20 @@ class Explanation(ABC):
         """
         if len(self.passing_inputs_eval_results) == 0:
             return 0.0
-        return sum(not int(entry) for entry in self.passing_inputs_eval_results) / len(
-            self.passing_inputs_eval_results
-        )
+        passing = len(self.passing_inputs_eval_results)
+        return (passing - self._false_positives) / passing
 
     def __hash__(self):
-        return self.__hash
+        # the hash and the length are computed on first use, and again if the
+        # explanation is replaced
+        if self._hash is None or self._hash[0] is not self.explanation:
+            self._hash = self.explanation, self._compute_hash()
+        return self._hash[1]
 
     def __len__(self):
-        return len(str(self.explanation))
+        if self._length is None or self._length[0] is not self.explanation:
+            self._length = self.explanation, len(str(self.explanation))
+        return self._length[1]
 
     def __repr__(self):
         """
@@ -83,24 +193,151 @@ class Explanation(ABC):
         pass
 
     def reset(self):
-        self.failing_inputs_eval_results = []
-        self.passing_inputs_eval_results = []
-        self.cache = {}
+        self._set_eval_results([], [], {})
 
 
 T = TypeVar("T", bound=Explanation)
 
+
+def _descending(key: Any) -> tuple:
+    """
+    Return a heap key that orders fitness keys (numbers or tuples of numbers) in
+    descending order.
+    """
+    if isinstance(key, tuple):
+        return tuple(-value for value in key)
+    return (-key,)
+
+
+class ExplanationRanking(Generic[T]):
+    """
+    Ranks explanations by a fitness key, e.g., FitnessStrategy.evaluate, in descending
+    order.
+    The explanations are kept in a max-heap with their cached keys. A key is only
+    recomputed when the evaluation results of its explanation change (the explanation
+    notifies the ranking), and outdated heap entries are discarded lazily, so that the
+    top tier is found without sorting all explanations.
+    """
+
+    def __init__(self, key: Callable[[T], Any], explanations: Iterable[T] = ()):
+        self.key = key
+        self._explanations: dict[int, T] = {}
+        self._entries: dict[int, int] = {}
+        self._invalidated: dict[int, T] = {}
+        self._heap: list[tuple[tuple, int, int]] = []
+        self._counter = itertools.count()
+
+        for explanation in explanations:
+            self._explanations[hash(explanation)] = explanation
+            explanation._listeners.add(self)
+            self._heap.append(self._entry(explanation))
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._explanations)
+
+    def _entry(self, explanation: T) -> tuple[tuple, int, int]:
+        explanation_hash, entry_id = hash(explanation), next(self._counter)
+        self._entries[explanation_hash] = entry_id
+        return _descending(self.key(explanation)), entry_id, explanation_hash
+
+    def _is_current(self, entry: tuple[tuple, int, int]) -> bool:
+        return self._entries.get(entry[2]) == entry[1]
+
+    def add(self, explanation: T):
+        explanation_hash = hash(explanation)
+        if explanation_hash in self._explanations:
+            return
+        self._explanations[explanation_hash] = explanation
+        explanation._listeners.add(self)
+        heapq.heappush(self._heap, self._entry(explanation))
+
+    def discard(self, explanation: T):
+        explanation_hash = hash(explanation)
+        removed = self._explanations.pop(explanation_hash, None)
+        if removed is not None:
+            removed._listeners.discard(self)
+            self._invalidated.pop(explanation_hash, None)
+            del self._entries[explanation_hash]
+
+    def invalidate(self, explanation: T):
+        """
+        Mark the cached key of the explanation as outdated.
+        """
+        explanation_hash = hash(explanation)
+        if explanation_hash in self._explanations:
+            self._invalidated[explanation_hash] = explanation
+
+    def _update(self):
+        for explanation in self._invalidated.values():
+            heapq.heappush(self._heap, self._entry(explanation))
+        self._invalidated.clear()
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [entry for entry in self._heap if self._is_current(entry)]
+            heapq.heapify(self._heap)
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def top(self) -> list[T]:
+        """
+        Return the explanations that share the highest key.
+        """
+        self._update()
+        if not self._heap:
+            return []
+        best_key = self._heap[0][0]
+        return self._pop_while(lambda entries: self._heap[0][0] == best_key)
+
+    def ranked(self, n: Optional[int] = None) -> list[T]:
+        """
+        Return the n explanations with the highest keys (all if n is None), in
+        descending order.
+        Only the n best entries are popped from the heap, so that the top n are found in
+        O(n log m).
+        """
+        self._update()
+        if n is None:
+            entries = sorted(entry for entry in self._heap if self._is_current(entry))
+            return [self._explanations[entry[2]] for entry in entries]
+        return self._pop_while(lambda entries: len(entries) < n)
+
+    def _pop_while(self, condition: Callable[[list], bool]) -> list[T]:
+        """
+        Pop the current entries from the heap in descending order while the condition on
+        the popped entries holds, push them back and return their explanations. Outdated
+        entries are dropped.
+        """
+        popped = []
+        while self._heap and condition(popped):
+            entry = heapq.heappop(self._heap)
+            if self._is_current(entry):
+                popped.append(entry)
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        return [self._explanations[entry[2]] for entry in popped]
+
+
 class ExplanationSet(Generic[T]):
     def __init__(self, explanations: Optional[list[T]] = None):
         self.explanation_hashes: dict[int, int] = {}
         self.explanations: list[T] = []
+        self._ranking: Optional[ExplanationRanking[T]] = None
+        self._fingerprints: dict[str, int] = {}
+        self.extend(explanations or [])
 
-        explanations = explanations or []
-        for idx, explanation in enumerate(explanations):
-            explanation_hash = hash(explanation)
-            if explanation_hash not in self.explanation_hashes:
-                self.explanation_hashes[explanation_hash] = idx
-                self.explanations.append(explanation)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_ranking"] = None
+        return state
+
+    def ranking(self, key: Callable[[T], Any]) -> ExplanationRanking[T]:
+        """
+        Return the ranking of the explanations by the key, which is kept up to date as
+        explanations are appended or removed, or their evaluation results change.
+        """
+        if self._ranking is None or self._ranking.key != key:
+            self._ranking = ExplanationRanking(key, self.explanations)
+        return self._ranking
 
     def __repr__(self) -> str:
         return f"ExplanationSet({repr(self.explanations)})"
@@ -114,20 +351,87 @@ class ExplanationSet(Generic[T]):
     def __iter__(self):
         return iter(self.explanations)
 
+    def __contains__(self, candidate: T) -> bool:
+        return (
+            hash(candidate) in self.explanation_hashes
+            or candidate.fingerprint() in self._fingerprints
+        )
+
     def __add__(self, other: "ExplanationSet[T]") -> "ExplanationSet[T]":
         return ExplanationSet(self.explanations + other.explanations)
 
+    def get(self, fingerprint: str) -> Optional[T]:
+        """
+        Return the explanation with the given fingerprint (see Explanation.fingerprint),
+        if any.
+        """
+        explanation_hash = self._fingerprints.get(fingerprint)
+        if explanation_hash is None:
+            return None
+        return self.explanations[self.explanation_hashes[explanation_hash]]
+
     def append(self, candidate: T) -> None:
+        """
+        Append the candidate, unless the set already contains it or an explanation with
+        the same fingerprint.
+        """
         candidate_hash = hash(candidate)
-        if candidate_hash not in self.explanation_hashes:
-            self.explanation_hashes[candidate_hash] = len(self.explanations)
-            self.explanations.append(candidate)
+        if candidate_hash in self.explanation_hashes:
+            return
+        fingerprint = candidate.fingerprint()
+        if fingerprint in self._fingerprints:
+            return
+        self.explanation_hashes[candidate_hash] = len(self.explanations)
+        self.explanations.append(candidate)
+        self._fingerprints[fingerprint] = candidate_hash
+        if self._ranking is not None:
+            self._ranking.add(candidate)
+
+    def extend(self, candidates: Iterable[T]) -> None:
+        for candidate in candidates:
+            self.append(candidate)
+
+    def difference(self, other: Iterable[T]) -> "ExplanationSet[T]":
+        """
+        Return the explanations that are not in other, in the order of this set.
+        """
+        other = (
+            other if isinstance(other, ExplanationSet) else ExplanationSet(list(other))
+        )
+        return ExplanationSet(
+            [
+                explanation
+                for explanation in self.explanations
+                if explanation not in other
+            ]
+        )
+
+    def intersection(self, other: Iterable[T]) -> "ExplanationSet[T]":
+        """
+        Return the explanations that are also in other, in the order of this set.
+        """
+        other = (
+            other if isinstance(other, ExplanationSet) else ExplanationSet(list(other))
+        )
+        return ExplanationSet(
+            [explanation for explanation in self.explanations if explanation in other]
+        )
 
     def remove(self, candidate: T) -> None:
+        """
+        Remove the candidate or the explanation with the same fingerprint, if any.
+        """
         candidate_hash = hash(candidate)
-        if candidate_hash in self.explanation_hashes:
-            last_elem, idx = self.explanations[-1], self.explanation_hashes[candidate_hash]
-            self.explanations[idx] = last_elem
-            self.explanation_hashes[hash(last_elem)] = idx
-            self.explanations.pop()
-            del self.explanation_hashes[candidate_hash]
\ No newline at end of file
+        if candidate_hash not in self.explanation_hashes:
+            candidate_hash = self._fingerprints.get(candidate.fingerprint())
+            if candidate_hash is None:
+                return
+        last_elem, idx = self.explanations[-1], self.explanation_hashes[candidate_hash]
+        removed = self.explanations[idx]
+        self.explanations[idx] = last_elem
+        self.explanation_hashes[hash(last_elem)] = idx
+        self.explanations.pop()
+        del self.explanation_hashes[candidate_hash]
+        del self._fingerprints[removed.fingerprint()]
+        if self._ranking is not None:
+            self._ranking.discard(removed)
@@ -0,0 +1,88 @@
+from typing import Iterable, NamedTuple, Optional
+
+from dbg.explanation.candidate import Explanation, ExplanationSet
+
+
+class ExplanationMetrics(NamedTuple):
+    explanation: Explanation
+    precision: float
+    recall: float
+    specificity: float
+
+    @classmethod
+    def of(cls, explanation: Explanation) -> "ExplanationMetrics":
+        return cls(
+            explanation,
+            explanation.precision(),
+            explanation.recall(),
+            explanation.specificity(),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "explanation": str(self.explanation),
+            "precision": self.precision,
+            "recall": self.recall,
+            "specificity": self.specificity,
+        }
+
+
+class ExplanationSnapshot:
+    """
+    A ranked snapshot of the explanations of an explain run, taken after an iteration or
+    after a phase of it.
+    The metrics of the explanations are copied when the snapshot is taken, so that later
+    iterations do not change them.
+    """
+
+    def __init__(
+        self,
+        iteration: int,
+        phase: Optional[str],
+        elapsed_seconds: float,
+        num_test_inputs: int,
+        best_candidates: Iterable[Explanation],
+        ranked_candidates: Iterable[Explanation] = (),
+    ):
+        """
+        :param iteration: The iteration the snapshot was taken in.
+        :param phase: The phase after which the snapshot was taken, or None at the end
+            of the iteration.
+        :param elapsed_seconds: The time since the start of the run.
+        :param num_test_inputs: The number of labeled test inputs.
+        :param best_candidates: The explanations sharing the highest fitness.
+        :param ranked_candidates: The highest ranked explanations, in descending order.
+        """
+        self.iteration = iteration
+        self.phase = phase
+        self.elapsed_seconds = elapsed_seconds
+        self.num_test_inputs = num_test_inputs
+        self.best = [
+            ExplanationMetrics.of(explanation) for explanation in best_candidates
+        ]
+        self.ranked = [
+            ExplanationMetrics.of(explanation) for explanation in ranked_candidates
+        ]
+
+    @property
+    def best_candidates(self) -> ExplanationSet:
+        return ExplanationSet([entry.explanation for entry in self.best])
+
+    def __repr__(self):
+        best = self.best[0] if self.best else None
+        return (
+            f"ExplanationSnapshot(iteration={self.iteration}, phase={self.phase}, "
+            f"best={str(best.explanation) if best else None}, "
+            f"precision={best.precision if best else None}, "
+            f"recall={best.recall if best else None})"
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "iteration": self.iteration,
+            "phase": self.phase,
+            "elapsed_seconds": self.elapsed_seconds,
+            "num_test_inputs": self.num_test_inputs,
+            "best_candidates": [entry.to_dict() for entry in self.best],
+            "ranked_candidates": [entry.to_dict() for entry in self.ranked],
+        }
@@ -0,0 +1,87 @@
+from typing import Iterable, Optional
+
+from dbg.data.input import Input
+from dbg.data.oracle import OracleResult
+from dbg.explanation.candidate import Explanation
+
+
+class TruthTable:
+    """
+    Represents the evaluation results of explanations on a fixed set of inputs as bit
+    vectors.
+    Each input is assigned one bit; the row of an explanation has the bit of every input
+    set on which the explanation holds. Conjunctions and disjunctions of explanations
+    can then be scored by bitwise AND and OR without evaluating them again.
+    """
+
+    def __init__(self, test_inputs: Iterable[Input]):
+        self.inputs: list[Input] = list(test_inputs)
+        self.index: dict[Input, int] = {inp: idx for idx, inp in enumerate(self.inputs)}
+
+        self.failing_mask = 0
+        for idx, inp in enumerate(self.inputs):
+            if inp.oracle == OracleResult.FAILING:
+                self.failing_mask |= 1 << idx
+        self.passing_mask = ((1 << len(self.inputs)) - 1) & ~self.failing_mask
+        self.num_failing = self.failing_mask.bit_count()
+        self.num_passing = self.passing_mask.bit_count()
+
+        self._rows: dict[Explanation, int] = {}
+
+    @classmethod
+    def from_explanations(cls, explanations: Iterable[Explanation]) -> "TruthTable":
+        """
+        Create a truth table over the inputs all given explanations have been evaluated
+        on.
+        """
+        common_inputs: Optional[set[Input]] = None
+        for explanation in explanations:
+            if common_inputs is None:
+                common_inputs = set(explanation.cache.keys())
+            else:
+                common_inputs.intersection_update(explanation.cache.keys())
+        return cls(common_inputs or set())
+
+    def row(self, explanation: Explanation) -> int:
+        """
+        Return the bit vector of the inputs the explanation holds on.
+        """
+        row = self._rows.get(explanation)
+        if row is None:
+            row = 0
+            for inp, idx in self.index.items():
+                if explanation.cache[inp]:
+                    row |= 1 << idx
+            self._rows[explanation] = row
+        return row
+
+    def true_positives(self, row: int) -> int:
+        return (row & self.failing_mask).bit_count()
+
+    def false_positives(self, row: int) -> int:
+        return (row & self.passing_mask).bit_count()
+
+    def recall(self, row: int) -> float:
+        """
+        Return the recall of a row, i.e., the fraction of failing inputs it holds on.
+        """
+        if self.num_failing == 0:
+            return 0.0
+        return self.true_positives(row) / self.num_failing
+
+    def precision(self, row: int) -> float:
+        """
+        Return the precision of a row.
+        """
+        tp = self.true_positives(row)
+        fp = self.false_positives(row)
+        return tp / (tp + fp) if tp + fp > 0 else 0.0
+
+    def specificity(self, row: int) -> float:
+        """
+        Return the specificity of a row, i.e., the fraction of passing inputs it does
+        not hold on.
+        """
+        if self.num_passing == 0:
+            return 0.0
+        return (self.num_passing - self.false_positives(row)) / self.num_passing
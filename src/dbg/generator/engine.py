@@ -1,11 +1,57 @@
 from queue import Queue
 from threading import Thread
+from queue import Empty
 from multiprocessing import Process, Queue as ProcessQueue, Manager
+from typing import Optional
 
+from dbg.data.input import Input
+from dbg.deadline import Deadline
+from dbg.data.serialization import SymbolTable
 from dbg.explanation.candidate import ExplanationSet
 from dbg.generator.generator import Generator
 
 
+def _encode_inputs(
+    test_inputs: set[Input], symbol_table: Optional[SymbolTable]
+) -> list:
+    """
+    Encode the inputs with Input.to_bytes, which is much smaller and faster to transfer
+    between processes than pickled derivation trees. Inputs that do not support it are
+    passed as they are.
+    """
+    encoded = []
+    for inp in test_inputs:
+        try:
+            encoded.append((type(inp), inp.to_bytes(symbol_table)))
+        except NotImplementedError:
+            encoded.append((None, inp))
+    return encoded
+
+
+def _decode_inputs(encoded: list, symbol_table: Optional[SymbolTable]) -> set[Input]:
+    return {
+        input_type.from_bytes(data, symbol_table) if input_type is not None else data
+        for input_type, data in encoded
+    }
+
+
+def _run_encoding_worker(
+    generator: Generator,
+    candidate_queue,
+    output_list,
+    symbol_table: Optional[SymbolTable],
+    deadline: Optional[Deadline] = None,
+):
+    try:
+        while not Deadline.has_expired(deadline):
+            test_inputs = generator.generate_test_inputs(
+                explanation=candidate_queue.get_nowait(), deadline=deadline
+            )
+            output_list.append(_encode_inputs(test_inputs, symbol_table))
+    except Empty:
+        pass
+
+
 class Engine:
 
     def __init__(
@@ -23,30 +69,46 @@ class Engine:
     def _check_generator_compatability(self):
         pass
 
-    def generate(self, explanations: ExplanationSet):
+    def generate(
+        self, explanations: ExplanationSet, deadline: Optional[Deadline] = None
+    ):
         pass
 
 
 class SingleEngine(Engine):
 
-    def generate(self, explanations: ExplanationSet):
+    def generate(
+        self, explanations: ExplanationSet, deadline: Optional[Deadline] = None
+    ):
         """
         Generate new inputs for the given candidates.
         :param ExplanationSet explanations: The candidates to generate new inputs for.
+        :param Deadline deadline: The deadline after which the inputs generated so far
+            are returned.
         :return:
         """
         new_test_inputs = set()
         for explanation in explanations:
-            new_test_inputs.update(self.generator.generate_test_inputs(explanation=explanation))
+            if Deadline.has_expired(deadline):
+                break
+            new_test_inputs.update(
+                self.generator.generate_test_inputs(
+                    explanation=explanation, deadline=deadline
+                )
+            )
         return new_test_inputs
 
 
 class ParallelEngine(Engine):
 
-    def generate(self, explanations: ExplanationSet):
+    def generate(
+        self, explanations: ExplanationSet, deadline: Optional[Deadline] = None
+    ):
         """
         Generate new inputs for the given candidates in parallel.
         :param ExplanationSet explanations: The candidates to generate new inputs for.
+        :param Deadline deadline: The deadline after which the workers take no further
+            candidates.
         :return:
         """
 
@@ -56,7 +118,10 @@ class ParallelEngine(Engine):
         for candidate in explanations:
             candidate_queue.put(candidate)
         for worker in self.workers:
-            thread = Thread(target=worker.run_with_engine, args=(candidate_queue, output_queue))
+            thread = Thread(
+                target=worker.run_with_engine,
+                args=(candidate_queue, output_queue, deadline),
+            )
             thread.start()
             threads.append(thread)
         for thread in threads:
@@ -70,11 +135,28 @@ class ParallelEngine(Engine):
 
 
 class ProcessBasedParallelEngine(Engine):
-
-    def generate(self, explanations: ExplanationSet):
+    """
+    Generates inputs in separate processes. The workers send the generated inputs back
+    in the compact binary encoding of Input.to_bytes, encoded against a symbol table of
+    the generator's grammar.
+    Workers that are still running termination_grace_seconds after the deadline are
+    terminated, and only the inputs they sent back before are returned.
+    """
+
+    termination_grace_seconds: float = 1.0
+
+    def _symbol_table(self) -> Optional[SymbolTable]:
+        grammar = getattr(self.generator, "grammar", None)
+        return SymbolTable.from_grammar(grammar) if isinstance(grammar, dict) else None
+
+    def generate(
+        self, explanations: ExplanationSet, deadline: Optional[Deadline] = None
+    ):
         """
         Generate new inputs for the given candidates in parallel.
         :param ExplanationSet explanations: The candidates to generate new inputs for.
+        :param Deadline deadline: The deadline after which the workers take no further
+            candidates.
         :return:
         """
         processes = []
@@ -82,17 +164,31 @@ class ProcessBasedParallelEngine(Engine):
         manager = Manager()
         output_list = manager.list()  # Using Manager list to share data between processes
 
+        symbol_table = self._symbol_table()
+
         for candidate in explanations:
             candidate_queue.put(candidate)
 
         for worker in self.workers:
-            process = Process(target=worker.run_with_engine, args=(candidate_queue, output_list))
+            process = Process(
+                target=_run_encoding_worker,
+                args=(worker, candidate_queue, output_list, symbol_table, deadline),
+            )
             process.start()
             processes.append(process)
         for process in processes:
-            process.join()
+            remaining_seconds = (
+                deadline.remaining_seconds() if deadline is not None else None
+            )
+            if remaining_seconds is None:
+                process.join()
+                continue
+            process.join(remaining_seconds + self.termination_grace_seconds)
+            if process.is_alive():
+                process.terminate()
+                process.join()
 
         test_inputs = set()
         for output in output_list:
-            test_inputs.update(output)
+            test_inputs.update(_decode_inputs(output, symbol_table))
         return test_inputs
@@ -1,9 +1,10 @@
 import time
 from abc import ABC, abstractmethod
 from queue import Queue, Empty
-from typing import Set, Union, List
+from typing import Optional, Set, Union, List
 
 from dbg.data.input import Input
+from dbg.deadline import Deadline
 from dbg.explanation.candidate import Explanation
 from dbg.data.grammar import AbstractGrammar
 
@@ -26,27 +27,41 @@ class Generator(ABC):
         """
         raise NotImplementedError
 
-    def generate_test_inputs(self, num_inputs: int = 2, **kwargs) -> Set[Input]:
+    def generate_test_inputs(
+        self, num_inputs: int = 2, deadline: Optional[Deadline] = None, **kwargs
+    ) -> Set[Input]:
         """
         Generate multiple inputs to be used in the debugging process.
+        If the deadline expires, the inputs generated so far are returned.
         """
         test_inputs = set()
         for _ in range(num_inputs):
+            if Deadline.has_expired(deadline):
+                break
             inp = self.generate(**kwargs)
             if inp:
                 test_inputs.add(inp)
         return test_inputs
 
-    def run_with_engine(self, candidate_queue: Queue[Explanation], output_queue: Union[Queue, List]):
+    def run_with_engine(
+        self,
+        candidate_queue: Queue[Explanation],
+        output_queue: Union[Queue, List],
+        deadline: Optional[Deadline] = None,
+    ):
         """
         Run the generator within an engine. This is useful for parallelizing the generation process.
         :param candidate_queue:
         :param output_queue:
+        :param deadline: The deadline after which no further candidates are taken from
+            the queue.
         :return:
         """
         try:
-            while True:
-                test_inputs = self.generate_test_inputs(explanation=candidate_queue.get_nowait())
+            while not Deadline.has_expired(deadline):
+                test_inputs = self.generate_test_inputs(
+                    explanation=candidate_queue.get_nowait(), deadline=deadline
+                )
                 if isinstance(output_queue, Queue):
                     output_queue.put(test_inputs)
                 else:
@@ -1,7 +1,7 @@
 from typing import List, Iterable, Optional
 from abc import ABC, abstractmethod
 
-from dbg.explanation.candidate import ExplanationSet, Explanation
+from dbg.explanation.candidate import ExplanationSet, Explanation, ExplanationRanking
 from dbg.learner.metric import FitnessStrategy, RecallPriorityLengthFitness
 from dbg.data.input import Input
 
@@ -21,6 +21,8 @@ class Learner(ABC):
         """
         Learn the candidates based on the test inputs.
         :param test_inputs: The test inputs to learn the candidates from.
+        :param kwargs: Further options, e.g., the deadline (a dbg.deadline.Deadline) of
+            the run, after which a learner should return the candidates learned so far.
         :return Optional[List[Candidate]]: The learned candidates.
         """
         raise NotImplementedError()
@@ -37,13 +39,22 @@ class Learner(ABC):
         Get the best constraints that have been learned.
         :return Optional[List[Candidate]]: The best learned candidates.
         """
-        result = ExplanationSet()
-        if self.explanations:
-            sorted_explanation = self._get_sorted_explanations()
-            for explanation in sorted_explanation:
-                if self.sorting_strategy.is_equal(explanation, sorted_explanation[0]):
-                    result.append(explanation)
-        return result
+        return ExplanationSet(self._get_ranking().top())
+
+    def get_ranked_candidates(self, n: Optional[int] = None) -> List[Explanation]:
+        """
+        Get the n best explanations (all if n is None), in descending order of their
+        fitness.
+        """
+        return self._get_ranking().ranked(n)
+
+    def _get_ranking(self) -> ExplanationRanking:
+        """
+        Return the ranking of the explanations by the sorting strategy. It is updated
+        incrementally as explanations are added or evaluated, so that the best
+        explanations are found without re-ranking all explanations.
+        """
+        return self.explanations.ranking(self.sorting_strategy.evaluate)
 
     def _get_sorted_explanations(self) -> Optional[List[Explanation]]:
-        return sorted(self.explanations, key=lambda exp: self.sorting_strategy.evaluate(exp), reverse=True)
\ No newline at end of file
+        return self.get_ranked_candidates()
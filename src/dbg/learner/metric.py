@@ -1,7 +1,56 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
 
 from dbg.explanation.candidate import Explanation
 
+# The columns of a matrix of confusion counts, see confusion_counts.
+TP, FP, TN, FN = range(4)
+
+
+def confusion_counts(candidates: Iterable[Explanation]) -> np.ndarray:
+    """
+    Return the confusion counts of the candidates as an (n, 4) matrix with the columns
+    TP, FP, TN and FN.
+    The candidates keep their counts up to date (see Explanation.confusion_counts), so
+    this takes constant time per candidate.
+    """
+    counts = [candidate.confusion_counts() for candidate in candidates]
+    return np.array(counts, dtype=np.int64).reshape(-1, 4)
+
+
+def candidate_lengths(candidates: Iterable[Explanation]) -> np.ndarray:
+    return np.array([len(candidate) for candidate in candidates], dtype=np.int64)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """
+    Divide element-wise, with 0.0 where the denominator is 0.
+    """
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(len(numerator), dtype=np.float64),
+        where=denominator > 0,
+    )
+
+
+def batch_recall(counts: np.ndarray) -> np.ndarray:
+    return _ratio(counts[:, TP], counts[:, TP] + counts[:, FN])
+
+
+def batch_precision(counts: np.ndarray) -> np.ndarray:
+    return _ratio(counts[:, TP], counts[:, TP] + counts[:, FP])
+
+
+def batch_specificity(counts: np.ndarray) -> np.ndarray:
+    return _ratio(counts[:, TN], counts[:, TN] + counts[:, FP])
+
+
+def _negated_lengths(lengths: np.ndarray) -> np.ndarray:
+    return -np.asarray(lengths, dtype=np.int64)
+
 
 class FitnessStrategy(ABC):
     """
@@ -33,6 +82,89 @@ class FitnessStrategy(ABC):
         """
         return self.evaluate(candidate1) == self.evaluate(candidate2)
 
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ) -> tuple[np.ndarray, ...]:
+        """
+        Evaluate all candidates at once. The i-th entries of the returned arrays form
+        the fitness key of the i-th candidate, i.e., the components of evaluate, from
+        the most to the least significant.
+        The default implementation calls evaluate for each candidate; strategies whose
+        fitness only depends on the confusion counts and the lengths override it with a
+        vectorized implementation.
+        :param counts: The (n, 4) matrix of confusion counts of the candidates, see
+            confusion_counts.
+        :param lengths: The lengths of the candidates, see candidate_lengths.
+        :param candidates: The candidates themselves, required by the default
+            implementation.
+        """
+        if candidates is None:
+            raise ValueError(
+                f"{type(self).__name__} needs the candidates to evaluate them"
+            )
+        if len(candidates) == 0:
+            return (np.zeros(0, dtype=np.float64),)
+        keys = []
+        for candidate in candidates:
+            key = self.evaluate(candidate)
+            keys.append(key if isinstance(key, tuple) else (key,))
+        return tuple(np.array(component, dtype=np.float64) for component in zip(*keys))
+
+    def rank_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ) -> np.ndarray:
+        """
+        Return the indices of the candidates ordered by descending fitness key, with
+        ties in their given order.
+        """
+        keys = self.evaluate_batch(counts, lengths, candidates)
+        # np.lexsort sorts by the last key first and is stable
+        return np.lexsort([-key for key in reversed(keys)])
+
+    def best_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ) -> np.ndarray:
+        """
+        Return the indices of the candidates that share the highest fitness key, in
+        their given order.
+        """
+        if len(counts) == 0:
+            return np.zeros(0, dtype=np.int64)
+        keys = self.evaluate_batch(counts, lengths, candidates)
+        best = np.lexsort([-key for key in reversed(keys)])[0]
+        is_best = np.logical_and.reduce([key == key[best] for key in keys])
+        return np.flatnonzero(is_best)
+
+    def rank_candidates(self, candidates: Iterable[Explanation]) -> list[Explanation]:
+        """
+        Return the candidates in descending order of their fitness, with ties in their
+        given order.
+        """
+        candidates = list(candidates)
+        order = self.rank_batch(
+            confusion_counts(candidates), candidate_lengths(candidates), candidates
+        )
+        return [candidates[idx] for idx in order]
+
+    def best_candidates(self, candidates: Iterable[Explanation]) -> list[Explanation]:
+        """
+        Return the candidates that share the highest fitness, in their given order.
+        """
+        candidates = list(candidates)
+        best = self.best_batch(
+            confusion_counts(candidates), candidate_lengths(candidates), candidates
+        )
+        return [candidates[idx] for idx in best]
+
 
 class PrecisionFitness(FitnessStrategy):
     """
@@ -42,6 +174,14 @@ class PrecisionFitness(FitnessStrategy):
     def evaluate(self, candidate: Explanation):
         return candidate.precision()
 
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ):
+        return (batch_precision(counts),)
+
     def compare(self, candidate1: Explanation, candidate2: Explanation):
         return self.evaluate(candidate1) - self.evaluate(candidate2)
 
@@ -54,6 +194,14 @@ class RecallFitness(FitnessStrategy):
     def evaluate(self, candidate: Explanation):
         return candidate.recall()
 
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ):
+        return (batch_recall(counts),)
+
     def compare(self, candidate1: Explanation, candidate2: Explanation):
         return self.evaluate(candidate1) - self.evaluate(candidate2)
 
@@ -67,6 +215,14 @@ class RecallPriorityFitness(FitnessStrategy):
     def evaluate(self, candidate: Explanation):
         return candidate.recall(), candidate.precision()
 
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ):
+        return batch_recall(counts), batch_precision(counts)
+
     def compare(self, candidate1: Explanation, candidate2: Explanation):
         recall1, precision1 = self.evaluate(candidate1)
         recall2, precision2 = self.evaluate(candidate2)
@@ -85,6 +241,14 @@ class RecallPriorityLengthFitness(FitnessStrategy):
     def evaluate(self, candidate: Explanation):
         return candidate.recall(), candidate.precision(), -len(candidate)
 
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ):
+        return batch_recall(counts), batch_precision(counts), _negated_lengths(lengths)
+
     def compare(self, candidate1: Explanation, candidate2: Explanation):
         recall1, precision1, length1 = self.evaluate(candidate1)
         recall2, precision2, length2 = self.evaluate(candidate2)
@@ -101,11 +265,20 @@ class F1ScoreFitness(FitnessStrategy):
     """
 
     def evaluate(self, candidate: Explanation):
-        return (
-            2
-            * (candidate.precision() * candidate.recall())
-            / (candidate.precision() + candidate.recall())
-        ), -len(candidate)
+        precision, recall = candidate.precision(), candidate.recall()
+        if precision + recall == 0:
+            return 0.0, -len(candidate)
+        return 2 * (precision * recall) / (precision + recall), -len(candidate)
+
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ):
+        precision, recall = batch_precision(counts), batch_recall(counts)
+        f1_score = _ratio(2 * (precision * recall), precision + recall)
+        return f1_score, _negated_lengths(lengths)
 
     def compare(self, candidate1: Explanation, candidate2: Explanation):
         f1_score1, length1 = self.evaluate(candidate1)
@@ -138,6 +311,18 @@ class RecallSpecificityLengthFitness(RecallPriorityLengthFitness):
     def evaluate(self, candidate: Explanation):
         return candidate.recall(), candidate.specificity(), -len(candidate)
 
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ):
+        return (
+            batch_recall(counts),
+            batch_specificity(counts),
+            _negated_lengths(lengths),
+        )
+
 
 class RecallSpecificityStringLengthFitness(RecallPriorityLengthFitness):
     """
@@ -151,3 +336,15 @@ class RecallSpecificityStringLengthFitness(RecallPriorityLengthFitness):
             candidate.specificity(),
             -len(candidate),
         )
+
+    def evaluate_batch(
+        self,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        candidates: Optional[Sequence[Explanation]] = None,
+    ):
+        return (
+            batch_recall(counts),
+            batch_specificity(counts),
+            _negated_lengths(lengths),
+        )
@@ -0,0 +1,263 @@
+import bisect
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    A histogram with fixed, cumulative buckets (Prometheus-style).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        self.bucket_counts: list[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        assert self.buckets == other.buckets
+        for idx, bucket_count in enumerate(other.bucket_counts):
+            self.bucket_counts[idx] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls into.
+        Values above the largest bucket are estimated by the maximum observed value.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                str(bound): cumulative
+                for bound, cumulative in zip(
+                    list(self.buckets) + ["+Inf"], self._cumulative_counts()
+                )
+            },
+        }
+
+    def _cumulative_counts(self) -> list[int]:
+        result, cumulative = [], 0
+        for bucket_count in self.bucket_counts:
+            cumulative += bucket_count
+            result.append(cumulative)
+        return result
+
+
+class MetricsRegistry:
+    """
+    Collects timers (accumulated seconds), counters, and histograms of an explain run.
+    Values are collected for the current iteration; end_iteration closes the iteration,
+    adds its values to the totals, and returns the report of the iteration.
+    """
+
+    def __init__(self):
+        self.totals = _Metrics()
+        self.current = _Metrics()
+        self.iteration = 0
+        self.reports: list[dict] = []
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Measure the wall time of the block and add it to the timer with the given name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.current.timers[name] = self.current.timers.get(name, 0.0) + seconds
+
+    def increment(self, name: str, value: int = 1):
+        self.current.counters[name] = self.current.counters.get(name, 0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        if name not in self.current.histograms:
+            self.current.histograms[name] = Histogram(buckets)
+        self.current.histograms[name].observe(value)
+
+    def end_iteration(self) -> dict:
+        """
+        Close the current iteration and return its report.
+        """
+        report = {
+            "iteration": self.iteration,
+            "timestamp": time.time(),
+            **self.current.to_dict(),
+        }
+        self.totals.merge(self.current)
+        self.current = _Metrics()
+        self.iteration += 1
+        self.reports.append(report)
+        return report
+
+    def summary(self) -> dict:
+        """
+        Return the totals over all closed iterations.
+        """
+        return {"iterations": self.iteration, **self.totals.to_dict()}
+
+
+class _Metrics:
+    def __init__(self):
+        self.timers: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    def merge(self, other: "_Metrics"):
+        for name, seconds in other.timers.items():
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, histogram in other.histograms.items():
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(histogram.buckets)
+            self.histograms[name].merge(histogram)
+
+    def to_dict(self) -> dict:
+        return {
+            "timers": dict(self.timers),
+            "counters": dict(self.counters),
+            "histograms": {
+                name: histogram.to_dict() for name, histogram in self.histograms.items()
+            },
+        }
+
+
+class MetricsSink(ABC):
+    """
+    A sink receives the report of every iteration and the summary at the end of a run.
+    """
+
+    @abstractmethod
+    def emit(self, report: dict, registry: MetricsRegistry):
+        raise NotImplementedError
+
+    def close(self, registry: MetricsRegistry):
+        pass
+
+
+class JSONLinesSink(MetricsSink):
+    """
+    Appends each iteration report as one JSON object per line.
+    The summary is appended as a last line with "iteration": "total".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, report: dict, registry: MetricsRegistry):
+        self._write(report)
+
+    def close(self, registry: MetricsRegistry):
+        self._write({"iteration": "total", **registry.summary()})
+
+    def _write(self, report: dict):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+class PrometheusTextFileSink(MetricsSink):
+    """
+    Writes the totals in the Prometheus text exposition format, e.g., for the textfile
+    collector of the node exporter. The file is replaced atomically after every
+    iteration.
+    """
+
+    def __init__(
+        self, path: str, prefix: str = "dbg", labels: Optional[dict[str, str]] = None
+    ):
+        self.path = path
+        self.prefix = prefix
+        self.labels = labels or {}
+
+    def emit(self, report: dict, registry: MetricsRegistry):
+        self._write(registry)
+
+    def close(self, registry: MetricsRegistry):
+        self._write(registry)
+
+    def _write(self, registry: MetricsRegistry):
+        lines = [
+            f"# TYPE {self._name('iterations')} gauge",
+            f"{self._name('iterations')}{self._labels()} {registry.iteration}",
+        ]
+        for name, seconds in sorted(registry.totals.timers.items()):
+            metric = self._name(name) + "_seconds_total"
+            lines += [f"# TYPE {metric} counter", f"{metric}{self._labels()} {seconds}"]
+        for name, value in sorted(registry.totals.counters.items()):
+            metric = self._name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric}{self._labels()} {value}"]
+        for name, histogram in sorted(registry.totals.histograms.items()):
+            metric = self._name(name)
+            lines.append(f"# TYPE {metric} histogram")
+            bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+            for bound, cumulative in zip(bounds, histogram._cumulative_counts()):
+                lines.append(f"{metric}_bucket{self._labels(le=bound)} {cumulative}")
+            lines.append(f"{metric}_sum{self._labels()} {histogram.sum}")
+            lines.append(f"{metric}_count{self._labels()} {histogram.count}")
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _name(self, name: str) -> str:
+        return f"{self.prefix}_{name}".replace(".", "_").replace("-", "_")
+
+    def _labels(self, **extra: str) -> str:
+        labels = {**self.labels, **extra}
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
@@ -0,0 +1,193 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from dbg.logger import LOGGER
+
+
+class SamplingProfiler:
+    """
+    A statistical profiler that samples the call stack of one thread in fixed intervals.
+    The samples are written as folded stacks (one "frame;frame;frame count" line per
+    stack), which can be rendered with flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval_seconds: float = 0.005, max_depth: int = 128):
+        self.interval_seconds = interval_seconds
+        self.max_depth = max_depth
+        self.samples: Counter[str] = Counter()
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def enable(self):
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def disable(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                location = f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+                stack.append(f"{code.co_name} ({location})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump_stats(self, path: str | Path):
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingHooks:
+    """
+    Profiles the phases of an explain run and writes the results to a run directory:
+    <run_directory>/iteration_<n>/<phase>.prof (cProfile, readable with pstats or
+    snakeviz) or <run_directory>/iteration_<n>/<phase>.folded (sampling profiler), and,
+    if tracemalloc is enabled, <run_directory>/iteration_<n>/memory.snapshot with a
+    summary of the largest allocations and of the growth since the previous iteration in
+    memory.txt.
+    """
+
+    PROFILERS = ("cprofile", "sampling")
+
+    def __init__(
+        self,
+        run_directory: str | Path,
+        profiler: Optional[str] = "cprofile",
+        phases: Optional[Iterable[str]] = None,
+        iterations: Optional[Iterable[int]] = None,
+        trace_memory: bool = False,
+        sampling_interval_seconds: float = 0.005,
+        memory_top_n: int = 25,
+    ):
+        """
+        :param run_directory: The directory to write the profiles to.
+        :param profiler: "cprofile", "sampling", or None to only trace memory.
+        :param phases: The phases to profile, or None to profile all phases.
+        :param iterations: The iterations to profile, or None to profile all iterations.
+        :param trace_memory: Whether to take a tracemalloc snapshot after every
+            iteration.
+        :param sampling_interval_seconds: The sampling interval of the sampling
+            profiler.
+        :param memory_top_n: The number of allocation sites listed in memory.txt.
+        """
+        if profiler is not None and profiler not in self.PROFILERS:
+            raise ValueError(
+                f"Unknown profiler {profiler}. Use one of {', '.join(self.PROFILERS)}."
+            )
+        self.run_directory = Path(run_directory)
+        self.profiler = profiler
+        self.phases = set(phases) if phases is not None else None
+        self.iterations = set(iterations) if iterations is not None else None
+        self.trace_memory = trace_memory
+        self.sampling_interval_seconds = sampling_interval_seconds
+        self.memory_top_n = memory_top_n
+        self._previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def start(self):
+        """
+        Start the run: create the run directory and start tracing memory allocations.
+        """
+        os.makedirs(self.run_directory, exist_ok=True)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        """
+        Stop tracing memory allocations.
+        """
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._previous_snapshot = None
+
+    def _iteration_directory(self, iteration: int) -> Path:
+        directory = self.run_directory / f"iteration_{iteration:03d}"
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @contextmanager
+    def profile_phase(self, iteration: int, phase: str) -> Iterator[None]:
+        """
+        Profile the block as the given phase of the given iteration.
+        """
+        if (
+            self.profiler is None
+            or (self.phases is not None and phase not in self.phases)
+            or (self.iterations is not None and iteration not in self.iterations)
+        ):
+            yield
+            return
+
+        if self.profiler == "cprofile":
+            profiler = cProfile.Profile()
+            suffix = "prof"
+        else:
+            profiler = SamplingProfiler(self.sampling_interval_seconds)
+            suffix = "folded"
+
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = self._iteration_directory(iteration) / f"{phase}.{suffix}"
+            profiler.dump_stats(path)
+            LOGGER.debug(f"Wrote profile of {phase} (iteration {iteration}) to {path}.")
+
+    def snapshot_memory(self, iteration: int):
+        """
+        Take a tracemalloc snapshot at the end of the iteration and write it with a
+        summary of the largest allocation sites and of the growth since the previous
+        iteration.
+        """
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return
+        if self.iterations is not None and iteration not in self.iterations:
+            return
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        directory = self._iteration_directory(iteration)
+        snapshot.dump(str(directory / "memory.snapshot"))
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Iteration {iteration}: {current / 1024 / 1024:.1f} MiB traced, "
+            f"{peak / 1024 / 1024:.1f} MiB peak ({time.strftime('%Y-%m-%dT%H:%M:%S')})",
+            "",
+            "Largest allocation sites:",
+        ]
+        lines += [
+            str(stat) for stat in snapshot.statistics("lineno")[: self.memory_top_n]
+        ]
+        if self._previous_snapshot is not None:
+            lines += ["", "Growth since the previous iteration:"]
+            lines += [
+                str(stat)
+                for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[
+                    : self.memory_top_n
+                ]
+            ]
+        with open(directory / "memory.txt", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        self._previous_snapshot = snapshot
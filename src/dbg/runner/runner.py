@@ -1,17 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Union, Set
+from typing import Optional, Union, Set
+import time
 
 from dbg.data.input import Input
 from dbg.data.oracle import OracleResult
+from dbg.deadline import Deadline
 from dbg.types import OracleType, BatchOracleType
+from dbg.metrics import MetricsRegistry
 
 
 class ExecutionHandler(ABC):
     def __init__(
         self,
         oracle: OracleType | BatchOracleType,
+        metrics: Optional[MetricsRegistry] = None,
     ):
         self.oracle: Union[OracleType, BatchOracleType] = oracle
+        self.metrics: Optional[MetricsRegistry] = metrics
 
     @abstractmethod
     def label(self, **kwargs):
@@ -20,26 +25,59 @@ class ExecutionHandler(ABC):
 
 class SingleExecutionHandler(ExecutionHandler):
     def _get_label(self, test_input: Input) -> OracleResult:
-        return self.oracle(test_input)
+        if self.metrics is None:
+            return self.oracle(test_input)
+        start = time.perf_counter()
+        label = self.oracle(test_input)
+        self.metrics.observe("oracle.latency_seconds", time.perf_counter() - start)
+        self.metrics.increment("oracle.calls")
+        return label
 
-    def label(self, test_inputs: Set[Input], **kwargs):
+    def label(
+        self, test_inputs: Set[Input], deadline: Optional[Deadline] = None, **kwargs
+    ):
+        """
+        Label the test inputs one by one. If the deadline expires, only the inputs
+        labeled so far are returned.
+        """
+        labeled_test_inputs = set()
         for inp in test_inputs:
+            if Deadline.has_expired(deadline):
+                break
             label = self._get_label(inp)
             inp.oracle = label
-        return test_inputs
+            labeled_test_inputs.add(inp)
+        return labeled_test_inputs
 
 
 class BatchExecutionHandler(ExecutionHandler):
     def _get_label(self, test_inputs: Set[Input]) -> list[tuple[Input, OracleResult]]:
+        start = time.perf_counter()
         results = self.oracle(test_inputs)
+        if self.metrics is not None and test_inputs:
+            # a batch oracle only reveals the latency of the whole batch; attribute it
+            # evenly
+            latency = (time.perf_counter() - start) / len(test_inputs)
+            for _ in test_inputs:
+                self.metrics.observe("oracle.latency_seconds", latency)
+            self.metrics.increment("oracle.calls", len(test_inputs))
+            self.metrics.increment("oracle.batches")
 
         return [
             (inp, results[inp]) for inp in test_inputs
         ]
 
-    def label(self, test_inputs: Set[Input], **kwargs):
+    def label(
+        self, test_inputs: Set[Input], deadline: Optional[Deadline] = None, **kwargs
+    ):
+        """
+        Label the test inputs with one call of the batch oracle, unless the deadline has
+        already expired.
+        """
+        if Deadline.has_expired(deadline):
+            return set()
         test_results = self._get_label(test_inputs)
 
         for inp, test_result in test_results:
             inp.oracle = test_result
-        return test_inputs
\ No newline at end of file
+        return test_inputs
@@ -0,0 +1,129 @@
+import math
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Optional, Set
+
+from dbg.data.input import Input
+from dbg.learner.metric import FN, FP, TP, confusion_counts
+
+if TYPE_CHECKING:
+    from dbg.core import HypothesisBasedExplainer
+
+
+class StoppingCriterion(ABC):
+    """
+    Decides after every iteration of a hypothesis-based explainer whether to stop the
+    run early.
+    """
+
+    def reset(self):
+        """
+        Reset the state of the criterion at the start of a run.
+        """
+
+    @abstractmethod
+    def should_stop(
+        self, explainer: "HypothesisBasedExplainer", new_test_inputs: Set[Input]
+    ) -> bool:
+        """
+        Return whether to stop after the iteration that just finished.
+        :param explainer: The explainer, whose learner holds the current explanations.
+        :param new_test_inputs: The test inputs that were labeled in the iteration.
+        """
+        raise NotImplementedError()
+
+
+class TopKUnchanged(StoppingCriterion):
+    """
+    Stops once the k highest ranked explanations have not changed for a number of
+    iterations.
+    """
+
+    def __init__(self, k: int = 1, patience: int = 3):
+        self.k = k
+        self.patience = patience
+        self.reset()
+
+    def reset(self):
+        self.top_k: Optional[frozenset[str]] = None
+        self.unchanged_iterations = 0
+
+    def should_stop(
+        self, explainer: "HypothesisBasedExplainer", new_test_inputs: Set[Input]
+    ) -> bool:
+        top_k = frozenset(
+            explanation.fingerprint()
+            for explanation in explainer.learner.get_ranked_candidates(self.k)
+        )
+        if top_k and top_k == self.top_k:
+            self.unchanged_iterations += 1
+        else:
+            self.unchanged_iterations = 0
+        self.top_k = top_k
+        return self.unchanged_iterations >= self.patience
+
+
+def wilson_interval_width(successes: int, trials: int, z: float = 1.96) -> float:
+    """
+    Return the width of the Wilson score interval of a binomial proportion (1.0 without
+    trials).
+    """
+    if trials == 0:
+        return 1.0
+    proportion = successes / trials
+    denominator = 1 + z * z / trials
+    half_width = (
+        z
+        / denominator
+        * math.sqrt(
+            proportion * (1 - proportion) / trials + z * z / (4 * trials * trials)
+        )
+    )
+    return 2 * half_width
+
+
+class ConfidenceIntervalWidth(StoppingCriterion):
+    """
+    Stops once the confidence intervals of the precision and the recall of the k highest
+    ranked explanations are all narrower than max_width. The intervals are Wilson score
+    intervals over the inputs the explanations were evaluated on.
+    """
+
+    def __init__(self, max_width: float = 0.1, k: int = 1, z: float = 1.96):
+        self.max_width = max_width
+        self.k = k
+        self.z = z
+
+    def should_stop(
+        self, explainer: "HypothesisBasedExplainer", new_test_inputs: Set[Input]
+    ) -> bool:
+        counts = confusion_counts(explainer.learner.get_ranked_candidates(self.k))
+        if len(counts) == 0:
+            return False
+        for tp, fp, fn in counts[:, [TP, FP, FN]].tolist():
+            precision_width = wilson_interval_width(tp, tp + fp, self.z)
+            recall_width = wilson_interval_width(tp, tp + fn, self.z)
+            if max(precision_width, recall_width) > self.max_width:
+                return False
+        return True
+
+
+class NoNewInputs(StoppingCriterion):
+    """
+    Stops once no new test inputs have been labeled for a number of iterations.
+    """
+
+    def __init__(self, patience: int = 1):
+        self.patience = patience
+        self.reset()
+
+    def reset(self):
+        self.iterations_without_inputs = 0
+
+    def should_stop(
+        self, explainer: "HypothesisBasedExplainer", new_test_inputs: Set[Input]
+    ) -> bool:
+        if new_test_inputs:
+            self.iterations_without_inputs = 0
+        else:
+            self.iterations_without_inputs += 1
+        return self.iterations_without_inputs >= self.patience
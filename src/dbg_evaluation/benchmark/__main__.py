@@ -0,0 +1,57 @@
+import argparse
+import sys
+
+from dbg_evaluation.benchmark.runner import (
+    TOOLS,
+    compare_baselines,
+    load_baseline,
+    run_benchmark,
+    save_baseline,
+)
+from dbg_evaluation.benchmark.subjects import SUBJECTS
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m dbg_evaluation.benchmark",
+        description="Run the benchmark subjects and record a performance baseline.",
+    )
+    parser.add_argument("--tools", nargs="+", default=list(TOOLS), choices=list(TOOLS))
+    parser.add_argument(
+        "--subjects", nargs="+", default=list(SUBJECTS), choices=list(SUBJECTS)
+    )
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--max-iterations", type=int, default=10)
+    parser.add_argument(
+        "--no-isolation", action="store_true", help="Run all runs in this process."
+    )
+    parser.add_argument(
+        "--output", default="baseline.json", help="The file to write the baseline to."
+    )
+    parser.add_argument(
+        "--compare", help="A baseline to check the new measurements against."
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(args)
+
+    baseline = run_benchmark(
+        args.tools,
+        args.subjects,
+        args.seeds,
+        max_iterations=args.max_iterations,
+        isolate=not args.no_isolation,
+    )
+    save_baseline(baseline, args.output)
+
+    if args.compare:
+        regressions = compare_baselines(
+            load_baseline(args.compare), baseline, tolerance=args.tolerance
+        )
+        for regression in regressions:
+            print(regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import json
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Iterable, Optional
+
+from dbg.core import HypothesisBasedExplainer
+from dbg.data.input import Input
+from dbg.data.oracle import OracleResult
+from dbg.logger import LOGGER
+
+from dbg_evaluation.benchmark.subjects import BenchmarkSubject, get_subject
+
+PHASES = [
+    "prepare_test_inputs",
+    "learn_candidates",
+    "create_hypotheses",
+    "generate_test_inputs",
+    "run_test_inputs",
+]
+
+
+def _create_alhazen(
+    subject: BenchmarkSubject, oracle, **kwargs
+) -> HypothesisBasedExplainer:
+    from alhazen.core import Alhazen
+
+    return Alhazen(subject.grammar, oracle, subject.initial_inputs, **kwargs)
+
+
+def _create_avicenna(
+    subject: BenchmarkSubject, oracle, **kwargs
+) -> HypothesisBasedExplainer:
+    from avicenna.core import Avicenna
+
+    return Avicenna(subject.grammar, oracle, subject.initial_inputs, **kwargs)
+
+
+TOOLS: dict[str, Callable[..., HypothesisBasedExplainer]] = {
+    "alhazen": _create_alhazen,
+    "avicenna": _create_avicenna,
+}
+
+
+class CountingOracle:
+    """
+    Wraps an oracle and counts its calls.
+    """
+
+    def __init__(self, oracle: Callable[[Input | str], OracleResult]):
+        self.oracle = oracle
+        self.calls = 0
+
+    def __call__(self, inp: Input | str) -> OracleResult:
+        self.calls += 1
+        return self.oracle(inp)
+
+
+def _peak_rss_kb() -> Optional[int]:
+    """
+    Return the peak resident set size of the current process in kilobytes, or None on
+    platforms without the resource module (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _run_metrics(
+    explainer: HypothesisBasedExplainer,
+) -> tuple[dict[str, float], dict[str, int]]:
+    """
+    Return the accumulated phase times and counters that the explainer recorded in its
+    metrics, including those of an iteration that was interrupted by the timeout.
+    """
+    metrics = explainer.metrics
+    timers, counters = dict(metrics.totals.timers), dict(metrics.totals.counters)
+    for name, seconds in metrics.current.timers.items():
+        timers[name] = timers.get(name, 0.0) + seconds
+    for name, value in metrics.current.counters.items():
+        counters[name] = counters.get(name, 0) + value
+    phase_times = {phase: timers.get(f"phase.{phase}", 0.0) for phase in PHASES}
+    return phase_times, counters
+
+
+def run_single(
+    tool: str, subject_name: str, seed: int, max_iterations: int = 10, **kwargs
+) -> dict:
+    """
+    Run one tool on one subject with a fixed seed and measure its performance.
+    :param tool: The name of the tool, one of TOOLS.
+    :param subject_name: The name of the benchmark subject.
+    :param seed: The seed for the random number generators.
+    :param max_iterations: The maximum number of iterations of the explainer.
+    :return: The measurements of the run.
+    """
+    subject = get_subject(subject_name)
+    random.seed(seed)
+    try:
+        import numpy
+
+        numpy.random.seed(seed)
+    except ImportError:
+        pass
+
+    oracle = CountingOracle(subject.oracle)
+    start = time.perf_counter()
+    explainer = TOOLS[tool](subject, oracle, max_iterations=max_iterations, **kwargs)
+    setup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    explanations = explainer.explain()
+    wall_time = time.perf_counter() - start
+    phase_times, counters = _run_metrics(explainer)
+    generated_inputs = counters.get("generated_inputs", 0)
+
+    return {
+        "tool": tool,
+        "subject": subject_name,
+        "seed": seed,
+        "max_iterations": max_iterations,
+        "iterations": explainer.metrics.iteration,
+        "setup_time_in_seconds": setup_time,
+        "wall_time_in_seconds": wall_time,
+        "phase_times_in_seconds": phase_times,
+        "oracle_calls": oracle.calls,
+        "generated_inputs": generated_inputs,
+        "inputs_per_second": generated_inputs / wall_time if wall_time > 0 else 0.0,
+        "peak_rss_kb": _peak_rss_kb(),
+        "num_explanations": len(explanations) if explanations else 0,
+    }
+
+
+def run_benchmark(
+    tools: Iterable[str],
+    subjects: Iterable[str],
+    seeds: Iterable[int],
+    max_iterations: int = 10,
+    isolate: bool = True,
+) -> dict:
+    """
+    Run every tool on every subject with every seed.
+    :param tools: The names of the tools.
+    :param subjects: The names of the benchmark subjects.
+    :param seeds: The seeds.
+    :param max_iterations: The maximum number of iterations of the explainers.
+    :param isolate: Whether to run each run in a fresh process, such that the peak RSS
+        and the caches of one run do not affect the next.
+    :return: The baseline, i.e., the environment and the measurements of all runs.
+    """
+    runs = []
+    for tool in tools:
+        for subject_name in subjects:
+            for seed in seeds:
+                LOGGER.info(f"Benchmarking {tool} on {subject_name} (seed {seed}).")
+                try:
+                    if isolate:
+                        with ProcessPoolExecutor(
+                            max_workers=1, mp_context=get_context("spawn")
+                        ) as executor:
+                            result = executor.submit(
+                                run_single, tool, subject_name, seed, max_iterations
+                            ).result()
+                    else:
+                        result = run_single(tool, subject_name, seed, max_iterations)
+                except Exception as e:
+                    LOGGER.error(
+                        f"Benchmark {tool} on {subject_name} (seed {seed}) failed: {e}"
+                    )
+                    result = {
+                        "tool": tool,
+                        "subject": subject_name,
+                        "seed": seed,
+                        "error": str(e),
+                    }
+                runs.append(result)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": runs,
+    }
+
+
+def save_baseline(baseline: dict, filename: str):
+    with open(filename, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+
+def load_baseline(filename: str) -> dict:
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def compare_baselines(
+    baseline: dict, current: dict, tolerance: float = 0.2, min_seconds: float = 0.1
+) -> list[str]:
+    """
+    Compare the measurements of two baselines run by run and report the regressions.
+    Wall time, phase times, and peak RSS regress if they exceed the baseline by more
+    than the tolerance; times below min_seconds are ignored as noise. Oracle calls and
+    generated inputs are deterministic under a fixed seed, so any difference is
+    reported.
+    :return: A description of each regression.
+    """
+
+    def key(run: dict) -> tuple:
+        return run["tool"], run["subject"], run["seed"]
+
+    baseline_runs = {key(run): run for run in baseline["runs"] if "error" not in run}
+    regressions = []
+    for run in current["runs"]:
+        name = "{}/{}/{}".format(*key(run))
+        if "error" in run:
+            regressions.append(f"{name}: failed with {run['error']}")
+            continue
+        old = baseline_runs.get(key(run))
+        if old is None:
+            continue
+
+        measures = [
+            (
+                "wall_time_in_seconds",
+                old["wall_time_in_seconds"],
+                run["wall_time_in_seconds"],
+            )
+        ]
+        measures += [
+            (
+                f"phase_times_in_seconds.{phase}",
+                old_time,
+                run["phase_times_in_seconds"].get(phase, 0.0),
+            )
+            for phase, old_time in old["phase_times_in_seconds"].items()
+        ]
+        for measure, old_value, new_value in measures:
+            if new_value >= min_seconds and new_value > old_value * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {measure} {old_value:.3f}s -> {new_value:.3f}s"
+                )
+
+        if (
+            run["peak_rss_kb"] is not None
+            and old["peak_rss_kb"] is not None
+            and run["peak_rss_kb"] > old["peak_rss_kb"] * (1 + tolerance)
+        ):
+            regressions.append(
+                f"{name}: peak_rss_kb {old['peak_rss_kb']} -> {run['peak_rss_kb']}"
+            )
+
+        for measure in ["oracle_calls", "generated_inputs"]:
+            if run[measure] != old[measure]:
+                regressions.append(
+                    f"{name}: {measure} {old[measure]} -> {run[measure]}"
+                )
+
+    return regressions
@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+import math
+import string
+from typing import Callable, Iterable
+
+from dbg.data.input import Input
+from dbg.data.oracle import OracleResult
+from dbg.types import Grammar
+
+
+class BenchmarkSubject:
+    """
+    A benchmark subject: a grammar, an oracle that labels the inputs of the grammar, and
+    a set of initial inputs containing at least one failing and one passing input.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        grammar: Grammar,
+        oracle: Callable[[Input | str], OracleResult],
+        initial_inputs: Iterable[str],
+    ):
+        self.name = name
+        self.grammar = grammar
+        self.oracle = oracle
+        self.initial_inputs = list(initial_inputs)
+
+    def __repr__(self):
+        return f"BenchmarkSubject({self.name})"
+
+
+CALCULATOR_GRAMMAR: Grammar = {
+    "<start>": ["<arith_expr>"],
+    "<arith_expr>": ["<function>(<number>)"],
+    "<function>": ["sqrt", "sin", "cos", "tan"],
+    "<number>": ["<maybe_minus><onenine><maybe_digits><maybe_frac>"],
+    "<maybe_minus>": ["", "-"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+    "<digit>": [str(num) for num in range(0, 10)],
+    "<maybe_digits>": ["", "<digits>"],
+    "<digits>": ["<digit>", "<digit><digits>"],
+    "<maybe_frac>": ["", ".<digits>"],
+}
+
+
+def calculator_oracle(inp: Input | str) -> OracleResult:
+    """
+    Fails if a math function raises a ValueError, i.e., sqrt is called with a negative
+    number.
+    """
+    try:
+        eval(
+            str(inp),
+            {"sqrt": math.sqrt, "sin": math.sin, "cos": math.cos, "tan": math.tan},
+        )
+        return OracleResult.PASSING
+    except ValueError:
+        return OracleResult.FAILING
+
+
+EXPRESSION_GRAMMAR: Grammar = {
+    "<start>": ["<expr>"],
+    "<expr>": ["<term> + <expr>", "<term> - <expr>", "<term>"],
+    "<term>": ["<factor> * <term>", "<factor> / <term>", "<factor>"],
+    "<factor>": ["-<factor>", "(<expr>)", "<integer>"],
+    "<integer>": ["<digit><integer>", "<digit>"],
+    "<digit>": [str(num) for num in range(0, 10)],
+}
+
+
+def expression_oracle(inp: Input | str) -> OracleResult:
+    """
+    Fails if the expression divides by zero.
+    """
+    try:
+        eval(str(inp), {"__builtins__": {}})
+        return OracleResult.PASSING
+    except ZeroDivisionError:
+        return OracleResult.FAILING
+    except (SyntaxError, OverflowError, MemoryError, RecursionError):
+        return OracleResult.UNDEFINED
+
+
+JSON_GRAMMAR: Grammar = {
+    "<start>": ["<json>"],
+    "<json>": ["<value>"],
+    "<value>": ["<object>", "<array>", "<string>", "<number>", "true", "false", "null"],
+    "<object>": ["{}", "{<members>}"],
+    "<members>": ["<member>", "<member>,<members>"],
+    "<member>": ["<string>:<value>"],
+    "<array>": ["[]", "[<elements>]"],
+    "<elements>": ["<value>", "<value>,<elements>"],
+    "<string>": ['"<characters>"'],
+    "<characters>": ["", "<character><characters>"],
+    "<character>": list("abcde"),
+    "<number>": ["<int>", "-<int>"],
+    "<int>": ["<digit>", "<onenine><digits>"],
+    "<digits>": ["<digit>", "<digit><digits>"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+    "<digit>": [str(num) for num in range(0, 10)],
+}
+
+
+def json_oracle(inp: Input | str) -> OracleResult:
+    """
+    Fails if an object contains the same key twice.
+    """
+
+    def check_unique_keys(pairs):
+        keys = [key for key, _ in pairs]
+        if len(keys) != len(set(keys)):
+            raise KeyError("duplicate key")
+        return dict(pairs)
+
+    try:
+        json.loads(str(inp), object_pairs_hook=check_unique_keys)
+        return OracleResult.PASSING
+    except KeyError:
+        return OracleResult.FAILING
+    except ValueError:
+        return OracleResult.UNDEFINED
+
+
+CSV_GRAMMAR: Grammar = {
+    "<start>": ["<csv-file>"],
+    "<csv-file>": ["<csv-record><csv-records>"],
+    "<csv-records>": ["", "<csv-record><csv-records>"],
+    "<csv-record>": ["<csv-fields>\n"],
+    "<csv-fields>": ["<csv-field>", "<csv-field>;<csv-fields>"],
+    "<csv-field>": ["", "<csv-character><csv-field>"],
+    "<csv-character>": list(string.ascii_lowercase[:6] + string.digits[:4]),
+}
+
+
+def csv_oracle(inp: Input | str) -> OracleResult:
+    """
+    Fails if a record has a different number of fields than the header.
+    """
+    records = list(csv.reader(io.StringIO(str(inp)), delimiter=";"))
+    if not records:
+        return OracleResult.UNDEFINED
+    num_fields = len(records[0])
+    if any(len(record) != num_fields for record in records[1:]):
+        return OracleResult.FAILING
+    return OracleResult.PASSING
+
+
+SUBJECTS: dict[str, BenchmarkSubject] = {
+    subject.name: subject
+    for subject in [
+        BenchmarkSubject(
+            "calculator",
+            CALCULATOR_GRAMMAR,
+            calculator_oracle,
+            ["sqrt(-900)", "sin(-3)", "cos(10)", "tan(5)"],
+        ),
+        BenchmarkSubject(
+            "expression",
+            EXPRESSION_GRAMMAR,
+            expression_oracle,
+            ["1 / 0", "3 / (2 - 2)", "1 + 2", "4 * (3 - 1)"],
+        ),
+        BenchmarkSubject(
+            "json",
+            JSON_GRAMMAR,
+            json_oracle,
+            ['{"a":1,"a":2}', '[{"b":true,"b":null}]', '{"a":1,"b":2}', '[1,"c",{}]'],
+        ),
+        BenchmarkSubject(
+            "csv",
+            CSV_GRAMMAR,
+            csv_oracle,
+            ["a;b\n1;2;3\n", "a;b;c\n1\n", "a;b\n1;2\n", "abc\nd\n"],
+        ),
+    ]
+}
+
+
+def get_subject(name: str) -> BenchmarkSubject:
+    """
+    Return the built-in benchmark subject with the given name.
+    """
+    if name not in SUBJECTS:
+        raise ValueError(
+            f"Unknown benchmark subject {name}. "
+            f"Available subjects: {', '.join(SUBJECTS)}"
+        )
+    return SUBJECTS[name]
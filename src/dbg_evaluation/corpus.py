@@ -0,0 +1,267 @@
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from dbg.data.oracle import OracleResult
+from dbg.data.serialization import _LABEL_CODES, _LABELS
+from dbg_evaluation.util import locked
+
+# label code, string length, tree length, sha1 of the string
+_HEADER = struct.Struct("<BII20s")
+_OFFSET = struct.Struct("<Q")
+
+
+class CorpusRecord(NamedTuple):
+    string: str
+    label: Optional[OracleResult]
+    hash: str
+    tree: Optional[bytes]
+
+
+class Corpus:
+    """
+    A packed, append-only corpus of labeled inputs in a directory:
+    records.bin holds the records back to back (a fixed header, the UTF-8 string, and
+    the optional serialized tree), and records.idx holds the 8-byte offset of every
+    record.
+    The index is written after the record, so a record only becomes visible once it is
+    complete.
+    Records can be accessed randomly through a memory map or streamed sequentially.
+    """
+
+    DATA_FILE = "records.bin"
+    INDEX_FILE = "records.idx"
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.data_path = self.directory / self.DATA_FILE
+        self.index_path = self.directory / self.INDEX_FILE
+        self.data_path.touch()
+        self.index_path.touch()
+
+        self._data_map: Optional[mmap.mmap] = None
+        self._index_map: Optional[mmap.mmap] = None
+        self._hashes: dict[str, int] = {}
+        self._hashed_length = 0
+
+    @staticmethod
+    def exists(directory: str | Path) -> bool:
+        return (Path(directory) / Corpus.INDEX_FILE).is_file()
+
+    @staticmethod
+    def hash(string: str) -> str:
+        return hashlib.sha1(string.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.index_path) // _OFFSET.size
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for memory_map in (self._data_map, self._index_map):
+            if memory_map is not None:
+                memory_map.close()
+        self._data_map = self._index_map = None
+
+    def append(
+        self,
+        string: str,
+        label: Optional[OracleResult] = None,
+        tree: Optional[bytes] = None,
+        deduplicate: bool = True,
+    ) -> int:
+        """
+        Append a record and return its index.
+        If deduplicate is set and the corpus already contains the string, the index of
+        the existing record is returned instead.
+        """
+        return self.extend([(string, label, tree)], deduplicate=deduplicate)[0]
+
+    def extend(
+        self,
+        records: Iterable[tuple[str, Optional[OracleResult], Optional[bytes]]],
+        deduplicate: bool = True,
+    ) -> list[int]:
+        """
+        Append (string, label, tree) records and return their indices.
+        Appends are serialized by a lock on the index file, so several processes can
+        write to the corpus.
+        """
+        indices = []
+        with (
+            open(self.data_path, "ab") as data,
+            open(self.index_path, "ab") as index,
+            locked(index),
+        ):
+            if deduplicate:
+                self._load_hashes()
+            length = os.fstat(index.fileno()).st_size // _OFFSET.size
+            # drop the remains of an append that was interrupted before its index entry
+            # was written
+            offset = self._end_of_record(length - 1)
+            os.ftruncate(data.fileno(), offset)
+            offsets = bytearray()
+            for string, label, tree in records:
+                string_hash = self.hash(string)
+                if deduplicate and string_hash in self._hashes:
+                    indices.append(self._hashes[string_hash])
+                    continue
+
+                encoded = string.encode("utf-8")
+                tree = tree or b""
+                data.write(
+                    _HEADER.pack(
+                        _LABEL_CODES[label],
+                        len(encoded),
+                        len(tree),
+                        bytes.fromhex(string_hash),
+                    )
+                )
+                data.write(encoded)
+                data.write(tree)
+                offsets += _OFFSET.pack(offset)
+                offset += _HEADER.size + len(encoded) + len(tree)
+
+                if deduplicate:
+                    self._hashes[string_hash] = length
+                indices.append(length)
+                length += 1
+
+            data.flush()
+            os.fsync(data.fileno())
+            index.write(offsets)
+            index.flush()
+            if deduplicate:
+                self._hashed_length = length
+        return indices
+
+    def _end_of_record(self, idx: int) -> int:
+        """
+        Return the offset after the record with the given index (0 for idx = -1).
+        """
+        if idx < 0:
+            return 0
+        with open(self.index_path, "rb") as index, open(self.data_path, "rb") as data:
+            index.seek(idx * _OFFSET.size)
+            (offset,) = _OFFSET.unpack(index.read(_OFFSET.size))
+            data.seek(offset)
+            _, string_length, tree_length, _ = _HEADER.unpack(data.read(_HEADER.size))
+        return offset + _HEADER.size + string_length + tree_length
+
+    def _load_hashes(self) -> dict[str, int]:
+        """
+        Return the index of the first record of every string hash, reading only the
+        headers of the records appended since the last call.
+        """
+        length = len(self)
+        if self._hashed_length > length:
+            self._hashes, self._hashed_length = {}, 0
+        for idx, (_, _, string_hash, _) in enumerate(
+            self._iter_headers(self._hashed_length, length), start=self._hashed_length
+        ):
+            self._hashes.setdefault(string_hash, idx)
+        self._hashed_length = length
+        return self._hashes
+
+    def __contains__(self, string: str) -> bool:
+        return self.hash(string) in self._load_hashes()
+
+    def _maps(self) -> tuple[mmap.mmap, mmap.mmap]:
+        """
+        Return the memory maps of the data and the index file, remapping them if the
+        files grew.
+        """
+        index_size = os.path.getsize(self.index_path)
+        if self._index_map is None or len(self._index_map) != index_size:
+            self.close()
+            with (
+                open(self.index_path, "rb") as index,
+                open(self.data_path, "rb") as data,
+            ):
+                self._index_map = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+                self._data_map = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data_map, self._index_map
+
+    def __getitem__(self, idx: int) -> CorpusRecord:
+        """
+        Read the record with the given index through the memory map.
+        """
+        length = len(self)
+        if idx < 0:
+            idx += length
+        if not 0 <= idx < length:
+            raise IndexError(f"Corpus index {idx} out of range")
+        data, index = self._maps()
+        (offset,) = _OFFSET.unpack_from(index, idx * _OFFSET.size)
+        label_code, string_length, tree_length, string_hash = _HEADER.unpack_from(
+            data, offset
+        )
+        start = offset + _HEADER.size
+        string = data[start : start + string_length].decode("utf-8")
+        tree = data[start + string_length : start + string_length + tree_length]
+        return CorpusRecord(
+            string, _LABELS[label_code], string_hash.hex(), tree or None
+        )
+
+    def __iter__(self) -> Iterator[CorpusRecord]:
+        return self.records()
+
+    def records(
+        self,
+        label: Optional[OracleResult] = None,
+        limit: Optional[int] = None,
+        with_trees: bool = True,
+    ) -> Iterator[CorpusRecord]:
+        """
+        Stream the records in the order they were appended with one sequential read.
+        :param label: Only yield the records with this label.
+        :param limit: The maximum number of records to yield.
+        :param with_trees: Whether to read the serialized trees; if not, the trees are
+            skipped.
+        """
+        if limit is not None and limit <= 0:
+            return
+        num_records = len(self)
+        count = 0
+        with open(self.data_path, "rb", buffering=1 << 20) as data:
+            for _ in range(num_records):
+                header = data.read(_HEADER.size)
+                label_code, string_length, tree_length, string_hash = _HEADER.unpack(
+                    header
+                )
+                record_label = _LABELS[label_code]
+                if label is not None and record_label != label:
+                    data.seek(string_length + tree_length, os.SEEK_CUR)
+                    continue
+                string = data.read(string_length).decode("utf-8")
+                if with_trees:
+                    tree = data.read(tree_length) or None
+                else:
+                    data.seek(tree_length, os.SEEK_CUR)
+                    tree = None
+                yield CorpusRecord(string, record_label, string_hash.hex(), tree)
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+    def _iter_headers(
+        self, start: int, stop: int
+    ) -> Iterator[tuple[Optional[OracleResult], int, str, int]]:
+        if start >= stop:
+            return
+        with open(self.data_path, "rb", buffering=1 << 20) as data:
+            data.seek(self._end_of_record(start - 1) if start > 0 else 0)
+            for _ in range(stop - start):
+                label_code, string_length, tree_length, string_hash = _HEADER.unpack(
+                    data.read(_HEADER.size)
+                )
+                data.seek(string_length + tree_length, os.SEEK_CUR)
+                yield _LABELS[label_code], string_length, string_hash.hex(), tree_length
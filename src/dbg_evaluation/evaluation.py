@@ -0,0 +1,199 @@
+import contextlib
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from dbg.data.input import Input
+from dbg.explanation.candidate import Explanation
+from dbg.logger import LOGGER
+
+
+def _input_key(inp: Input) -> str:
+    return f"{inp.oracle}\x00{inp}"
+
+
+def fingerprint_inputs(inputs: Iterable[Input]) -> str:
+    """
+    Return a fingerprint of a set of labeled inputs that does not depend on their order.
+    """
+    digest = hashlib.sha1()
+    for entry in sorted(map(_input_key, inputs)):
+        digest.update(entry.encode())
+        digest.update(b"\x01")
+    return digest.hexdigest()
+
+
+def fingerprint_candidate(candidate: Explanation) -> str:
+    """
+    Return a fingerprint of a candidate, based on its type and its string
+    representation.
+    """
+    return hashlib.sha1(
+        f"{type(candidate).__qualname__}\x00{candidate}".encode()
+    ).hexdigest()
+
+
+_WORKER_INPUTS: list[Input] = []
+
+
+def _initialize_worker(inputs: list[Input]):
+    global _WORKER_INPUTS
+    _WORKER_INPUTS = inputs
+
+
+def _evaluate_in_worker(candidate: Explanation, kwargs: dict) -> Optional[list[bool]]:
+    try:
+        return _evaluate(candidate, _WORKER_INPUTS, kwargs)
+    except Exception:
+        return None
+
+
+def _evaluate(candidate: Explanation, inputs: list[Input], kwargs: dict) -> list[bool]:
+    """
+    Evaluate the candidate from scratch and return its results in the order of the
+    inputs.
+    """
+    candidate.reset()
+    candidate.evaluate(set(inputs), **kwargs)
+    return [bool(candidate.cache[inp]) for inp in inputs]
+
+
+class CandidateEvaluator:
+    """
+    Evaluates candidates on a fixed set of evaluation inputs.
+    The inputs are prepared (e.g., parsed or featurized) once. The results of every
+    candidate are cached per (candidate fingerprint, evaluation set fingerprint), in
+    memory and optionally in a cache directory that several processes can share.
+    Candidates that are not cached yet are evaluated in one batch, optionally in
+    parallel.
+    """
+
+    def __init__(
+        self,
+        evaluation_inputs: Iterable[Input],
+        prepare: Optional[Callable[[set[Input]], Iterable[Input]]] = None,
+        workers: int = 1,
+        cache_directory: Optional[str | Path] = None,
+    ):
+        """
+        :param evaluation_inputs: The labeled evaluation inputs.
+        :param prepare: Prepares the evaluation inputs for evaluation once, e.g.,
+            collects their features.
+        :param workers: The number of processes evaluating candidates; 1 evaluates in
+            this process.
+        :param cache_directory: A directory to persist the evaluation results in.
+        """
+        evaluation_inputs = set(evaluation_inputs)
+        if prepare is not None:
+            evaluation_inputs = set(prepare(evaluation_inputs))
+        # the cached results are lists in the order of the inputs, which must therefore
+        # be the same for every evaluator with the same fingerprint
+        self.inputs: list[Input] = sorted(evaluation_inputs, key=_input_key)
+        self.fingerprint = fingerprint_inputs(self.inputs)
+        self.workers = workers
+        self.cache_directory = Path(cache_directory) if cache_directory else None
+        if self.cache_directory:
+            os.makedirs(self.cache_directory, exist_ok=True)
+        self._results: dict[str, list[bool]] = {}
+        self._failed: set[str] = set()
+
+    def evaluate(
+        self, candidates: Iterable[Explanation], **kwargs
+    ) -> list[Explanation]:
+        """
+        Evaluate the candidates on the evaluation inputs.
+        Candidates whose evaluation raises an exception are left out of the result.
+        :param kwargs: Further arguments passed to Explanation.evaluate.
+        :return: The evaluated candidates, in the given order.
+        """
+        candidates = list(candidates)
+        fingerprints = [fingerprint_candidate(candidate) for candidate in candidates]
+
+        missing = {}
+        for candidate, fingerprint in zip(candidates, fingerprints):
+            if (
+                fingerprint not in missing
+                and fingerprint not in self._failed
+                and self._lookup(fingerprint) is None
+            ):
+                missing[fingerprint] = candidate
+
+        if missing:
+            LOGGER.debug(
+                f"Evaluating {len(missing)} candidates on {len(self.inputs)} inputs "
+                f"({len(candidates) - len(missing)} cached)."
+            )
+            # Some explanations (e.g., Fandango's) print to stderr while evaluating.
+            with (
+                open(os.devnull, "w") as null_file,
+                contextlib.redirect_stderr(null_file),
+            ):
+                results = self._evaluate_batch(list(missing.values()), kwargs)
+            for fingerprint, result in zip(missing.keys(), results):
+                if result is not None:
+                    self._store(fingerprint, result)
+                else:
+                    self._failed.add(fingerprint)
+
+        evaluated = []
+        for candidate, fingerprint in zip(candidates, fingerprints):
+            result = None if fingerprint in self._failed else self._lookup(fingerprint)
+            if result is not None:
+                self._apply(candidate, result)
+                evaluated.append(candidate)
+        return evaluated
+
+    def _evaluate_batch(
+        self, candidates: list[Explanation], kwargs: dict
+    ) -> list[Optional[list[bool]]]:
+        if self.workers > 1 and len(candidates) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(candidates)),
+                initializer=_initialize_worker,
+                initargs=(self.inputs,),
+            ) as executor:
+                return list(
+                    executor.map(
+                        _evaluate_in_worker, candidates, [kwargs] * len(candidates)
+                    )
+                )
+
+        results = []
+        for candidate in candidates:
+            try:
+                results.append(_evaluate(candidate, self.inputs, kwargs))
+            except Exception as e:
+                LOGGER.debug(f"Could not evaluate {candidate}: {e}")
+                results.append(None)
+        return results
+
+    def _apply(self, candidate: Explanation, result: list[bool]):
+        """
+        Set the evaluation results of the candidate from the cached results.
+        """
+        candidate.reset()
+        for inp, eval_result in zip(self.inputs, result):
+            candidate._update_eval_results(eval_result, inp)
+
+    def _cache_file(self, fingerprint: str) -> Path:
+        return self.cache_directory / f"{fingerprint}_{self.fingerprint}.pkl"
+
+    def _lookup(self, fingerprint: str) -> Optional[list[bool]]:
+        if fingerprint in self._results:
+            return self._results[fingerprint]
+        if self.cache_directory is not None and self._cache_file(fingerprint).exists():
+            with open(self._cache_file(fingerprint), "rb") as f:
+                self._results[fingerprint] = pickle.load(f)
+            return self._results[fingerprint]
+        return None
+
+    def _store(self, fingerprint: str, result: list[bool]):
+        self._results[fingerprint] = result
+        if self.cache_directory is not None:
+            tmp_file = self._cache_file(fingerprint).with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "wb") as f:
+                pickle.dump(result, f)
+            os.replace(tmp_file, self._cache_file(fingerprint))
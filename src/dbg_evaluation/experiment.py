@@ -4,13 +4,15 @@ import os
 from abc import ABC, abstractmethod
 import hashlib
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Optional
 
 from dbg.data.input import Input
 from dbg.learner.learner import Learner
 from dbg.core import HypothesisBasedExplainer
 from dbg.types import OracleType
 from dbg_evaluation.util import format_results
+from dbg_evaluation.evaluation import CandidateEvaluator
+from dbg_evaluation.corpus import Corpus
 
 
 def stable_hash(value: str, length: int = 8) -> str:
@@ -29,6 +31,7 @@ class Experiment(ABC):
         self.initial_inputs = initial_inputs
 
         self.evaluation_inputs = evaluation_inputs if evaluation_inputs else self.get_evaluation_inputs()
+        self._evaluator: CandidateEvaluator | None = None
 
     @abstractmethod
     def evaluate(self, seed = 1, **kwargs):
@@ -41,30 +44,80 @@ class Experiment(ABC):
         """
         raise NotImplementedError()
 
+    def prepare_evaluation_inputs(self, inputs: set[Input]) -> set[Input]:
+        """
+        Prepare the evaluation inputs before any candidate is evaluated on them, e.g.,
+        collect their features.
+        """
+        return inputs
+
+    def get_evaluator(self, **kwargs) -> CandidateEvaluator:
+        """
+        Return the evaluator of the evaluation inputs, which prepares them only once per
+        experiment.
+        Pass it to format_results to reuse evaluation results across seeds.
+        """
+        if self._evaluator is None:
+            self._evaluator = CandidateEvaluator(
+                self.evaluation_inputs, prepare=self.prepare_evaluation_inputs, **kwargs
+            )
+        return self._evaluator
+
     @staticmethod
-    def write_to_file(inputs: Iterable[Input], subject_name: str):
-        base_path = Path.home() / ".dbgbench" / subject_name
-        os.makedirs(base_path/ "positive_inputs", exist_ok=True)
-        os.makedirs(base_path / "negative_inputs", exist_ok=True)
+    def corpus_directory(subject_name: str) -> Path:
+        return Path.home() / ".dbgbench" / subject_name / "corpus"
 
-        for inp in inputs:
-            try:
-                filename = f"{subject_name}_{stable_hash(str(inp))}.txt"
-                directory = "positive_inputs" if inp.oracle.is_failing() else "negative_inputs"
-                filepath = os.path.join(base_path, directory, filename)
+    @staticmethod
+    def write_to_file(inputs: Iterable[Input], subject_name: str):
+        """
+        Append the inputs to the packed corpus of the subject; inputs already in the
+        corpus are skipped.
+        The derivation trees are stored in the encoding of Input.to_bytes, if the inputs
+        support it.
+        """
+        with Corpus(Experiment.corpus_directory(subject_name)) as corpus:
+            corpus.extend(
+                (str(inp), inp.oracle, Experiment._encode_tree(inp)) for inp in inputs
+            )
 
-                with open(filepath, "w") as f:
-                    f.write(str(inp))
+    @staticmethod
+    def _encode_tree(inp: Input) -> Optional[bytes]:
+        try:
+            return inp.to_bytes()
+        except NotImplementedError:
+            return None
 
-            except Exception as e:
-                print(f"Error writing input: {inp}\nException: {e}")
+    def load(self, max_inputs_per_label: int = 200) -> list[tuple[str, bool]]:
+        """
+        Load up to max_inputs_per_label failing and non-failing inputs of the subject,
+        from its packed corpus if there is one, and otherwise from the positive_inputs
+        and negative_inputs directories.
+        """
+        corpus_directory = self.corpus_directory(self.subject_name)
+        if Corpus.exists(corpus_directory):
+            failing, passing = [], []
+            with Corpus(corpus_directory) as corpus:
+                for record in corpus.records(with_trees=False):
+                    is_failing = record.label is not None and record.label.is_failing()
+                    selected = failing if is_failing else passing
+                    if len(selected) < max_inputs_per_label:
+                        selected.append((record.string, is_failing))
+                    if (
+                        len(failing) >= max_inputs_per_label
+                        and len(passing) >= max_inputs_per_label
+                    ):
+                        break
+            return failing + passing
 
-    def load(self) -> list[tuple[str, bool]]:
         base_path = Path.home() / ".dbgbench" / self.subject_name
         inputs = []
-        for inp in self.load_from_files(base_path / "positive_inputs")[:200]:
+        for inp in self.load_from_files(base_path / "positive_inputs")[
+            :max_inputs_per_label
+        ]:
             inputs.append((inp, True))
-        for inp in self.load_from_files(base_path / "negative_inputs")[:200]:
+        for inp in self.load_from_files(base_path / "negative_inputs")[
+            :max_inputs_per_label
+        ]:
             inputs.append((inp, False))
         return inputs
 
@@ -80,4 +133,4 @@ class Experiment(ABC):
                         inputs.append(content)
                     except Exception as e:
                         print(f"Failed to load {filepath}: {e}")
-        return inputs
\ No newline at end of file
+        return inputs
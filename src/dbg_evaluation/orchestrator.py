@@ -0,0 +1,379 @@
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from dbg.logger import LOGGER
+from dbg_evaluation.experiment import Experiment
+from dbg_evaluation.util import locked
+
+
+ExperimentFactory = Callable[[str, str], Experiment]
+
+# the columns of the merged CSV file: the values of result_row, followed by the
+# annotation of the run
+CSV_COLUMNS = [
+    "name",
+    "seed",
+    "time_in_seconds",
+    "precision",
+    "recall",
+    "avg_precision",
+    "avg_recall",
+    "num_candidates",
+    "num_best_candidates",
+    "best_candidate",
+    "tool",
+    "subject",
+    "status",
+    "error",
+    "duration_in_seconds",
+]
+
+
+class ExperimentRun:
+    """
+    One cell of the experiment matrix: a tool evaluated on a subject with a seed.
+    """
+
+    def __init__(self, tool: str, subject: str, seed: int, directory: Path):
+        self.tool = tool
+        self.subject = subject
+        self.seed = seed
+        self.directory = directory
+
+    @property
+    def result_file(self) -> Path:
+        return self.directory / "result.json"
+
+    def __repr__(self):
+        return f"ExperimentRun({self.tool}, {self.subject}, seed={self.seed})"
+
+
+def result_row(result: dict) -> dict:
+    """
+    Flatten a result of format_results into a row of plain values.
+    """
+    best_candidates = result.get("best_candidates") or []
+    return {
+        "name": result.get("name"),
+        "seed": result.get("seed"),
+        "time_in_seconds": result.get("time_in_seconds"),
+        "precision": result.get("precision"),
+        "recall": result.get("recall"),
+        "avg_precision": result.get("avg_precision"),
+        "avg_recall": result.get("avg_recall"),
+        "num_candidates": len(result.get("candidates") or []),
+        "num_best_candidates": len(best_candidates),
+        "best_candidate": str(best_candidates[0]) if best_candidates else None,
+    }
+
+
+def _execute_run(
+    experiment_factory: ExperimentFactory, run: ExperimentRun, evaluate_kwargs: dict
+):
+    """
+    Run one experiment in the current (child) process. The process works in the run
+    directory, with its own temporary directory and log file, and writes its rows to
+    result.json.
+    """
+    os.chdir(run.directory)
+    tmp_directory = run.directory / "tmp"
+    os.makedirs(tmp_directory, exist_ok=True)
+    os.environ["TMPDIR"] = str(tmp_directory)
+    tempfile.tempdir = None
+
+    start = time.time()
+    with (
+        open(run.directory / "run.log", "w") as log,
+        contextlib.redirect_stdout(log),
+        contextlib.redirect_stderr(log),
+    ):
+        try:
+            experiment = experiment_factory(run.tool, run.subject)
+            results = experiment.evaluate(seed=run.seed, **evaluate_kwargs)
+            results = results if isinstance(results, list) else [results]
+            output = {
+                "status": "ok",
+                "rows": [result_row(result) for result in results],
+            }
+        except Exception as e:
+            traceback.print_exc()
+            output = {"status": "error", "error": repr(e), "rows": []}
+    output["duration_in_seconds"] = time.time() - start
+
+    tmp_file = run.result_file.with_suffix(".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(output, f, default=str)
+    os.replace(tmp_file, run.result_file)
+
+
+class ExperimentOrchestrator:
+    """
+    Runs a (tool x subject x seed) matrix of experiments in parallel. Every run is a
+    separate process with its own working directory under
+    working_directory/<tool>/<subject>/seed_<seed>, and is terminated if it exceeds the
+    timeout. The results of all runs are merged into one CSV file (appended under a file
+    lock), an optional Parquet file, and per (tool, subject) summary statistics.
+    """
+
+    def __init__(
+        self,
+        experiment_factory: ExperimentFactory,
+        working_directory: str | Path,
+        workers: int = os.cpu_count() or 1,
+        timeout_seconds: Optional[float] = 3600,
+        start_method: Optional[str] = None,
+        poll_interval_seconds: float = 0.5,
+    ):
+        """
+        :param experiment_factory: Creates the experiment for a tool and a subject. With
+            the "spawn" start method, it must be importable (e.g., a module-level
+            function).
+        :param working_directory: The directory the run directories and merged results
+            are written to.
+        :param workers: The maximum number of runs executed at the same time.
+        :param timeout_seconds: The wall time after which a run is terminated, or None
+            for no timeout.
+        :param start_method: The multiprocessing start method, or None for the platform
+            default.
+        """
+        self.experiment_factory = experiment_factory
+        self.working_directory = Path(working_directory)
+        self.workers = max(1, workers)
+        self.timeout_seconds = timeout_seconds
+        self.context = get_context(start_method)
+        self.poll_interval_seconds = poll_interval_seconds
+
+    def create_runs(
+        self, tools: Iterable[str], subjects: Iterable[str], seeds: Iterable[int]
+    ) -> list[ExperimentRun]:
+        runs = []
+        for tool, subject, seed in itertools.product(tools, subjects, seeds):
+            directory = self.working_directory / tool / subject / f"seed_{seed}"
+            os.makedirs(directory, exist_ok=True)
+            runs.append(ExperimentRun(tool, subject, seed, directory.absolute()))
+        return runs
+
+    def run(
+        self,
+        tools: Iterable[str],
+        subjects: Iterable[str],
+        seeds: Iterable[int],
+        csv_file: Optional[str | Path] = None,
+        parquet_file: Optional[str | Path] = None,
+        **evaluate_kwargs,
+    ) -> pd.DataFrame:
+        """
+        Run the experiment matrix and merge the results.
+        :param csv_file: The CSV file the rows are appended to (default:
+            working_directory/results.csv).
+        :param parquet_file: The Parquet file the rows of this matrix are written to, if
+            any.
+        :param evaluate_kwargs: Further arguments passed to Experiment.evaluate.
+        :return: The rows of all runs.
+        """
+        runs = self.create_runs(tools, subjects, seeds)
+        rows = self.execute(runs, evaluate_kwargs)
+
+        results = pd.DataFrame(rows)
+        self.merge_csv(results, csv_file or self.working_directory / "results.csv")
+        if parquet_file is not None:
+            self.write_parquet(results, parquet_file)
+        self.summarize(results).to_csv(self.working_directory / "summary.csv")
+        return results
+
+    def execute(self, runs: list[ExperimentRun], evaluate_kwargs: dict) -> list[dict]:
+        """
+        Execute the runs with at most self.workers processes at a time.
+        """
+        pending = list(runs)
+        running: dict = {}
+        rows: list[dict] = []
+
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    run = pending.pop(0)
+                    if run.result_file.exists():
+                        run.result_file.unlink()
+                    process = self.context.Process(
+                        target=_execute_run,
+                        args=(self.experiment_factory, run, evaluate_kwargs),
+                    )
+                    process.start()
+                    running[process] = (run, time.time())
+                    LOGGER.info(f"Started {run} (pid {process.pid}).")
+
+                time.sleep(self.poll_interval_seconds)
+
+                for process, (run, started) in list(running.items()):
+                    elapsed = time.time() - started
+                    if process.is_alive():
+                        if (
+                            self.timeout_seconds is None
+                            or elapsed < self.timeout_seconds
+                        ):
+                            continue
+                        self._terminate(process)
+                        LOGGER.warning(f"{run} timed out after {elapsed:.0f} seconds.")
+                        rows.extend(self._collect(run, "timeout", elapsed))
+                    else:
+                        process.join()
+                        status = (
+                            "ok"
+                            if process.exitcode == 0
+                            else f"crashed ({process.exitcode})"
+                        )
+                        rows.extend(self._collect(run, status, elapsed))
+                    del running[process]
+        finally:
+            # do not leave runs behind if the orchestrator itself is interrupted
+            for process in running:
+                self._terminate(process)
+
+        return rows
+
+    @staticmethod
+    def _terminate(process, grace_seconds: float = 5.0):
+        process.terminate()
+        process.join(grace_seconds)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    @staticmethod
+    def _collect(run: ExperimentRun, status: str, elapsed: float) -> list[dict]:
+        """
+        Read the rows of a finished run and annotate them with the run.
+        A run without rows yields one row recording its status.
+        """
+        output = {"status": status, "rows": [], "duration_in_seconds": elapsed}
+        if status != "timeout" and run.result_file.exists():
+            with open(run.result_file) as f:
+                output = json.load(f)
+
+        annotation = {
+            "tool": run.tool,
+            "subject": run.subject,
+            "seed": run.seed,
+            "status": output["status"],
+            "error": output.get("error"),
+            "duration_in_seconds": output["duration_in_seconds"],
+        }
+        if not output["rows"]:
+            return [annotation]
+        return [{**row, **annotation} for row in output["rows"]]
+
+    @staticmethod
+    def merge_csv(results: pd.DataFrame, csv_file: str | Path):
+        """
+        Append the rows to the CSV file. The file is locked while writing, so that
+        several orchestrators can merge into the same file. The rows are aligned to the
+        header of the file, or to CSV_COLUMNS for a new file, so that every batch has
+        the same columns.
+        """
+        with open(csv_file, "a+", newline="") as f, locked(f):
+            f.seek(0)
+            header = next(csv.reader(f), None)
+            columns = header or CSV_COLUMNS
+            dropped = set(results.columns).difference(columns)
+            if dropped:
+                LOGGER.warning(
+                    f"Dropping the columns {sorted(dropped)} that are not in the "
+                    f"header of {csv_file}."
+                )
+            f.seek(0, os.SEEK_END)
+            results.reindex(columns=columns).to_csv(
+                f, header=header is None, index=False
+            )
+            f.flush()
+
+    @staticmethod
+    def write_parquet(results: pd.DataFrame, parquet_file: str | Path):
+        try:
+            results.to_parquet(parquet_file, index=False)
+        except ImportError as e:
+            LOGGER.warning(f"Cannot write {parquet_file}: {e}")
+
+    @staticmethod
+    def summarize(results: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute the summary statistics of the runs per tool and subject.
+        """
+        if results.empty:
+            return pd.DataFrame()
+        ok = results["status"] == "ok"
+        grouped = results.groupby(["tool", "subject"])
+        summary = grouped.agg(
+            runs=("seed", "count"),
+            duration_mean=("duration_in_seconds", "mean"),
+            duration_std=("duration_in_seconds", "std"),
+        )
+        summary["failed_runs"] = (
+            (~ok).groupby([results["tool"], results["subject"]]).sum()
+        )
+        metrics = [
+            column
+            for column in ["time_in_seconds", "precision", "recall"]
+            if column in results.columns
+        ]
+        if metrics:
+            statistics = (
+                results[ok]
+                .groupby(["tool", "subject"])[metrics]
+                .agg(["mean", "std", "min", "max"])
+            )
+            statistics.columns = ["_".join(column) for column in statistics.columns]
+            summary = summary.join(statistics)
+        return summary
+
+
+def main(args=None):
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(
+        prog="python -m dbg_evaluation.orchestrator",
+        description="Run a (tool x subject x seed) experiment matrix in parallel.",
+    )
+    parser.add_argument(
+        "factory",
+        help="The experiment factory as module:function, called with (tool, subject).",
+    )
+    parser.add_argument("--tools", nargs="+", required=True)
+    parser.add_argument("--subjects", nargs="+", required=True)
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--working-directory", default="experiments")
+    parser.add_argument(
+        "--parquet", help="Also write the results to this Parquet file."
+    )
+    args = parser.parse_args(args)
+
+    module, function = args.factory.split(":")
+    orchestrator = ExperimentOrchestrator(
+        getattr(importlib.import_module(module), function),
+        args.working_directory,
+        workers=args.workers,
+        timeout_seconds=args.timeout,
+    )
+    results = orchestrator.run(
+        args.tools, args.subjects, args.seeds, parquet_file=args.parquet
+    )
+    print(orchestrator.summarize(results).to_string())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
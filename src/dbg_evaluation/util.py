@@ -1,11 +1,16 @@
-from typing import List, Set
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Optional, Set
 import os
 import csv
-import contextlib
 
 from dbg.explanation.candidate import Explanation, ExplanationSet
 from dbg.data.input import Input
-from dbg.learner.metric import RecallPriorityFitness
+from dbg.learner.metric import (
+    RecallPriorityFitness,
+    candidate_lengths,
+    confusion_counts,
+)
+from dbg_evaluation.evaluation import CandidateEvaluator
 
 
 def print_constraints(
@@ -88,47 +93,78 @@ def format_results(
     time_in_seconds: float,
     evaluation_inputs: set[Input],
     seed: int,
+    evaluator: Optional[CandidateEvaluator] = None,
     **kwargs,
 ):
+    """
+    Evaluate the candidates on the evaluation inputs and summarize the results.
+    Pass the same evaluator to several calls to prepare the evaluation inputs only once
+    and to reuse the evaluation results of candidates that were already evaluated on
+    them.
+    """
     sorting_strategy = RecallPriorityFitness()
 
     candidates = candidates or []
+    evaluator = evaluator or CandidateEvaluator(evaluation_inputs)
+    explanations = evaluator.evaluate(candidates, **kwargs)
 
-    explanations = []
-    for candidate in candidates:
-        candidate.reset()
-        try:
-            # Redirect sys.stderr to a null file during the call, Fandango allways prints to stderr
-            with open(os.devnull, "w") as null_file, contextlib.redirect_stderr(null_file):
-                candidate.evaluate(evaluation_inputs, **kwargs)
-                explanations.append(candidate)
-        except Exception as e:
-            continue
-
-    sorted_candidates = sorted(
-        explanations,
-        key=lambda c: sorting_strategy.evaluate(c),
-        reverse=True,
+    counts = confusion_counts(explanations)
+    lengths = candidate_lengths(explanations)
+    recalls, precisions = (
+        key.tolist() for key in sorting_strategy.evaluate_batch(counts, lengths)
     )
+    scores = list(zip(recalls, precisions))
+    ranking = sorting_strategy.rank_batch(counts, lengths).tolist()
     best_candidate = [
-        candidate
-        for candidate in sorted_candidates
-        if sorting_strategy.is_equal(candidate, sorted_candidates[0])
+        explanations[idx] for idx in sorting_strategy.best_batch(counts, lengths)
     ]
+    sorted_candidates = [explanations[idx] for idx in ranking]
 
     return {
         "name": name,
         "seed": seed,
         "candidates": candidates if candidates else None,
         "time_in_seconds": time_in_seconds,
-        "best_candidates": best_candidate if candidates else None,
-        "precision": best_candidate[0].precision() if candidates else None,
-        "recall": best_candidate[0].recall() if candidates else None,
-        "avg_precision": sum(c.precision() for c in sorted_candidates) / len(sorted_candidates) if sorted_candidates else None,
-        "avg_recall": sum(c.recall() for c in sorted_candidates) / len(sorted_candidates) if sorted_candidates else None,
+        "best_candidates": best_candidate if sorted_candidates else None,
+        "precision": scores[ranking[0]][1] if sorted_candidates else None,
+        "recall": scores[ranking[0]][0] if sorted_candidates else None,
+        "avg_precision": (
+            sum(precisions) / len(precisions) if sorted_candidates else None
+        ),
+        "avg_recall": sum(recalls) / len(recalls) if sorted_candidates else None,
     }
 
 
+@contextmanager
+def locked(file: IO) -> Iterator[IO]:
+    """
+    Hold an exclusive lock on the open file, so that several processes can append to it.
+    Uses fcntl on POSIX systems and msvcrt (locking the first byte of the file) on
+    Windows.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+
+        position = file.tell()
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        file.seek(position)
+        try:
+            yield file
+        finally:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    try:
+        yield file
+    finally:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
 def save_results_to_csv(results, filename):
     keys = [
         "name",
@@ -140,24 +176,24 @@ def save_results_to_csv(results, filename):
         "num_best_candidates"
     ]
 
-    file_exists = os.path.isfile(filename)
-    is_empty = not file_exists or os.stat(filename).st_size == 0
-
     with open(filename, "a", newline="") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=keys)
-
-        if is_empty:
-            writer.writeheader()
-
-        for result in results:
-            row = {
-                "name": result.get("name"),
-                "seed": result.get("seed"),
-                "time_in_seconds": result.get("time_in_seconds"),
-                "precision": result.get("precision"),
-                "recall": result.get("recall"),
-                "num_candidates": len(result.get("candidates") or []),
-                "num_best_candidates": len(result.get("best_candidates") or []),
-            }
-            writer.writerow(row)
-
+        # several processes may append to the same file; the lock keeps their rows and
+        # the header intact
+        with locked(csvfile):
+            writer = csv.DictWriter(csvfile, fieldnames=keys)
+
+            if os.fstat(csvfile.fileno()).st_size == 0:
+                writer.writeheader()
+
+            for result in results:
+                row = {
+                    "name": result.get("name"),
+                    "seed": result.get("seed"),
+                    "time_in_seconds": result.get("time_in_seconds"),
+                    "precision": result.get("precision"),
+                    "recall": result.get("recall"),
+                    "num_candidates": len(result.get("candidates") or []),
+                    "num_best_candidates": len(result.get("best_candidates") or []),
+                }
+                writer.writerow(row)
+            csvfile.flush()
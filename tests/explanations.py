@@ -0,0 +1,43 @@
+"""
+Explanations over plain strings, for testing the learner-independent parts of dbg.
+"""
+
+from dbg.data.input import Input
+from dbg.data.oracle import OracleResult
+from dbg.explanation.candidate import Explanation
+
+
+class StringInput(Input):
+    def __hash__(self):
+        return hash(self.tree)
+
+    def __str__(self):
+        return self.tree
+
+    @classmethod
+    def from_str(cls, grammar, input_string, oracle=None):
+        return cls(input_string, oracle)
+
+
+class ContainsExplanation(Explanation):
+    """
+    Holds on the inputs that contain all characters of the explanation, in any order.
+    """
+
+    def evaluate(self, test_inputs, **kwargs):
+        for inp in test_inputs:
+            if inp not in self.cache:
+                self._update_eval_results(set(self.explanation) <= set(str(inp)), inp)
+
+    def _compute_fingerprint(self) -> str:
+        return "".join(sorted(set(self.explanation)))
+
+
+def labeled(*inputs: str) -> set[StringInput]:
+    """
+    Return the inputs, of which those containing an "a" are failing.
+    """
+    return {
+        StringInput(inp, OracleResult.FAILING if "a" in inp else OracleResult.PASSING)
+        for inp in inputs
+    }
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+from dbg_evaluation.benchmark import runner
+from dbg_evaluation.benchmark.runner import PHASES, compare_baselines, run_single
+
+
+def baseline(**measures) -> dict:
+    run = {
+        "tool": "alhazen",
+        "subject": "calculator",
+        "seed": 1,
+        "wall_time_in_seconds": 1.0,
+        "phase_times_in_seconds": {phase: 0.2 for phase in PHASES},
+        "peak_rss_kb": 1000,
+        "oracle_calls": 10,
+        "generated_inputs": 10,
+    }
+    return {"runs": [{**run, **measures}]}
+
+
+class TestRunSingle(unittest.TestCase):
+    def test_measurements_are_taken_from_the_metrics(self):
+        result = run_single("alhazen", "calculator", seed=1, max_iterations=2)
+        self.assertEqual(2, result["iterations"])
+        self.assertEqual(set(PHASES), set(result["phase_times_in_seconds"]))
+        self.assertGreater(result["phase_times_in_seconds"]["learn_candidates"], 0.0)
+        self.assertLessEqual(
+            sum(result["phase_times_in_seconds"].values()),
+            result["wall_time_in_seconds"],
+        )
+        self.assertGreater(result["generated_inputs"], 0)
+        self.assertGreater(result["oracle_calls"], 0)
+
+
+class TestCompareBaselines(unittest.TestCase):
+    def test_no_regressions(self):
+        self.assertEqual([], compare_baselines(baseline(), baseline()))
+
+    def test_regressions(self):
+        regressions = compare_baselines(
+            baseline(),
+            baseline(wall_time_in_seconds=2.0, peak_rss_kb=2000, oracle_calls=11),
+        )
+        self.assertEqual(3, len(regressions))
+
+    def test_missing_peak_rss(self):
+        with mock.patch.dict("sys.modules", {"resource": None}):
+            self.assertIsNone(runner._peak_rss_kb())
+        self.assertEqual([], compare_baselines(baseline(), baseline(peak_rss_kb=None)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from isla.language import parse_isla
+
+from avicenna._learning._canonical import canonical_form, fingerprint
+
+GRAMMAR = {
+    "<start>": ["<arith_expr>"],
+    "<arith_expr>": ["<function>(<number>)"],
+    "<function>": ["sqrt", "sin", "cos", "tan"],
+    "<number>": ["<maybe_minus><onenine>"],
+    "<maybe_minus>": ["", "-"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+}
+
+# ISLa's parser needs distinct names for the bound variables of a formula
+SQRT = 'exists <function> function in start: (= function "sqrt")'
+MINUS = 'exists <maybe_minus> minus in start: (= minus "-")'
+ONE = 'forall <onenine> digit in start: (= digit "1")'
+
+
+def formula(source: str):
+    return parse_isla(source, GRAMMAR)
+
+
+class TestCanonicalForm(unittest.TestCase):
+    def test_operand_order_is_ignored(self):
+        for operator in ("and", "or"):
+            with self.subTest(operator):
+                self.assertEqual(
+                    fingerprint(formula(f"({SQRT} {operator} {MINUS})")),
+                    fingerprint(formula(f"({MINUS} {operator} {SQRT})")),
+                )
+
+    def test_nested_operands_are_flattened_and_deduplicated(self):
+        self.assertEqual(
+            canonical_form(formula(f"({SQRT} and ({MINUS} and {ONE}))")),
+            canonical_form(formula(f"(({ONE} and {SQRT}) and ({MINUS} and {SQRT}))")),
+        )
+
+    def test_bound_variables_are_renamed(self):
+        self.assertEqual(
+            fingerprint(formula(SQRT)),
+            fingerprint(
+                formula(
+                    SQRT.replace("function in", "f in").replace("= function", "= f")
+                )
+            ),
+        )
+
+    def test_different_formulas_differ(self):
+        self.assertNotEqual(
+            fingerprint(formula(f"({SQRT} and {MINUS})")),
+            fingerprint(formula(f"({SQRT} or {MINUS})")),
+        )
+        self.assertNotEqual(fingerprint(formula(SQRT)), fingerprint(formula(MINUS)))
+        self.assertNotEqual(
+            fingerprint(formula(ONE)),
+            fingerprint(formula(ONE.replace("forall", "exists"))),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import random
+import tempfile
+import unittest
+
+from dbg.checkpoint import Checkpointer
+from dbg.explanation.candidate import ExplanationSet
+from dbg.learner.learner import Learner
+
+from explanations import ContainsExplanation, labeled
+from test_explain_iter import create_explainer
+
+
+class RemovingLearner(Learner):
+    def __init__(self):
+        super().__init__()
+        self.removed_explanations = ExplanationSet()
+
+    def learn_explanation(self, test_inputs, **kwargs):
+        for explanation in self.explanations:
+            explanation.evaluate(test_inputs)
+        return self.explanations
+
+
+def results(explanations) -> dict[str, dict[str, bool]]:
+    return {
+        str(explanation): {
+            str(inp): result for inp, result in explanation.cache.items()
+        }
+        for explanation in explanations
+    }
+
+
+class TestCheckpointer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_and_load(self):
+        checkpointer = Checkpointer(self.directory.name)
+        self.assertIsNone(checkpointer.load())
+
+        learner = RemovingLearner()
+        learner.explanations = ExplanationSet(
+            [ContainsExplanation(e) for e in ("a", "b", "c")]
+        )
+        first_inputs = labeled("ab", "b")
+        learner.learn_explanation(first_inputs)
+        checkpointer.save(1, first_inputs, learner)
+
+        random.seed(3)
+        rng_state = random.getstate()
+        test_inputs = first_inputs | labeled("ac", "c")
+        learner.removed_explanations.append(learner.explanations.get("c"))
+        learner.explanations.remove(ContainsExplanation("c"))
+        learner.explanations.append(ContainsExplanation("ax"))
+        learner.learn_explanation(test_inputs)
+        checkpointer.save(2, test_inputs, learner)
+        self.assertEqual(2, len(checkpointer.segments()))
+
+        state = Checkpointer(self.directory.name).load()
+        self.assertEqual(2, state.iteration)
+        self.assertEqual(
+            {str(inp) for inp in test_inputs}, {str(inp) for inp in state.test_inputs}
+        )
+        self.assertEqual(results(learner.explanations), results(state.explanations))
+        self.assertEqual(
+            results(learner.removed_explanations),
+            results(state.removed_explanations),
+        )
+        for restored in state.explanations:
+            original = learner.explanations.get(restored.fingerprint())
+            self.assertEqual(original.confusion_counts(), restored.confusion_counts())
+        self.assertEqual(rng_state, state.rng_state["random"])
+
+    def test_segments_continue_after_load(self):
+        learner = RemovingLearner()
+        learner.explanations = ExplanationSet([ContainsExplanation("a")])
+        test_inputs = labeled("a", "b")
+        learner.learn_explanation(test_inputs)
+        Checkpointer(self.directory.name).save(1, test_inputs, learner)
+
+        checkpointer = Checkpointer(self.directory.name)
+        state = checkpointer.load()
+        test_inputs = state.test_inputs | labeled("ab")
+        learner.explanations = state.explanations
+        learner.learn_explanation(test_inputs)
+        checkpointer.save(2, test_inputs, learner)
+
+        state = Checkpointer(self.directory.name).load()
+        self.assertEqual(results(learner.explanations), results(state.explanations))
+        self.assertEqual(3, len(next(iter(state.explanations)).cache))
+
+
+class TestResume(unittest.TestCase):
+    def test_resumed_run_equals_uninterrupted_run(self):
+        random.seed(7)
+        uninterrupted = create_explainer(max_iterations=4)
+        expected = uninterrupted.explain()
+
+        with tempfile.TemporaryDirectory() as directory:
+            random.seed(7)
+            interrupted = create_explainer(max_iterations=2)
+            interrupted.enable_checkpointing(directory)
+            interrupted.explain()
+
+            resumed = create_explainer(max_iterations=4)
+            actual = resumed.resume(directory)
+
+        self.assertEqual(4, resumed.metrics.iteration)
+        self.assertEqual(results(expected), results(actual))
+        self.assertEqual(
+            results(uninterrupted.learner.explanations),
+            results(resumed.learner.explanations),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+from avicenna._data import AvicennaInput
+from avicenna._learning._constructor import AtomicFormulaInstantiation
+
+GRAMMAR = {
+    "<start>": ["<arith_expr>"],
+    "<arith_expr>": ["<function>(<number>)"],
+    "<function>": ["sqrt", "sin", "cos", "tan"],
+    "<number>": ["<maybe_minus><onenine><maybe_digits>"],
+    "<maybe_minus>": ["", "-"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+    "<digit>": [str(num) for num in range(0, 10)],
+    "<maybe_digits>": ["", "<digits>"],
+    "<digits>": ["<digit>", "<digit><digits>"],
+}
+
+INPUTS = ["sqrt(-1)", "sqrt(-12)", "sin(-3)", "cos(4)", "tan(-50)", "sqrt(-7)"]
+
+
+def generated_candidates(patterns, trees):
+    """
+    Stands in for the instantiation of the patterns: one candidate per instantiating
+    tree.
+    """
+    return {str(tree) for tree in trees}
+
+
+def inputs(*strings: str) -> set[AvicennaInput]:
+    return {AvicennaInput.from_str(GRAMMAR, inp) for inp in strings}
+
+
+class TestIncrementalInstantiation(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(
+            AtomicFormulaInstantiation,
+            "generate_candidates",
+            side_effect=generated_candidates,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_inputs_are_instantiated_once(self):
+        constructor = AtomicFormulaInstantiation(
+            GRAMMAR, max_positive_inputs_for_learning=2
+        )
+        positive_inputs = inputs(*INPUTS)
+        instantiated = set()
+        for _ in range(3):
+            candidates = constructor.construct_candidates(positive_inputs)
+            self.assertEqual(2, len(candidates))
+            self.assertFalse(candidates & instantiated)
+            instantiated |= candidates
+        self.assertEqual(set(INPUTS), instantiated)
+        self.assertEqual(set(), constructor.construct_candidates(positive_inputs))
+
+    def test_new_inputs_cover_new_paths_first(self):
+        constructor = AtomicFormulaInstantiation(
+            GRAMMAR, max_positive_inputs_for_learning=1
+        )
+        constructor.construct_candidates(inputs("sqrt(-1)"))
+        # sqrt(-7) covers no new k-paths, cos(42) covers the digits
+        self.assertEqual(
+            {"cos(42)"}, constructor.construct_candidates(inputs("sqrt(-7)", "cos(42)"))
+        )
+
+    def test_changed_exclusions_start_over(self):
+        constructor = AtomicFormulaInstantiation(GRAMMAR)
+        positive_inputs = inputs(*INPUTS)
+        self.assertEqual(set(INPUTS), constructor.construct_candidates(positive_inputs))
+        self.assertEqual(
+            set(INPUTS),
+            constructor.construct_candidates(positive_inputs, {"<maybe_digits>"}),
+        )
+        self.assertEqual(
+            set(),
+            constructor.construct_candidates(positive_inputs, {"<maybe_digits>"}),
+        )
+
+    def test_k_path_cache_is_bounded(self):
+        constructor = AtomicFormulaInstantiation(
+            GRAMMAR, max_positive_inputs_for_learning=1, max_cached_inputs=3
+        )
+        positive_inputs = inputs(*INPUTS)
+        constructor.construct_candidates(positive_inputs)
+        self.assertLessEqual(len(constructor._tree_paths), 3)
+        # the k-paths of instantiated inputs are dropped
+        self.assertFalse(set(constructor._tree_paths) & constructor.instantiated_inputs)
+
+
+if __name__ == "__main__":
+    unittest.main()
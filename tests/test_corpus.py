@@ -0,0 +1,101 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from dbg.data.oracle import OracleResult
+
+from dbg_evaluation.corpus import Corpus
+
+RECORDS = [
+    ("sqrt(-900)", OracleResult.FAILING, b"\x00tree"),
+    ("cos(10)", OracleResult.PASSING, None),
+    ("tan(5)", OracleResult.UNDEFINED, b"\x01"),
+    ("sin(-31)", None, None),
+]
+
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "corpus"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_append_and_read(self):
+        self.assertFalse(Corpus.exists(self.path))
+        with Corpus(self.path) as corpus:
+            self.assertEqual([0, 1, 2, 3], corpus.extend(RECORDS))
+            self.assertEqual(4, corpus.append("sqrt(-1)", OracleResult.FAILING))
+        self.assertTrue(Corpus.exists(self.path))
+
+        with Corpus(self.path) as corpus:
+            self.assertEqual(5, len(corpus))
+            for idx, (string, label, tree) in enumerate(RECORDS):
+                record = corpus[idx]
+                self.assertEqual(
+                    (string, label, tree), (record.string, record.label, record.tree)
+                )
+                self.assertEqual(Corpus.hash(string), record.hash)
+            self.assertEqual("sqrt(-1)", corpus[-1].string)
+            with self.assertRaises(IndexError):
+                corpus[5]
+            self.assertEqual(
+                [string for string, _, _ in RECORDS] + ["sqrt(-1)"],
+                [record.string for record in corpus],
+            )
+
+    def test_deduplication(self):
+        with Corpus(self.path) as corpus:
+            corpus.extend(RECORDS)
+        with Corpus(self.path) as corpus:
+            self.assertEqual(
+                [1, 4, 4],
+                corpus.extend([RECORDS[1], ("x", None, None), ("x", None, None)]),
+            )
+            self.assertIn("x", corpus)
+            self.assertNotIn("y", corpus)
+            self.assertEqual(5, corpus.append("x", deduplicate=False))
+            self.assertEqual(6, len(corpus))
+
+    def test_interrupted_append_is_truncated(self):
+        with Corpus(self.path) as corpus:
+            corpus.extend(RECORDS[:2])
+            size = corpus.data_path.stat().st_size
+        # an append that wrote its record but not its index entry
+        with open(self.path / Corpus.DATA_FILE, "ab") as data:
+            data.write(b"incomplete record")
+
+        with Corpus(self.path) as corpus:
+            self.assertEqual(2, len(corpus))
+            self.assertEqual([2], corpus.extend(RECORDS[2:3]))
+            self.assertEqual(
+                [string for string, _, _ in RECORDS[:3]],
+                [record.string for record in corpus.records()],
+            )
+            self.assertGreater(corpus.data_path.stat().st_size, size)
+            self.assertEqual(RECORDS[2][2], corpus[2].tree)
+
+    def test_records_filter(self):
+        with Corpus(self.path) as corpus:
+            corpus.extend(RECORDS + [("sqrt(-1)", OracleResult.FAILING, b"\x02")])
+            self.assertEqual(
+                ["sqrt(-900)", "sqrt(-1)"],
+                [r.string for r in corpus.records(label=OracleResult.FAILING)],
+            )
+            self.assertEqual(
+                ["sqrt(-900)"],
+                [r.string for r in corpus.records(OracleResult.FAILING, limit=1)],
+            )
+            self.assertEqual([], list(corpus.records(limit=0)))
+            self.assertEqual(
+                [None] * 5, [r.tree for r in corpus.records(with_trees=False)]
+            )
+            self.assertEqual(
+                ["cos(10)"],
+                [r.string for r in corpus.records(label=OracleResult.PASSING)],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import unittest
+from unittest import mock
+
+from isla.language import parse_isla
+
+from dbg.data.oracle import OracleResult
+from dbg.deadline import Deadline, DeadlineExceeded
+
+from avicenna._data import AvicennaInput
+from avicenna._learner import AvicennaExplanation
+from avicenna._learning._evaluator import ExplanationEvaluator
+
+from test_explain_iter import CharacterLearner, create_explainer
+from test_islearn_search import (
+    ATOMS,
+    GRAMMAR,
+    INPUTS,
+    create_learner,
+    evaluated_atoms,
+)
+
+
+def sqrt_oracle(inp: str) -> OracleResult:
+    return OracleResult.FAILING if inp.startswith("sqrt(-") else OracleResult.PASSING
+
+
+def sqrt_or_tan_oracle(inp: str) -> OracleResult:
+    return (
+        OracleResult.FAILING
+        if inp.startswith("sqrt(-") or inp.startswith("tan(-")
+        else OracleResult.PASSING
+    )
+
+
+def cancelled() -> Deadline:
+    deadline = Deadline()
+    deadline.cancel()
+    return deadline
+
+
+class ExpiringDeadline(Deadline):
+    """
+    A deadline that expires after it has been checked a given number of times.
+    """
+
+    def __init__(self, checks: int):
+        super().__init__()
+        self.checks = checks
+
+    def expired(self) -> bool:
+        self.checks -= 1
+        return self.checks < 0
+
+
+def labeled_inputs() -> set[AvicennaInput]:
+    return {AvicennaInput.from_str(GRAMMAR, inp, sqrt_oracle(inp)) for inp in INPUTS}
+
+
+class TestDeadline(unittest.TestCase):
+    def test_without_timeout(self):
+        deadline = Deadline()
+        self.assertIsNone(deadline.remaining_seconds())
+        self.assertFalse(deadline.expired())
+        deadline.check()
+
+    def test_timeout(self):
+        self.assertFalse(Deadline(3600).expired())
+        self.assertGreater(Deadline(3600).remaining_seconds(), 0.0)
+        deadline = Deadline(0)
+        self.assertEqual(0.0, deadline.remaining_seconds())
+        self.assertTrue(deadline.expired())
+        with self.assertRaises(DeadlineExceeded):
+            deadline.check()
+
+    def test_cancel(self):
+        deadline = Deadline(3600)
+        deadline.cancel()
+        self.assertEqual(0.0, deadline.remaining_seconds())
+        self.assertTrue(deadline.expired())
+        self.assertRaises(TimeoutError, deadline.check)
+
+    def test_has_expired(self):
+        self.assertFalse(Deadline.has_expired(None))
+        self.assertFalse(Deadline.has_expired(Deadline()))
+        self.assertTrue(Deadline.has_expired(cancelled()))
+
+
+class TestEvaluatorDeadline(unittest.TestCase):
+    def test_expired_deadline_does_not_reject(self):
+        explanations = [
+            AvicennaExplanation(parse_isla(atom, GRAMMAR)) for atom in ATOMS
+        ]
+        rejected = ExplanationEvaluator(GRAMMAR).evaluate(
+            explanations, labeled_inputs(), min_recall=0.9, deadline=cancelled()
+        )
+        self.assertEqual(set(), rejected)
+        for explanation in explanations:
+            self.assertEqual({}, explanation.cache)
+
+    def test_evaluation_continues_after_deadline(self):
+        inputs = labeled_inputs()
+        evaluator = ExplanationEvaluator(GRAMMAR)
+        interrupted = [AvicennaExplanation(parse_isla(atom, GRAMMAR)) for atom in ATOMS]
+        full = [AvicennaExplanation(parse_isla(atom, GRAMMAR)) for atom in ATOMS]
+
+        evaluator.evaluate(interrupted, inputs, deadline=ExpiringDeadline(5))
+        self.assertEqual(5, sum(len(e.cache) for e in interrupted))
+        evaluator.evaluate(interrupted, inputs)
+        evaluator.evaluate(full, inputs)
+        self.assertEqual(
+            [explanation.cache for explanation in full],
+            [explanation.cache for explanation in interrupted],
+        )
+
+
+class TestLearnerDeadline(unittest.TestCase):
+    def test_conjunctions_with_expired_deadline(self):
+        learner = create_learner(max_conjunction_size=2)
+        atoms = evaluated_atoms(sqrt_oracle)
+        self.assertEqual([], learner.get_conjunctions(atoms, cancelled()))
+
+    def test_disjunctions_with_expired_deadline(self):
+        learner = create_learner(max_disjunction_size=2)
+        atoms = evaluated_atoms(sqrt_or_tan_oracle)
+        self.assertEqual([], learner.get_disjunctions(atoms, cancelled()))
+
+    def test_learning_with_expired_deadline(self):
+        learner = create_learner()
+        with mock.patch.object(
+            learner.atomic_candidate_constructor, "construct_candidates"
+        ) as construct_candidates:
+            explanations = learner.learn_explanation(
+                labeled_inputs(), deadline=cancelled()
+            )
+        construct_candidates.assert_not_called()
+        self.assertEqual(0, len(explanations))
+
+    def test_candidates_are_validated_in_the_next_call(self):
+        learner = create_learner()
+        inputs = labeled_inputs()
+        learner.update_inputs(*learner.categorize_inputs(inputs))
+        candidates = [AvicennaExplanation(parse_isla(atom, GRAMMAR)) for atom in ATOMS]
+
+        learner.validate_and_add_new_candidates(candidates, set(), set(), cancelled())
+        self.assertEqual(0, len(learner.explanations))
+        self.assertEqual(0, len(learner.removed_explanations))
+        self.assertEqual(len(candidates), len(learner.pending_explanations))
+
+        learner.validate_and_add_new_candidates(candidates, set(), set())
+        self.assertEqual(
+            len(candidates),
+            len(learner.explanations) + len(learner.removed_explanations),
+        )
+
+
+class CancellingLearner(CharacterLearner):
+    def learn_explanation(self, test_inputs, **kwargs):
+        kwargs["deadline"].cancel()
+        return super().learn_explanation(test_inputs, **kwargs)
+
+
+class TestExplainerDeadline(unittest.TestCase):
+    def test_run_stops_when_the_deadline_expires(self):
+        explainer = create_explainer(max_iterations=5)
+        explainer.learner = CancellingLearner()
+        with mock.patch.object(
+            explainer, "generate_test_inputs", side_effect=AssertionError
+        ):
+            explanations = explainer.explain()
+        self.assertTrue(explainer.deadline.expired())
+        self.assertTrue(explanations)
+
+
+if __name__ == "__main__":
+    unittest.main()
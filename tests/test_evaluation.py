@@ -0,0 +1,118 @@
+import tempfile
+import unittest
+
+from dbg_evaluation.evaluation import CandidateEvaluator, fingerprint_inputs
+from dbg_evaluation.util import format_results
+
+from explanations import ContainsExplanation, labeled
+
+EVALUATION_INPUTS = ["ab", "a", "ac", "bc", "b", "abc", "cd", "ad", "d"]
+
+
+class CountingExplanation(ContainsExplanation):
+    evaluations = 0
+
+    def evaluate(self, test_inputs, **kwargs):
+        CountingExplanation.evaluations += 1
+        super().evaluate(test_inputs, **kwargs)
+
+
+class BrokenExplanation(ContainsExplanation):
+    def evaluate(self, test_inputs, **kwargs):
+        raise ValueError("cannot evaluate")
+
+
+def evaluated_directly(explanation: str) -> ContainsExplanation:
+    candidate = ContainsExplanation(explanation)
+    candidate.evaluate(labeled(*EVALUATION_INPUTS))
+    return candidate
+
+
+class TestCandidateEvaluator(unittest.TestCase):
+    def setUp(self):
+        CountingExplanation.evaluations = 0
+
+    def assert_results(self, candidate):
+        expected = evaluated_directly(candidate.explanation)
+        self.assertEqual(expected.cache, candidate.cache)
+        self.assertEqual(expected.confusion_counts(), candidate.confusion_counts())
+
+    def test_results_are_cached(self):
+        evaluator = CandidateEvaluator(labeled(*EVALUATION_INPUTS))
+        candidates = [CountingExplanation(e) for e in ("a", "b", "a")]
+        self.assertEqual(candidates, evaluator.evaluate(candidates))
+        self.assertEqual(2, CountingExplanation.evaluations)
+        for candidate in candidates:
+            self.assert_results(candidate)
+
+        again = [CountingExplanation("b"), CountingExplanation("cd")]
+        evaluator.evaluate(again)
+        self.assertEqual(3, CountingExplanation.evaluations)
+        for candidate in again:
+            self.assert_results(candidate)
+
+    def test_cache_directory_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = CandidateEvaluator(
+                labeled(*EVALUATION_INPUTS), cache_directory=directory
+            )
+            first.evaluate([CountingExplanation("ab")])
+            second = CandidateEvaluator(
+                labeled(*reversed(EVALUATION_INPUTS)), cache_directory=directory
+            )
+            candidate = CountingExplanation("ab")
+            second.evaluate([candidate])
+            self.assertEqual(1, CountingExplanation.evaluations)
+            self.assert_results(candidate)
+
+            # other evaluation inputs are cached separately
+            third = CandidateEvaluator(labeled("a", "b"), cache_directory=directory)
+            third.evaluate([CountingExplanation("ab")])
+            self.assertEqual(2, CountingExplanation.evaluations)
+
+    def test_failed_candidates_are_left_out(self):
+        evaluator = CandidateEvaluator(labeled(*EVALUATION_INPUTS))
+        candidates = [BrokenExplanation("a"), ContainsExplanation("b")]
+        self.assertEqual(candidates[1:], evaluator.evaluate(candidates))
+        self.assertEqual([], evaluator.evaluate([BrokenExplanation("a")]))
+
+    def test_parallel_evaluation(self):
+        evaluator = CandidateEvaluator(labeled(*EVALUATION_INPUTS), workers=2)
+        candidates = [ContainsExplanation(e) for e in ("a", "b", "cd")]
+        self.assertEqual(candidates, evaluator.evaluate(candidates))
+        for candidate in candidates:
+            self.assert_results(candidate)
+
+    def test_fingerprint_does_not_depend_on_order(self):
+        self.assertEqual(
+            fingerprint_inputs(labeled(*EVALUATION_INPUTS)),
+            fingerprint_inputs(list(labeled(*EVALUATION_INPUTS))[::-1]),
+        )
+        self.assertNotEqual(
+            fingerprint_inputs(labeled("a")), fingerprint_inputs(labeled("b"))
+        )
+
+
+class TestFormatResults(unittest.TestCase):
+    def test_format_results(self):
+        candidates = [ContainsExplanation(e) for e in ("b", "a", "ad")]
+        result = format_results(
+            "test", candidates, 1.5, labeled(*EVALUATION_INPUTS), seed=1
+        )
+        self.assertEqual(["a"], [str(e) for e in result["best_candidates"]])
+        best = evaluated_directly("a")
+        self.assertEqual(best.precision(), result["precision"])
+        self.assertEqual(best.recall(), result["recall"])
+        self.assertAlmostEqual(
+            sum(evaluated_directly(e).recall() for e in ("b", "a", "ad")) / 3,
+            result["avg_recall"],
+        )
+
+    def test_format_results_without_candidates(self):
+        result = format_results("test", [], 1.5, labeled(*EVALUATION_INPUTS), seed=1)
+        self.assertIsNone(result["best_candidates"])
+        self.assertIsNone(result["precision"])
+
+
+if __name__ == "__main__":
+    unittest.main()
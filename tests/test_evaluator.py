@@ -0,0 +1,223 @@
+import threading
+import unittest
+from concurrent.futures import Future
+
+from isla.language import parse_isla
+
+from dbg.data.oracle import OracleResult
+from dbg.deadline import Deadline
+
+from avicenna._data import AvicennaInput
+from avicenna._learner import AvicennaExplanation
+from avicenna._learning._evaluator import (
+    EvaluationBound,
+    ExplanationEvaluator,
+    ParallelExplanationEvaluator,
+)
+
+GRAMMAR = {
+    "<start>": ["<arith_expr>"],
+    "<arith_expr>": ["<function>(<number>)"],
+    "<function>": ["sqrt", "sin", "cos", "tan"],
+    "<number>": ["<maybe_minus><onenine><maybe_digits>"],
+    "<maybe_minus>": ["", "-"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+    "<digit>": [str(num) for num in range(0, 10)],
+    "<maybe_digits>": ["", "<digits>"],
+    "<digits>": ["<digit>", "<digit><digits>"],
+}
+
+INPUTS = [
+    "sqrt(-900)",
+    "sqrt(-1)",
+    "sqrt(-12)",
+    "sqrt(4)",
+    "tan(-3)",
+    "tan(9)",
+    "cos(-10)",
+    "cos(5)",
+    "sin(-31)",
+    "sin(2)",
+]
+
+ATOMS = [
+    'exists <function> elem in start: (= elem "sqrt")',
+    'exists <maybe_minus> elem in start: (= elem "-")',
+    'exists <onenine> elem in start: (= elem "1")',
+    'forall <digit> elem in start: (= elem "0")',
+]
+
+
+def oracle(inp: str) -> OracleResult:
+    return OracleResult.FAILING if inp.startswith("sqrt(-") else OracleResult.PASSING
+
+
+def labeled_inputs() -> set[AvicennaInput]:
+    return {AvicennaInput.from_str(GRAMMAR, inp, oracle(inp)) for inp in INPUTS}
+
+
+def explanations() -> list[AvicennaExplanation]:
+    return [AvicennaExplanation(parse_isla(atom, GRAMMAR)) for atom in ATOMS]
+
+
+def results(evaluated: list[AvicennaExplanation]) -> list[dict[str, bool]]:
+    return [
+        {str(inp): result for inp, result in explanation.cache.items()}
+        for explanation in evaluated
+    ]
+
+
+class CountingPool:
+    """
+    Wraps a process pool and records the submitted (formula, input) pairs.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.submitted = []
+
+    def submit(self, function, formula, trees):
+        self.submitted.extend((formula, str(tree)) for tree in trees)
+        return self.pool.submit(function, formula, trees)
+
+    def shutdown(self, **kwargs):
+        self.pool.shutdown(**kwargs)
+
+
+class TestEvaluationBound(unittest.TestCase):
+    def test_bound_becomes_unreachable(self):
+        inputs = sorted(
+            labeled_inputs(), key=lambda inp: inp.oracle != OracleResult.FAILING
+        )
+        explanation = explanations()[1]
+        bound = EvaluationBound(explanation, inputs, min_recall=0.9)
+        self.assertTrue(bound.is_reachable())
+        # the three failing inputs come first; 2 of 3 are not enough for a recall of 0.9
+        bound.update(inputs[0], False)
+        self.assertFalse(bound.is_reachable())
+
+    def test_bound_counts_earlier_results(self):
+        inputs = sorted(labeled_inputs(), key=str)
+        explanation = explanations()[0]
+        explanation.evaluate(set(inputs[:5]), ExplanationEvaluator(GRAMMAR).graph)
+        bound = EvaluationBound(
+            explanation, inputs[5:], min_recall=1.0, min_specificity=0.9
+        )
+        self.assertEqual(len(inputs), bound.total_failing + bound.total_passing)
+        self.assertTrue(bound.is_reachable())
+        for inp in inputs[5:]:
+            bound.update(inp, inp.oracle == OracleResult.FAILING)
+        self.assertTrue(bound.is_reachable())
+
+    def test_without_minimum(self):
+        bound = EvaluationBound(explanations()[0], list(labeled_inputs()))
+        for inp in labeled_inputs():
+            bound.update(inp, False)
+        self.assertTrue(bound.is_reachable())
+
+
+class TestExplanationEvaluator(unittest.TestCase):
+    def test_early_termination_matches_full_evaluation(self):
+        inputs = labeled_inputs()
+        evaluator = ExplanationEvaluator(GRAMMAR)
+        full, bounded = explanations(), explanations()
+        evaluator.evaluate(full, inputs)
+        rejected = evaluator.evaluate(
+            bounded, inputs, min_recall=0.9, min_specificity=0.5
+        )
+        self.assertEqual(
+            {
+                str(explanation)
+                for explanation in full
+                if explanation.recall() < 0.9 or explanation.specificity() < 0.5
+            },
+            {str(explanation) for explanation in rejected},
+        )
+        # the rejected explanations are evaluated on fewer inputs
+        for explanation in bounded:
+            if explanation in rejected:
+                self.assertLess(len(explanation.cache), len(inputs))
+            else:
+                self.assertEqual(len(inputs), len(explanation.cache))
+
+
+class TestParallelExplanationEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = ParallelExplanationEvaluator(GRAMMAR, workers=2, chunk_size=3)
+
+    def tearDown(self):
+        self.evaluator.shutdown()
+
+    def test_same_results_as_serial_evaluation(self):
+        inputs = labeled_inputs()
+        expected, actual = explanations(), explanations()
+        ExplanationEvaluator(GRAMMAR).evaluate(expected, inputs)
+        self.assertEqual(set(), self.evaluator.evaluate(actual, inputs))
+        self.assertEqual(results(expected), results(actual))
+        for first, second in zip(expected, actual):
+            self.assertEqual(first.confusion_counts(), second.confusion_counts())
+
+    def test_rejects_unreachable_explanations(self):
+        inputs = labeled_inputs()
+        evaluated = explanations()
+        rejected = self.evaluator.evaluate(evaluated, inputs, min_recall=0.9)
+        # only the first two atoms hold on all failing inputs
+        self.assertEqual(set(evaluated[2:]), rejected)
+
+    def test_in_flight_chunks_are_merged_instead_of_resubmitted(self):
+        inputs = sorted(labeled_inputs(), key=str)
+        evaluated = explanations()
+        expected = explanations()
+        ExplanationEvaluator(GRAMMAR).evaluate(expected, set(inputs))
+        running, finished = Future(), Future()
+        running.set_running_or_notify_cancel()
+        finished.set_running_or_notify_cancel()
+        finished.set_result([expected[0].cache[inp] for inp in inputs[:2]])
+        # chunks of a call whose deadline expired; the explanation is an equal copy
+        self.evaluator._in_flight = {
+            finished: (explanations()[0], inputs[:2]),
+            running: (explanations()[1], inputs[:3]),
+        }
+
+        pool = CountingPool(self.evaluator._get_pool())
+        self.evaluator._pool = pool
+        threading.Timer(
+            0.2,
+            running.set_result,
+            [[expected[1].cache[inp] for inp in inputs[:3]]],
+        ).start()
+        self.assertEqual(set(), self.evaluator.evaluate(evaluated, set(inputs)))
+
+        self.assertEqual(results(expected), results(evaluated))
+        self.assertEqual(len(ATOMS) * len(inputs) - 2 - 3, len(pool.submitted))
+        self.assertFalse(
+            {(evaluated[0].explanation, str(inp.tree)) for inp in inputs[:2]}
+            & set(pool.submitted)
+        )
+        self.assertEqual({}, self.evaluator._in_flight)
+
+    def test_evaluation_continues_after_deadline(self):
+        inputs = labeled_inputs()
+        evaluated, expected = explanations(), explanations()
+        ExplanationEvaluator(GRAMMAR).evaluate(expected, inputs)
+        deadline = Deadline()
+        deadline.cancel()
+        self.assertEqual(
+            set(), self.evaluator.evaluate(evaluated, inputs, deadline=deadline)
+        )
+        self.assertEqual(set(), self.evaluator.evaluate(evaluated, inputs))
+        self.assertEqual(results(expected), results(evaluated))
+
+    def test_shutdown(self):
+        self.evaluator.evaluate(explanations(), labeled_inputs())
+        self.assertIsNotNone(self.evaluator._pool)
+        self.evaluator.shutdown()
+        self.assertIsNone(self.evaluator._pool)
+        # the pool is recreated on demand
+        self.assertEqual(
+            set(), self.evaluator.evaluate(explanations(), labeled_inputs())
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import unittest
+from unittest import mock
+
+from dbg.core import HypothesisBasedExplainer
+from dbg.data.oracle import OracleResult
+from dbg.generator.generator import Generator
+from dbg.learner.learner import Learner
+
+from explanations import ContainsExplanation, StringInput, labeled
+
+
+class CharacterExplanation(ContainsExplanation):
+    def __neg__(self):
+        # the generator ignores the hypotheses, so the negation does not matter
+        return self
+
+
+class CharacterLearner(Learner):
+    def learn_explanation(self, test_inputs, **kwargs):
+        for char in "abcd":
+            self.explanations.append(CharacterExplanation(char))
+        for explanation in self.explanations:
+            explanation.evaluate(test_inputs)
+        return self.explanations
+
+
+class RandomStringGenerator(Generator):
+    def generate(self, *args, **kwargs):
+        pass
+
+    def generate_test_inputs(self, explanation=None, **kwargs):
+        return {
+            StringInput("".join(random.choice("abcd") for _ in range(3)))
+            for _ in range(5)
+        }
+
+
+def oracle(inp) -> OracleResult:
+    return OracleResult.FAILING if "a" in str(inp) else OracleResult.PASSING
+
+
+def create_explainer(max_iterations: int = 3) -> HypothesisBasedExplainer:
+    explainer = HypothesisBasedExplainer(
+        None,
+        oracle,
+        [],
+        CharacterLearner(),
+        RandomStringGenerator(None),
+        max_iterations=max_iterations,
+    )
+    explainer.initial_inputs = labeled("xa", "xb")
+    return explainer
+
+
+class TestExplainIter(unittest.TestCase):
+    def setUp(self):
+        random.seed(1)
+
+    def test_snapshots_after_every_iteration(self):
+        snapshots = list(create_explainer().explain_iter(top_n=2))
+        self.assertEqual([0, 1, 2], [snapshot.iteration for snapshot in snapshots])
+        for snapshot in snapshots:
+            self.assertIsNone(snapshot.phase)
+            self.assertEqual(2, len(snapshot.ranked))
+            self.assertEqual("a", str(next(iter(snapshot.best_candidates))))
+
+    def test_snapshots_after_learning(self):
+        snapshots = list(create_explainer(1).explain_iter(after_learning=True))
+        self.assertGreater(len(snapshots), 1)
+        self.assertIsNone(snapshots[-1].phase)
+        self.assertTrue(all(snapshot.phase for snapshot in snapshots[:-1]))
+
+    def test_consumer_can_stop_the_run(self):
+        explainer = create_explainer(max_iterations=10)
+        for snapshot in explainer.explain_iter():
+            if snapshot.iteration == 1:
+                break
+        self.assertEqual(2, explainer.metrics.iteration)
+
+    def test_explain_takes_no_snapshots(self):
+        explainer = create_explainer()
+        with mock.patch.object(
+            HypothesisBasedExplainer, "snapshot", side_effect=AssertionError
+        ):
+            best = explainer.explain()
+        self.assertEqual(["a"], [str(explanation) for explanation in best])
+        self.assertEqual(3, explainer.metrics.iteration)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from dbg.explanation.candidate import ExplanationSet
+from dbg.learner.learner import Learner
+from dbg.learner.metric import F1ScoreFitness, RecallPriorityLengthFitness
+
+from explanations import ContainsExplanation, labeled
+
+
+class FixedLearner(Learner):
+    def learn_explanation(self, test_inputs, **kwargs):
+        for explanation in self.explanations:
+            explanation.evaluate(test_inputs)
+        return self.explanations
+
+
+class TestExplanationRanking(unittest.TestCase):
+    def test_ranking_is_updated_when_results_change(self):
+        strategy = RecallPriorityLengthFitness()
+        a, b = ContainsExplanation("a"), ContainsExplanation("b")
+        explanations = ExplanationSet([a, b])
+        a.evaluate(labeled("b"))
+        b.evaluate(labeled("ab"))
+
+        ranking = explanations.ranking(strategy.evaluate)
+        self.assertEqual([b], ranking.top())
+
+        # new evaluation results invalidate the cached keys of the ranking
+        test_inputs = labeled("ab", "a", "ac", "bc")
+        a.evaluate(test_inputs)
+        b.evaluate(test_inputs)
+        self.assertEqual([a], ranking.top())
+        self.assertEqual([a, b], ranking.ranked())
+        self.assertEqual([a], ranking.ranked(1))
+
+        a.reset()
+        self.assertEqual([b], ranking.top())
+
+    def test_ranking_follows_append_and_remove(self):
+        strategy = RecallPriorityLengthFitness()
+        test_inputs = labeled("ab", "a", "b")
+        a, b, c = (ContainsExplanation(char) for char in "abc")
+        for explanation in (a, b, c):
+            explanation.evaluate(test_inputs)
+        explanations = ExplanationSet([b, c])
+        ranking = explanations.ranking(strategy.evaluate)
+        explanations.append(a)
+        self.assertEqual([a], ranking.top())
+        explanations.remove(a)
+        self.assertEqual([b], ranking.top())
+        self.assertEqual([b, c], ranking.ranked())
+
+    def test_ranking_matches_sorting(self):
+        test_inputs = labeled("ab", "a", "ac", "bc", "b", "abc", "cd", "ad")
+        explanations = ExplanationSet(
+            [ContainsExplanation(e) for e in ("a", "b", "c", "d", "ab", "ac", "bcd")]
+        )
+        for explanation in explanations:
+            explanation.evaluate(test_inputs)
+
+        for strategy in (RecallPriorityLengthFitness(), F1ScoreFitness()):
+            with self.subTest(type(strategy).__name__):
+                expected = sorted(explanations, key=strategy.evaluate, reverse=True)
+                ranking = explanations.ranking(strategy.evaluate)
+                for n in range(len(expected) + 1):
+                    self.assertEqual(
+                        [strategy.evaluate(e) for e in expected[:n]],
+                        [strategy.evaluate(e) for e in ranking.ranked(n)],
+                    )
+                self.assertEqual(ranking.ranked(), ranking.ranked(len(expected)))
+
+
+class TestLearnerRanking(unittest.TestCase):
+    def test_learner_ranks_through_the_ranking(self):
+        learner = FixedLearner()
+        learner.explanations = ExplanationSet(
+            [ContainsExplanation(e) for e in ("a", "b", "ab")]
+        )
+        learner.learn_explanation(labeled("ab", "a", "b"))
+        self.assertEqual(["a"], [str(e) for e in learner.get_best_candidates()])
+        self.assertEqual(
+            ["a", "ab", "b"], [str(e) for e in learner.get_ranked_candidates()]
+        )
+        self.assertEqual(
+            ["a", "ab"], [str(e) for e in learner.get_ranked_candidates(2)]
+        )
+
+        # the ranking is kept and updated incrementally
+        ranking = learner.explanations.ranking(learner.sorting_strategy.evaluate)
+        learner.explanations.append(ContainsExplanation("ax"))
+        learner.learn_explanation(labeled("ax"))
+        self.assertIs(ranking, learner._get_ranking())
+        self.assertEqual(["a"], [str(e) for e in learner.get_best_candidates()])
+
+
+if __name__ == "__main__":
+    unittest.main()
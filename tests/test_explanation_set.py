@@ -0,0 +1,101 @@
+import pickle
+import unittest
+
+from dbg.explanation.candidate import ExplanationSet
+
+from explanations import ContainsExplanation
+
+
+class UnparsedExplanation(ContainsExplanation):
+    """
+    Counts how often the explanation is converted to a string.
+    """
+
+    def __init__(self, explanation):
+        self.unparsed = 0
+        super().__init__(explanation)
+
+    def __str__(self):
+        self.unparsed += 1
+        return super().__str__()
+
+
+def explanation_strings(explanations) -> list[str]:
+    return [explanation.explanation for explanation in explanations]
+
+
+class TestExplanationSet(unittest.TestCase):
+    def test_membership(self):
+        explanations = ExplanationSet([ContainsExplanation(c) for c in "abc"])
+        self.assertIn(ContainsExplanation("b"), explanations)
+        self.assertNotIn(ContainsExplanation("d"), explanations)
+        explanations.append(ContainsExplanation("b"))
+        self.assertEqual(["a", "b", "c"], explanation_strings(explanations))
+
+    def test_remove(self):
+        explanations = ExplanationSet([ContainsExplanation(c) for c in "abc"])
+        explanations.remove(ContainsExplanation("a"))
+        explanations.remove(ContainsExplanation("d"))
+        self.assertEqual(["c", "b"], explanation_strings(explanations))
+        self.assertNotIn(ContainsExplanation("a"), explanations)
+        explanations.append(ContainsExplanation("a"))
+        self.assertIn(ContainsExplanation("a"), explanations)
+        self.assertIn(ContainsExplanation("c"), explanations)
+
+    def test_difference_and_intersection(self):
+        explanations = ExplanationSet([ContainsExplanation(c) for c in "abc"])
+        other = [ContainsExplanation("b"), ContainsExplanation("d")]
+        self.assertEqual(
+            ["a", "c"], explanation_strings(explanations.difference(other))
+        )
+        self.assertEqual(["b"], explanation_strings(explanations.intersection(other)))
+
+    def test_hashing_does_not_unparse(self):
+        explanation = UnparsedExplanation("ab")
+        explanations = ExplanationSet([explanation])
+        self.assertIn(UnparsedExplanation("ab"), explanations)
+        self.assertEqual(hash(ContainsExplanation("ab")), hash(explanation))
+        self.assertEqual(0, explanation.unparsed)
+
+    def test_hash_survives_pickling(self):
+        explanations = ExplanationSet([ContainsExplanation(c) for c in "abc"])
+        copied = pickle.loads(pickle.dumps(explanations))
+        self.assertIn(ContainsExplanation("b"), copied)
+        copied.remove(ContainsExplanation("a"))
+        self.assertEqual(["c", "b"], explanation_strings(copied))
+
+
+class TestFingerprintDeduplication(unittest.TestCase):
+    def test_equivalent_explanations_are_deduplicated(self):
+        explanations = ExplanationSet(
+            [
+                ContainsExplanation("ab"),
+                ContainsExplanation("ba"),
+                ContainsExplanation("abb"),
+            ]
+        )
+        self.assertEqual(["ab"], explanation_strings(explanations))
+        self.assertIn(ContainsExplanation("bba"), explanations)
+        self.assertIs(
+            explanations.explanations[0],
+            explanations.get(ContainsExplanation("ba").fingerprint()),
+        )
+
+    def test_remove_by_fingerprint(self):
+        explanations = ExplanationSet(
+            [ContainsExplanation("ab"), ContainsExplanation("c")]
+        )
+        explanations.remove(ContainsExplanation("ba"))
+        self.assertEqual(["c"], explanation_strings(explanations))
+        self.assertNotIn(ContainsExplanation("ab"), explanations)
+
+    def test_difference_by_fingerprint(self):
+        explanations = ExplanationSet([ContainsExplanation(e) for e in ("ab", "c")])
+        self.assertEqual(
+            ["c"],
+            explanation_strings(explanations.difference([ContainsExplanation("ba")])),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+import itertools
+import unittest
+from typing import Callable, List
+
+from isla.language import parse_isla
+
+from dbg.data.oracle import OracleResult
+
+from avicenna._data import AvicennaInput
+from avicenna._learner import AvicennaExplanation
+from avicenna._learning._evaluator import ExplanationEvaluator
+from avicenna._learning._islearn import OptimizedISLearnLearner
+
+GRAMMAR = {
+    "<start>": ["<arith_expr>"],
+    "<arith_expr>": ["<function>(<number>)"],
+    "<function>": ["sqrt", "sin", "cos", "tan"],
+    "<number>": ["<maybe_minus><onenine><maybe_digits>"],
+    "<maybe_minus>": ["", "-"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+    "<digit>": [str(num) for num in range(0, 10)],
+    "<maybe_digits>": ["", "<digits>"],
+    "<digits>": ["<digit>", "<digit><digits>"],
+}
+
+INPUTS = [
+    "sqrt(-900)",
+    "sqrt(-1)",
+    "sqrt(-12)",
+    "sqrt(-7)",
+    "sqrt(4)",
+    "sqrt(81)",
+    "tan(-3)",
+    "tan(-45)",
+    "tan(9)",
+    "cos(-10)",
+    "cos(5)",
+    "sin(-31)",
+    "sin(2)",
+    "sin(17)",
+]
+
+ATOMS = [
+    'exists <function> elem in start: (= elem "sqrt")',
+    'exists <function> elem in start: (= elem "tan")',
+    'exists <function> elem in start: (= elem "cos")',
+    'exists <maybe_minus> elem in start: (= elem "-")',
+    'exists <onenine> elem in start: (= elem "1")',
+    'exists <maybe_digits> elem in start: (= elem "")',
+    'forall <digit> elem in start: (= elem "0")',
+]
+
+
+def create_learner(**kwargs) -> OptimizedISLearnLearner:
+    return OptimizedISLearnLearner(
+        GRAMMAR, min_recall=0.9, min_specificity=0.6, **kwargs
+    )
+
+
+def evaluated_atoms(oracle: Callable[[str], OracleResult]) -> List[AvicennaExplanation]:
+    inputs = {AvicennaInput.from_str(GRAMMAR, inp, oracle(inp)) for inp in INPUTS}
+    atoms = [AvicennaExplanation(parse_isla(atom, GRAMMAR)) for atom in ATOMS]
+    ExplanationEvaluator(GRAMMAR).evaluate(atoms, inputs)
+    return atoms
+
+
+def fingerprints(explanations) -> set[str]:
+    return {explanation.fingerprint() for explanation in explanations}
+
+
+class TestConjunctionSearch(unittest.TestCase):
+    """
+    The level-wise conjunction search must find the conjunctions of the exhaustive
+    search over all combinations of explanations that it replaced.
+    """
+
+    @staticmethod
+    def oracle(inp: str) -> OracleResult:
+        return (
+            OracleResult.FAILING if inp.startswith("sqrt(-") else OracleResult.PASSING
+        )
+
+    def exhaustive_conjunctions(
+        self, learner: OptimizedISLearnLearner, atoms: List[AvicennaExplanation]
+    ) -> List[AvicennaExplanation]:
+        conjunctions = []
+        for level in range(2, learner.max_conjunction_size + 1):
+            for combination in itertools.combinations(atoms, level):
+                if not all(atom.recall() >= learner.min_recall for atom in combination):
+                    continue
+                conjunction = combination[0]
+                for atom in combination[1:]:
+                    conjunction = conjunction & atom
+                specificity = conjunction.specificity()
+                # conjunctions below the minimum recall are rejected by the next
+                # validation
+                if (
+                    conjunction.recall() >= learner.min_recall
+                    and specificity >= learner.min_precision
+                    and all(specificity > atom.specificity() for atom in combination)
+                ):
+                    conjunctions.append(conjunction)
+        return conjunctions
+
+    def test_same_conjunctions_as_exhaustive_search(self):
+        learner = create_learner(max_conjunction_size=2)
+        atoms = evaluated_atoms(self.oracle)
+
+        expected = self.exhaustive_conjunctions(learner, atoms)
+        self.assertTrue(expected)
+        self.assertEqual(
+            fingerprints(expected), fingerprints(learner.get_conjunctions(atoms))
+        )
+
+    def test_conjunction_scores_match_evaluation(self):
+        learner = create_learner(max_conjunction_size=3)
+        atoms = evaluated_atoms(self.oracle)
+
+        for conjunction in learner.get_conjunctions(atoms):
+            with self.subTest(str(conjunction)):
+                self.assertGreaterEqual(conjunction.recall(), learner.min_recall)
+                self.assertGreaterEqual(
+                    conjunction.specificity(), learner.min_precision
+                )
+
+
+class TestDisjunctionSearch(unittest.TestCase):
+    """
+    The greedy disjunction search must find the minimal disjunctions of the exhaustive
+    search over all combinations of explanations.
+    """
+
+    @staticmethod
+    def oracle(inp: str) -> OracleResult:
+        return (
+            OracleResult.FAILING
+            if inp.startswith("sqrt(-") or inp.startswith("tan(-")
+            else OracleResult.PASSING
+        )
+
+    def exhaustive_disjunctions(
+        self, learner: OptimizedISLearnLearner, atoms: List[AvicennaExplanation]
+    ) -> List[AvicennaExplanation]:
+        def is_valid(disjunction: AvicennaExplanation) -> bool:
+            return (
+                disjunction.recall() >= learner.min_recall
+                and disjunction.specificity() >= learner.min_precision
+            )
+
+        disjunctions = []
+        for level in range(2, learner.max_disjunction_size + 1):
+            for combination in itertools.combinations(atoms, level):
+                disjunction = combination[0]
+                for atom in combination[1:]:
+                    disjunction = disjunction | atom
+                # a disjunction is minimal if no disjunct can be left out
+                if is_valid(disjunction) and not any(
+                    is_valid(self._disjunction(sub))
+                    for sub in itertools.combinations(combination, level - 1)
+                ):
+                    disjunctions.append(disjunction)
+        return disjunctions
+
+    @staticmethod
+    def _disjunction(combination) -> AvicennaExplanation:
+        disjunction = combination[0]
+        for atom in combination[1:]:
+            disjunction = disjunction | atom
+        return disjunction
+
+    def test_same_disjunctions_as_exhaustive_search(self):
+        learner = create_learner(max_disjunction_size=2)
+        atoms = evaluated_atoms(self.oracle)
+
+        expected = self.exhaustive_disjunctions(learner, atoms)
+        self.assertTrue(expected)
+        self.assertEqual(
+            fingerprints(expected), fingerprints(learner.get_disjunctions(atoms))
+        )
+
+    def test_no_disjunctions_without_max_disjunction_size(self):
+        learner = create_learner(max_disjunction_size=1)
+        self.assertEqual([], learner.get_disjunctions(evaluated_atoms(self.oracle)))
+
+
+class TestCombinedExplanations(unittest.TestCase):
+    @staticmethod
+    def oracle(inp: str) -> OracleResult:
+        return (
+            OracleResult.FAILING if inp.startswith("sqrt(-") else OracleResult.PASSING
+        )
+
+    def test_combination_of_explanations_evaluated_on_different_inputs(self):
+        inputs = [
+            AvicennaInput.from_str(GRAMMAR, inp, self.oracle(inp)) for inp in INPUTS
+        ]
+        sqrt, minus = (
+            AvicennaExplanation(parse_isla(atom, GRAMMAR)) for atom in ATOMS[0:4:3]
+        )
+        evaluator = ExplanationEvaluator(GRAMMAR)
+        evaluator.evaluate([sqrt], set(inputs[:10]))
+        evaluator.evaluate([minus], set(inputs[5:]))
+
+        for combined in (sqrt & minus, sqrt | minus):
+            with self.subTest(str(combined)):
+                self.assertEqual(set(inputs[5:10]), set(combined.cache))
+                evaluator.evaluate([combined], set(inputs))
+                expected = AvicennaExplanation(combined.explanation)
+                evaluator.evaluate([expected], set(inputs))
+                self.assertEqual(expected.cache, combined.cache)
+                self.assertEqual(
+                    expected.confusion_counts(), combined.confusion_counts()
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from isla.evaluator import evaluate
+from isla.language import parse_isla
+from grammar_graph import gg
+
+from avicenna._data import AvicennaInput
+from avicenna._learning._memo import FormulaEvaluationMemo
+
+GRAMMAR = {
+    "<start>": ["<arith_expr>"],
+    "<arith_expr>": ["<function>(<number>)"],
+    "<function>": ["sqrt", "sin", "cos", "tan"],
+    "<number>": ["<maybe_minus><onenine><maybe_digits>"],
+    "<maybe_minus>": ["", "-"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+    "<digit>": [str(num) for num in range(0, 10)],
+    "<maybe_digits>": ["", "<digits>"],
+    "<digits>": ["<digit>", "<digit><digits>"],
+}
+
+INPUTS = ["sqrt(-900)", "sqrt(4)", "tan(-3)", "cos(10)", "sin(-31)", "sin(2)"]
+
+FORMULAS = [
+    'exists <function> f in start: (= f "sqrt")',
+    'forall <digit> d in start: (= d "0")',
+    'exists <function> f in start: (= f "sqrt") and '
+    'exists <maybe_minus> m in start: (= m "-")',
+    'exists <function> f in start: (= f "cos") or '
+    'not exists <maybe_minus> m in start: (= m "-")',
+    "forall <number> n in start: exists <onenine> o in n: " '(= o "9")',
+    "exists <number> n in start: forall <digit> d in n: " '(= d "0")',
+    'exists <arith_expr> a in start: exists <function> f in a: (= f "sin")',
+    "exists <number> n in start: (str.len(n) > 2)",
+]
+
+
+class TestFormulaEvaluationMemo(unittest.TestCase):
+    def setUp(self):
+        self.graph = gg.GrammarGraph.from_grammar(GRAMMAR)
+        self.trees = [AvicennaInput.from_str(GRAMMAR, inp).tree for inp in INPUTS]
+        self.formulas = [parse_isla(formula, GRAMMAR) for formula in FORMULAS]
+
+    def assert_matches_isla(self, memo: FormulaEvaluationMemo):
+        for formula in self.formulas:
+            for tree in self.trees:
+                with self.subTest(formula=str(formula), tree=str(tree)):
+                    self.assertEqual(
+                        evaluate(formula, tree, GRAMMAR, graph=self.graph).is_true(),
+                        memo.evaluate(formula, tree, self.graph).is_true(),
+                    )
+
+    def test_results_match_isla(self):
+        memo = FormulaEvaluationMemo()
+        self.assert_matches_isla(memo)
+        # the second pass is answered from the memo
+        misses = memo.misses
+        self.assert_matches_isla(memo)
+        self.assertEqual(misses, memo.misses)
+        self.assertGreater(memo.hits, 0)
+
+    def test_results_match_isla_with_evictions(self):
+        memo = FormulaEvaluationMemo(
+            max_size=4, max_tries=2, max_roots=2, max_formulas=3
+        )
+        self.assert_matches_isla(memo)
+        self.assert_matches_isla(memo)
+        self.assertLessEqual(len(memo), 4)
+
+    def test_clear(self):
+        memo = FormulaEvaluationMemo()
+        self.assert_matches_isla(memo)
+        memo.clear()
+        self.assertEqual(0, len(memo))
+        self.assert_matches_isla(memo)
+
+
+if __name__ == "__main__":
+    unittest.main()
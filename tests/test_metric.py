@@ -0,0 +1,121 @@
+import unittest
+
+import numpy as np
+
+from dbg.learner.metric import (
+    F1ScoreFitness,
+    FitnessStrategy,
+    PrecisionFitness,
+    RecallFitness,
+    RecallPriorityFitness,
+    RecallPriorityLengthFitness,
+    RecallSpecificityLengthFitness,
+    candidate_lengths,
+    confusion_counts,
+)
+
+from explanations import ContainsExplanation, labeled
+
+STRATEGIES = [
+    PrecisionFitness(),
+    RecallFitness(),
+    RecallPriorityFitness(),
+    RecallPriorityLengthFitness(),
+    RecallSpecificityLengthFitness(),
+    F1ScoreFitness(),
+]
+
+
+class LengthFitness(FitnessStrategy):
+    """
+    A strategy without a vectorized evaluation, which prefers long explanations.
+    """
+
+    def evaluate(self, candidate):
+        return len(candidate)
+
+    def compare(self, candidate1, candidate2):
+        return self.evaluate(candidate1) - self.evaluate(candidate2)
+
+
+def evaluated_explanations() -> list[ContainsExplanation]:
+    test_inputs = labeled("ab", "a", "ac", "bc", "b", "abc", "cd", "ad", "d")
+    explanations = [
+        ContainsExplanation(e) for e in ("a", "b", "c", "d", "ab", "ac", "bcd", "x")
+    ]
+    for explanation in explanations:
+        explanation.evaluate(test_inputs)
+    return explanations
+
+
+class TestConfusionCounts(unittest.TestCase):
+    def test_counts_match_evaluation_results(self):
+        for explanation in evaluated_explanations():
+            with self.subTest(str(explanation)):
+                tp = explanation.failing_inputs_eval_results.count(True)
+                fp = explanation.passing_inputs_eval_results.count(True)
+                self.assertEqual(
+                    (
+                        tp,
+                        fp,
+                        len(explanation.passing_inputs_eval_results) - fp,
+                        len(explanation.failing_inputs_eval_results) - tp,
+                    ),
+                    explanation.confusion_counts(),
+                )
+
+    def test_counts_are_reset(self):
+        explanation = evaluated_explanations()[0]
+        explanation.reset()
+        self.assertEqual((0, 0, 0, 0), explanation.confusion_counts())
+        self.assertEqual(0.0, explanation.recall())
+
+    def test_counts_matrix(self):
+        explanations = evaluated_explanations()
+        counts = confusion_counts(explanations)
+        self.assertEqual((len(explanations), 4), counts.shape)
+        self.assertEqual((0, 4), confusion_counts([]).shape)
+
+
+class TestBatchEvaluation(unittest.TestCase):
+    def test_batch_keys_match_evaluate(self):
+        explanations = evaluated_explanations()
+        counts, lengths = confusion_counts(explanations), candidate_lengths(
+            explanations
+        )
+        for strategy in STRATEGIES:
+            with self.subTest(type(strategy).__name__):
+                keys = strategy.evaluate_batch(counts, lengths)
+                for idx, explanation in enumerate(explanations):
+                    key = strategy.evaluate(explanation)
+                    key = key if isinstance(key, tuple) else (key,)
+                    self.assertEqual(key, tuple(k[idx] for k in keys))
+
+    def test_ranking_matches_sorting(self):
+        explanations = evaluated_explanations()
+        for strategy in STRATEGIES + [LengthFitness()]:
+            with self.subTest(type(strategy).__name__):
+                self.assertEqual(
+                    sorted(explanations, key=strategy.evaluate, reverse=True),
+                    strategy.rank_candidates(explanations),
+                )
+                best_key = max(map(strategy.evaluate, explanations))
+                self.assertEqual(
+                    [e for e in explanations if strategy.evaluate(e) == best_key],
+                    strategy.best_candidates(explanations),
+                )
+
+    def test_default_evaluation_needs_candidates(self):
+        explanations = evaluated_explanations()
+        with self.assertRaises(ValueError):
+            LengthFitness().evaluate_batch(
+                confusion_counts(explanations), candidate_lengths(explanations)
+            )
+        self.assertEqual(0, len(LengthFitness().rank_candidates([])))
+        np.testing.assert_array_equal(
+            [], RecallFitness().best_batch(np.zeros((0, 4)), np.zeros(0))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
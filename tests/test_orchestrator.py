@@ -0,0 +1,143 @@
+import csv
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from dbg_evaluation.orchestrator import (
+    CSV_COLUMNS,
+    ExperimentOrchestrator,
+    result_row,
+)
+from dbg_evaluation.util import locked
+
+
+class FakeExperiment:
+    def __init__(self, tool: str, subject: str):
+        self.tool = tool
+        self.subject = subject
+
+    def evaluate(self, seed: int, **kwargs):
+        if self.subject == "slow":
+            time.sleep(60)
+        if self.subject == "broken":
+            raise ValueError("broken subject")
+        return {
+            "name": self.tool,
+            "seed": seed,
+            "time_in_seconds": 1.0,
+            "precision": 0.5 + seed / 10,
+            "recall": 1.0,
+            "candidates": ["a", "b"],
+            "best_candidates": ["a"],
+        }
+
+
+def read_csv(csv_file: Path) -> list[dict]:
+    with open(csv_file, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class TestMergeCsv(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.csv_file = Path(self.directory.name) / "results.csv"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_batches_are_aligned_to_the_header(self):
+        timeout_batch = pd.DataFrame(
+            [
+                {
+                    "tool": "avicenna",
+                    "subject": "calculator",
+                    "seed": 1,
+                    "status": "timeout",
+                    "error": None,
+                    "duration_in_seconds": 10.0,
+                }
+            ]
+        )
+        full_batch = pd.DataFrame(
+            [
+                {
+                    **result_row(FakeExperiment("alhazen", "calculator").evaluate(2)),
+                    "tool": "alhazen",
+                    "subject": "calculator",
+                    "status": "ok",
+                    "error": None,
+                    "duration_in_seconds": 2.0,
+                }
+            ]
+        )
+        ExperimentOrchestrator.merge_csv(timeout_batch, self.csv_file)
+        ExperimentOrchestrator.merge_csv(full_batch, self.csv_file)
+
+        with open(self.csv_file, newline="") as f:
+            self.assertEqual(CSV_COLUMNS, next(csv.reader(f)))
+        first, second = read_csv(self.csv_file)
+        self.assertEqual("timeout", first["status"])
+        self.assertEqual("", first["precision"])
+        self.assertEqual("ok", second["status"])
+        self.assertEqual("0.7", second["precision"])
+        self.assertEqual("alhazen", second["tool"])
+        self.assertEqual("a", second["best_candidate"])
+
+    def test_columns_missing_from_the_header_are_dropped(self):
+        with open(self.csv_file, "w", newline="") as f:
+            f.write("tool,seed\n")
+        batch = pd.DataFrame([{"seed": 3, "tool": "alhazen", "extra": "x"}])
+        with self.assertLogs("explainer", level="WARNING"):
+            ExperimentOrchestrator.merge_csv(batch, self.csv_file)
+        self.assertEqual([{"tool": "alhazen", "seed": "3"}], read_csv(self.csv_file))
+
+    def test_locked(self):
+        with open(self.csv_file, "a+") as f, locked(f) as locked_file:
+            self.assertIs(f, locked_file)
+            f.write("x")
+        self.assertEqual("x", self.csv_file.read_text())
+
+
+class TestExperimentOrchestrator(unittest.TestCase):
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            orchestrator = ExperimentOrchestrator(
+                FakeExperiment,
+                directory,
+                workers=2,
+                timeout_seconds=5,
+                start_method="fork",
+                poll_interval_seconds=0.1,
+            )
+            results = orchestrator.run(
+                ["alhazen"], ["calculator", "broken", "slow"], [1, 2]
+            )
+
+            self.assertEqual(6, len(results))
+            statuses = results.groupby("subject")["status"].agg(set).to_dict()
+            self.assertEqual(
+                {"calculator": {"ok"}, "broken": {"error"}, "slow": {"timeout"}},
+                statuses,
+            )
+            rows = read_csv(Path(directory) / "results.csv")
+            self.assertEqual(6, len(rows))
+            self.assertEqual(
+                {"0.6", "0.7"},
+                {row["precision"] for row in rows if row["status"] == "ok"},
+            )
+
+            summary = pd.read_csv(Path(directory) / "summary.csv")
+            self.assertEqual(3, len(summary))
+            self.assertEqual(
+                [0, 2, 2],
+                summary.set_index("subject")
+                .loc[["calculator", "broken", "slow"], "failed_runs"]
+                .tolist(),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
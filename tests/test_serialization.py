@@ -0,0 +1,84 @@
+import unittest
+
+from dbg.data.oracle import OracleResult
+from dbg.data.serialization import SymbolTable
+
+from alhazen._data import AlhazenInput
+from avicenna import DerivationTree
+from avicenna._data import AvicennaInput
+
+GRAMMAR = {
+    "<start>": ["<arith_expr>"],
+    "<arith_expr>": ["<function>(<number>)"],
+    "<function>": ["sqrt", "sin", "cos", "tan"],
+    "<number>": ["<maybe_minus><onenine><maybe_digits><maybe_frac>"],
+    "<maybe_minus>": ["", "-"],
+    "<onenine>": [str(num) for num in range(1, 10)],
+    "<digit>": [str(num) for num in range(0, 10)],
+    "<maybe_digits>": ["", "<digits>"],
+    "<digits>": ["<digit>", "<digit><digits>"],
+    "<maybe_frac>": ["", ".<digits>"],
+}
+
+INPUTS = [
+    ("sqrt(-900)", OracleResult.FAILING),
+    ("cos(10.25)", OracleResult.PASSING),
+    ("tan(5)", OracleResult.UNDEFINED),
+    ("sin(-31)", None),
+]
+
+
+class TestAvicennaInputSerialization(unittest.TestCase):
+    def assert_round_trip(self, inp: AvicennaInput, symbol_table=None):
+        decoded = AvicennaInput.from_bytes(inp.to_bytes(symbol_table), symbol_table)
+        self.assertEqual(str(inp), str(decoded))
+        self.assertEqual(inp.oracle, decoded.oracle)
+        self.assertEqual(inp.tree.structural_hash(), decoded.tree.structural_hash())
+
+    def test_round_trip(self):
+        for input_string, oracle in INPUTS:
+            with self.subTest(input_string):
+                self.assert_round_trip(
+                    AvicennaInput.from_str(GRAMMAR, input_string, oracle)
+                )
+
+    def test_round_trip_with_shared_symbol_table(self):
+        symbol_table = SymbolTable.from_grammar(GRAMMAR)
+        for input_string, oracle in INPUTS:
+            with self.subTest(input_string):
+                inp = AvicennaInput.from_str(GRAMMAR, input_string, oracle)
+                self.assertLess(len(inp.to_bytes(symbol_table)), len(inp.to_bytes()))
+                self.assert_round_trip(inp, symbol_table)
+
+    def test_round_trip_of_open_tree(self):
+        tree = DerivationTree("<start>", [DerivationTree("<arith_expr>", None)])
+        decoded = AvicennaInput.from_bytes(AvicennaInput(tree).to_bytes())
+        self.assertIsNone(decoded.tree.children[0].children)
+        self.assertEqual(tree.structural_hash(), decoded.tree.structural_hash())
+
+
+class TestAlhazenInputSerialization(unittest.TestCase):
+    def assert_round_trip(self, inp: AlhazenInput, symbol_table=None):
+        decoded = AlhazenInput.from_bytes(inp.to_bytes(symbol_table), symbol_table)
+        self.assertEqual(str(inp), str(decoded))
+        self.assertEqual(inp.oracle, decoded.oracle)
+        self.assertEqual(inp.tree, decoded.tree)
+
+    def test_round_trip(self):
+        for input_string, oracle in INPUTS:
+            with self.subTest(input_string):
+                self.assert_round_trip(
+                    AlhazenInput.from_str(GRAMMAR, input_string, oracle)
+                )
+
+    def test_round_trip_with_shared_symbol_table(self):
+        symbol_table = SymbolTable.from_grammar(GRAMMAR)
+        for input_string, oracle in INPUTS:
+            with self.subTest(input_string):
+                self.assert_round_trip(
+                    AlhazenInput.from_str(GRAMMAR, input_string, oracle), symbol_table
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from types import SimpleNamespace
+
+from dbg.explanation.candidate import ExplanationSet
+from dbg.learner.learner import Learner
+from dbg.stopping import (
+    ConfidenceIntervalWidth,
+    NoNewInputs,
+    TopKUnchanged,
+    wilson_interval_width,
+)
+
+from explanations import ContainsExplanation, labeled
+
+
+class FixedLearner(Learner):
+    def learn_explanation(self, test_inputs, **kwargs):
+        for explanation in self.explanations:
+            explanation.evaluate(test_inputs)
+        return self.explanations
+
+
+def explainer_with(*explanations: str):
+    learner = FixedLearner()
+    learner.explanations = ExplanationSet(
+        [ContainsExplanation(e) for e in explanations]
+    )
+    return SimpleNamespace(learner=learner)
+
+
+class TestStoppingCriteria(unittest.TestCase):
+    def test_top_k_unchanged(self):
+        explainer = explainer_with("a", "b")
+        explainer.learner.learn_explanation(labeled("ab", "a", "b"))
+        criterion = TopKUnchanged(k=1, patience=2)
+
+        self.assertFalse(criterion.should_stop(explainer, set()))
+        self.assertFalse(criterion.should_stop(explainer, set()))
+        self.assertTrue(criterion.should_stop(explainer, set()))
+
+        # a new best explanation restarts the count
+        explainer.learner.explanations.append(ContainsExplanation("ax"))
+        explainer.learner.explanations.remove(ContainsExplanation("a"))
+        explainer.learner.learn_explanation(labeled("ab", "a", "b"))
+        self.assertFalse(criterion.should_stop(explainer, set()))
+
+        criterion.reset()
+        self.assertIsNone(criterion.top_k)
+
+    def test_confidence_interval_width(self):
+        explainer = explainer_with("a")
+        explainer.learner.learn_explanation(labeled("a", "b"))
+        criterion = ConfidenceIntervalWidth(max_width=0.3)
+        self.assertFalse(criterion.should_stop(explainer, set()))
+
+        many_inputs = labeled(
+            *(f"a{i}" for i in range(100)), *(f"b{i}" for i in range(100))
+        )
+        explainer.learner.learn_explanation(many_inputs)
+        self.assertTrue(criterion.should_stop(explainer, set()))
+
+    def test_confidence_interval_width_without_explanations(self):
+        self.assertFalse(ConfidenceIntervalWidth().should_stop(explainer_with(), set()))
+
+    def test_no_new_inputs(self):
+        explainer = explainer_with()
+        criterion = NoNewInputs(patience=2)
+        self.assertFalse(criterion.should_stop(explainer, set()))
+        self.assertFalse(criterion.should_stop(explainer, labeled("a")))
+        self.assertFalse(criterion.should_stop(explainer, set()))
+        self.assertTrue(criterion.should_stop(explainer, set()))
+
+    def test_wilson_interval_width(self):
+        self.assertEqual(1.0, wilson_interval_width(0, 0))
+        self.assertGreater(wilson_interval_width(5, 10), wilson_interval_width(50, 100))
+        self.assertLess(wilson_interval_width(100, 100), wilson_interval_width(50, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()